@@ -0,0 +1,146 @@
+import json
+import os
+
+import numpy
+
+
+class ExampleStore:
+    """ Append-only store of training examples: the boards of an episode, labeled with the goals mask of the
+        attacker. Episodes are collected in an open chunk, which is written when it reaches chunk_size boards or
+        on flush, as three .npy files: the boards (N, F, A), the goals masks (E, F) and the episode offsets
+        (E + 1), boards offsets[e]:offsets[e + 1] being episode e. Written chunks are only committed on flush,
+        as one line of the index file of their writer, so several processes can write to the same folder with
+        different writer names, and chunks written before a crash are never read.
+        A flush can be tagged with a shard of a GoalsSweep, and only the first commit of each shard is read,
+        so a shard replayed after a crash between its commit and its checkpoint is not stored twice.
+        Reading goes over the chunks of all the index files, memory mapped.
+    """
+    def __init__(self, folder, writer='0', chunk_size=4096, dtype=numpy.float32):
+        self.folder = folder
+        self.writer = writer
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+        self.boards = []
+        self.goals = []
+        self.open_boards = 0
+        self.written = []
+        os.makedirs(folder, exist_ok=True)
+        self.truncate_partial_line()
+        self.next_chunk = sum(len(commit['chunks']) for commit in self.commits(self.index_file(writer)))
+
+    def index_file(self, writer):
+        return os.path.join(self.folder, writer + '.index')
+
+    def chunk_file(self, name, array):
+        return os.path.join(self.folder, name + '-' + array + '.npy')
+
+    'a commit cut by a crash leaves a line without a newline at the end of the index, which is dropped'
+    def truncate_partial_line(self):
+        index_file = self.index_file(self.writer)
+        if not os.path.isfile(index_file):
+            return
+        with open(index_file, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+
+    def append(self, boards, goals):
+        """ boards is the (T, F, A) array of an episode and goals the funds mask of its attacker """
+        self.boards.append(numpy.asarray(boards, dtype=self.dtype))
+        self.goals.append(numpy.asarray(goals, dtype=bool))
+        self.open_boards += len(boards)
+        if self.open_boards >= self.chunk_size:
+            self.write_chunk()
+
+    def write_chunk(self):
+        """ Writes the open chunk, which is committed to the index on the next flush """
+        if not self.boards:
+            return
+        name = self.writer + '-' + str(self.next_chunk).zfill(5)
+        offsets = numpy.concatenate([[0], numpy.cumsum([len(boards) for boards in self.boards])])
+        arrays = {'boards': numpy.concatenate(self.boards), 'goals': numpy.stack(self.goals), 'offsets': offsets}
+        for array, values in arrays.items():
+            tmp_file = self.chunk_file(name, array) + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                numpy.save(f, values)
+            os.replace(tmp_file, self.chunk_file(name, array))
+        self.written.append({'name': name, 'boards': int(offsets[-1]), 'episodes': len(self.goals)})
+        self.next_chunk += 1
+        self.boards = []
+        self.goals = []
+        self.open_boards = 0
+
+    def flush(self, shard=None):
+        """ Writes the open chunk, and then commits the chunks written since the last flush to the index with a
+            single write, tagged with shard
+        """
+        self.write_chunk()
+        if not self.written and shard is None:
+            return
+        line = json.dumps({'shard': shard, 'chunks': self.written}) + '\n'
+        fd = os.open(self.index_file(self.writer), os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+        self.written = []
+
+    def commits(self, index_file):
+        """ The commits of an index file, skipping a partial last line """
+        if not os.path.isfile(index_file):
+            return []
+        with open(index_file) as f:
+            return [json.loads(line) for line in f if line.endswith('\n')]
+
+    def chunks(self):
+        """ The index entries of the committed chunks of all the writers, each shard from its first commit """
+        entries = []
+        shards = set()
+        for file_name in sorted(os.listdir(self.folder)):
+            writer, extension = os.path.splitext(file_name)
+            if extension != '.index':
+                continue
+            for commit in self.commits(os.path.join(self.folder, file_name)):
+                if commit['shard'] is not None:
+                    if commit['shard'] in shards:
+                        continue
+                    shards.add(commit['shard'])
+                for entry in commit['chunks']:
+                    entry['writer'] = writer
+                    entry['shard'] = commit['shard']
+                    entries.append(entry)
+        return entries
+
+    def load_chunk(self, entry, mmap_mode='r'):
+        """ Returns the boards, goals and offsets arrays of a chunk """
+        return tuple(numpy.load(self.chunk_file(entry['name'], array), mmap_mode=mmap_mode)
+                     for array in ['boards', 'goals', 'offsets'])
+
+    def __len__(self):
+        return sum(entry['boards'] for entry in self.chunks())
+
+    def num_episodes(self):
+        return sum(entry['episodes'] for entry in self.chunks())
+
+    def minibatches(self, batch_size, chunks_per_shuffle=4, rng=None):
+        """ Yields (boards, goals) minibatches of the written examples in a random order, each board with the
+            goals of its episode. chunks_per_shuffle chunks, picked at random, are shuffled together at a time,
+            and only the rows of the current minibatch are read from them. The last minibatch may be smaller.
+        """
+        rng = numpy.random.default_rng() if rng is None else rng
+        entries = self.chunks()
+        rng.shuffle(entries)
+        for start in range(0, len(entries), chunks_per_shuffle):
+            chunks = [self.load_chunk(entry) for entry in entries[start:start + chunks_per_shuffle]]
+            chunk_ids = numpy.concatenate([numpy.full(len(boards), i) for i, (boards, _, _) in enumerate(chunks)])
+            rows = numpy.concatenate([numpy.arange(len(boards)) for boards, _, _ in chunks])
+            order = rng.permutation(len(rows))
+            for batch_start in range(0, len(order), batch_size):
+                batch = order[batch_start:batch_start + batch_size]
+                boards = []
+                goals = []
+                for i, (chunk_boards, chunk_goals, offsets) in enumerate(chunks):
+                    chunk_rows = numpy.sort(rows[batch[chunk_ids[batch] == i]])
+                    boards.append(chunk_boards[chunk_rows])
+                    goals.append(chunk_goals[numpy.searchsorted(offsets, chunk_rows, side='right') - 1])
+                yield numpy.concatenate(boards), numpy.concatenate(goals)
@@ -0,0 +1,22 @@
+import numpy
+
+
+class PolicyValueModel:
+    """ Evaluates batches of canonical forms, the (funds, assets) boards of AssetFundsNetwork.get_canonical_form,
+        for a PUCT search
+    """
+    def predict(self, boards):
+        """ boards is a (B, F, A) array. Returns a (B, A) policy over the assets to trade and the (B, P) values
+            of the players of the states, in the range of their game rewards
+        """
+        raise NotImplementedError
+
+
+class UniformModel(PolicyValueModel):
+    'the same policy for every asset and a value of 0, PUCT then only follows the visits'
+    def __init__(self, num_players):
+        self.num_players = num_players
+
+    def predict(self, boards):
+        num_boards, _, num_assets = boards.shape
+        return numpy.full((num_boards, num_assets), 1 / num_assets), numpy.zeros((num_boards, self.num_players))
@@ -0,0 +1,20 @@
+import numpy
+import torch
+
+from DeepLearning.PolicyValueModel import PolicyValueModel
+
+
+class TorchPolicyValueModel(PolicyValueModel):
+    """ A torch module as a PolicyValueModel. The module maps a (B, F, A) float tensor to (B, A) policy logits
+        and (B, P) values. Inference runs without gradients on device, the CPU by default.
+    """
+    def __init__(self, module: torch.nn.Module, device='cpu'):
+        self.device = torch.device(device)
+        self.module = module.to(self.device)
+        self.module.eval()
+
+    def predict(self, boards):
+        with torch.no_grad():
+            logits, values = self.module(torch.as_tensor(numpy.asarray(boards, dtype=numpy.float32),
+                                                         device=self.device))
+            return torch.softmax(logits, dim=1).cpu().numpy(), values.cpu().numpy()
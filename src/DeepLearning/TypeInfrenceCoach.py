@@ -1,19 +1,20 @@
-import itertools
 from collections import deque
-from copy import deepcopy
 
 import numpy as np
 
-import time, os, sys
+import multiprocessing, pickle, random, time, os, sys
 from pickle import Pickler, Unpickler
 from random import shuffle
 
 from GameLogic import GameState
-from GameLogic.AssetFundNetwork import AssetFundsNetwork
+from DeepLearning.ExampleStore import ExampleStore
+from GameLogic.AssetFundNetwork import AssetFundsNetwork, CanonicalFormBuffer
 from GameLogic.GameConfig import GameConfig
 from GameLogic.GameState import SinglePlayerGameState
+from GameRunners.GoalsSweep import GoalsSweep
 from GameRunners.MCTS import UCT
 from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator, SqrtMarketImpactCalculator
+from GameLogic.SysConfig import SysConfig
 
 
 class TypeInfrenceCoach():
@@ -21,26 +22,29 @@ class TypeInfrenceCoach():
     This class executes the self-play + learning. It uses the functions defined
     in Game and NeuralNet. args are specified in main.py.
     """
-    def __init__(self, example_folder_path, config:GameConfig):
+    def __init__(self, example_folder_path, config:GameConfig, writer='0'):
         self.trainExamplesHistory = []  # history of examples from args.numItersForTrainExamplesHistory latest iterations
         self.example_folder_path = example_folder_path
         self.config = config
+        self.example_store = ExampleStore(example_folder_path, writer)
         #self.pnet = self.nnet.__class__(self.game)  # the competitor network
         #self.skipFirstSelfPlay = False # can be overriden in loadTrainExamples()
 
+    'the boards of an episode are a (moves, funds, assets) array'
     def executeEpisode(self, state: GameState, iter_num):
-        states = []
-
+        boards = CanonicalFormBuffer(state.network)
+        tree = None
         while (not state.game_ended()):
-            m = UCT(rootstate=state, itermax=iter_num, verbose=False)  # Attacker
-            states.append(state.network.get_canonical_form())
+            m, tree = UCT(rootstate=state, itermax=iter_num, verbose=False, rootnode=tree, return_tree=True)  # Attacker
+            boards.append()
             state.apply_action(m)
+            tree = tree.SubtreeForMove(m)
         if state.game_ended():
             if state.attacker.game_reward(state.network.funds) == 1:
-                print('win in ' + str(len(states)) + ' moves')
-                return [(states, state.attacker.goals)]
+                print('win in ' + str(len(boards)) + ' moves')
+                return [(boards.to_array(), state.attacker.goals)]
             else:
-                print('lose in ' + len(state) + ' moves')
+                print('lose in ' + str(len(boards)) + ' moves')
                 return []
 
 
@@ -152,23 +156,6 @@ class TypeInfrenceCoach():
                 portfolio[asset] = netowrk.assets[asset].daily_volume * self.config.attacker_portfolio_ratio
         return portfolio
 
-    def saveGoalsExamples(self, goals, examples):
-        folder = self.example_folder_path
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-        filename = os.path.join(folder, self.getCheckpointFile(goals) + ".examples")
-        with open(filename, "wb+") as f:
-            Pickler(f).dump(examples)
-        f.closed
-
-    def examples_collected(self, goals):
-        folder = self.example_folder_path
-        if not os.path.exists(folder):
-            return False
-        filename = os.path.join(folder, self.getCheckpointFile(goals) + ".examples")
-        if os.path.isfile(filename):
-            return True
-
     def gen_goals_fund_list(self, goals_vector):
         goals_list = []
         for i in range(len(goals_vector)):
@@ -176,25 +163,88 @@ class TypeInfrenceCoach():
                 goals_list.append('f' + str(i))
         return goals_list
 
-    def gen_training_examples(self, network, episodes_per_goal, uct_iterations):
-        goals_set = list(itertools.product([0, 1], repeat=self.config.num_funds))
-        goals_set = goals_set[1:]
-        for goals in goals_set:
-            goals_vector = list(goals)
-            goals_list = self.gen_goals_fund_list(goals_vector)
-            goals_string = ''.join([str(x) for x in goals_list])
-            if self.examples_collected(goals_string):
-                continue
-            portfolio = self.create_portofolio(network, goals_list)
-            initial_state = SinglePlayerGameState(deepcopy(network), portfolio,goals_list,
-                                                  self.config.attacker_asset_slicing,
-                                                  self.config.attacker_max_assets_in_action)
-            train_examples = []
-            for i in range(episodes_per_goal):
-                train_examples += self.executeEpisode(deepcopy(initial_state), uct_iterations)
-
-            #self.trainExamplesHistory.extend(train_examples)
-            self.saveGoalsExamples(goals_string, train_examples)
+    'the examples of won episodes go to the example store, labeled with the goals mask over the funds of the network'
+    def gen_goals_examples(self, network, goals_list, episodes_per_goal, uct_iterations):
+        goals_mask = np.isin(network.fund_symbols, goals_list)
+        portfolio = self.create_portofolio(network, goals_list)
+        state = SinglePlayerGameState(network, portfolio,goals_list,
+                                      self.config.attacker_asset_slicing,
+                                      self.config.attacker_max_assets_in_action)
+        initial_state = state.snapshot()
+        for i in range(episodes_per_goal):
+            state.restore(initial_state)
+            for boards, goals in self.executeEpisode(state, uct_iterations):
+                self.example_store.append(boards, goals_mask)
+        state.restore(initial_state)
+
+    def gen_training_examples(self, network, episodes_per_goal, uct_iterations, shard_size=64, workers=1,
+                              network_dir=None, seed=0):
+        """ A killed run resumes from the shards recorded in the sweep checkpoint of the examples folder. The
+            examples of a shard are committed to the store when the shard is done, so the examples of a shard
+            that was cut are never read, and the shard is played again from scratch.
+        """
+        sweep = GoalsSweep(self.config.num_funds, shard_size,
+                           os.path.join(self.example_folder_path, 'goals_sweep.checkpoint'))
+        if workers > 1:
+            self.gen_parallel_training_examples(sweep, network, episodes_per_goal, uct_iterations, workers,
+                                                network_dir, seed)
+            return
+
+        def process_shard(shard, goals_set):
+            for goals_list in goals_set:
+                self.gen_goals_examples(network, goals_list, episodes_per_goal, uct_iterations)
+            self.example_store.flush(shard)
+        sweep.run(process_shard)
+
+    def episode_seed(self, seed, goals_index, episode):
+        return int(np.random.SeedSequence([seed, goals_index, episode]).generate_state(1)[0])
+
+    def gen_parallel_training_examples(self, sweep, network, episodes_per_goal, uct_iterations, workers,
+                                       network_dir=None, seed=0):
+        """ Runs the sweep over a pool of workers that each hold the network and take one pending shard at a
+            time, appending its won episodes to their own writer of the example store and committing them when
+            the shard is done. network_dir is a directory of AssetFundsNetwork.save_arrays of the network that the
+            workers map instead of unpickling it. Each episode is seeded from (seed, goal set index, episode), so
+            the examples are the same for any number of workers.
+        """
+        if network_dir is None:
+            network_args = (pickle.dumps(network), None)
+        else:
+            network_args = (network_dir, np.array(network.prices))
+        init_args = network_args + (self.example_folder_path, self.config, SysConfig.get_all(),
+                                    (sweep.shard_size, episodes_per_goal, uct_iterations, seed))
+        with multiprocessing.Pool(workers, _init_coach_worker, init_args) as pool:
+            sweep.run(_play_coach_shard, pool)
+
+
+_worker_coach = None
+
+
+def _init_coach_worker(network_source, prices, example_folder_path, config, conf, episode_args):
+    """ network_source is a pickled network, or a directory of AssetFundsNetwork.save_arrays that every worker
+        maps into memory and then sets to the given prices
+    """
+    global _worker_coach
+    SysConfig.set_all(conf)
+    if prices is None:
+        network = pickle.loads(network_source)
+    else:
+        network = AssetFundsNetwork.load_arrays(network_source, SqrtMarketImpactCalculator())
+        network.set_prices(prices)
+    coach = TypeInfrenceCoach(example_folder_path, config, writer='w' + str(os.getpid()))
+    _worker_coach = (coach, network, episode_args)
+
+
+def _play_coach_shard(shard, goals_set):
+    coach, network, (shard_size, episodes_per_goal, uct_iterations, seed) = _worker_coach
+    for goals_index, goals_list in enumerate(goals_set, shard * shard_size):
+        for episode in range(episodes_per_goal):
+            episode_seed = coach.episode_seed(seed, goals_index, episode)
+            random.seed(episode_seed)
+            np.random.seed(episode_seed)
+            coach.gen_goals_examples(network, goals_list, 1, uct_iterations)
+    coach.example_store.flush(shard)
+
 
 if __name__ == "__main__":
     config = GameConfig(num_funds=10, num_assets=10)
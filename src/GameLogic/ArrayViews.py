@@ -0,0 +1,65 @@
+from collections.abc import MutableMapping
+
+
+class NetworkField:
+    """ Attribute of an Asset or a Fund. It is stored on the object until the object is bound to a network,
+        and from then on it is read from and written to the network array with the given name.
+        Writes go through the network setter method when one is given, so the network can update its caches.
+    """
+    def __init__(self, array_name, setter=None):
+        self.array_name = array_name
+        self.setter = setter
+        self.local_name = None
+
+    def __set_name__(self, owner, name):
+        self.local_name = '_' + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if obj.network is None:
+            return obj.__dict__[self.local_name]
+        return getattr(obj.network, self.array_name)[obj.index].item()
+
+    def __set__(self, obj, value):
+        if obj.network is None:
+            obj.__dict__[self.local_name] = value
+        elif self.setter:
+            getattr(obj.network, self.setter)(obj.index, value)
+        else:
+            getattr(obj.network, self.array_name)[obj.index] = value
+
+
+class PortfolioView(MutableMapping):
+    """ Dict like view of a fund's row in the network holdings matrix: asset symbol -> number of shares """
+    def __init__(self, network, fund_index):
+        self.network = network
+        self.fund_index = fund_index
+
+    def __getitem__(self, asset_symbol):
+        num_shares = self.network.holdings.get(self.fund_index, self.network.asset_index[asset_symbol])
+        if num_shares == 0:
+            raise KeyError(asset_symbol)
+        return float(num_shares)
+
+    def __setitem__(self, asset_symbol, num_shares):
+        self.network.set_holding(self.fund_index, self.network.asset_index[asset_symbol], num_shares)
+
+    def __delitem__(self, asset_symbol):
+        if asset_symbol not in self:
+            raise KeyError(asset_symbol)
+        self[asset_symbol] = 0
+
+    def __iter__(self):
+        cols, _ = self.network.holdings.row(self.fund_index)
+        return iter([self.network.asset_symbols[j] for j in cols])
+
+    def __len__(self):
+        return len(self.network.holdings.row(self.fund_index)[0])
+
+    def items(self):
+        cols, shares = self.network.holdings.row(self.fund_index)
+        return [(self.network.asset_symbols[j], s) for j, s in zip(cols, shares.tolist())]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
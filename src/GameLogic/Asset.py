@@ -1,5 +1,14 @@
+from GameLogic.ArrayViews import NetworkField
+
 
 class Asset:
+    network = None
+    index = None
+    price = NetworkField('prices', setter='set_asset_price')
+    daily_volume = NetworkField('daily_volumes')
+    avg_minute_volume = NetworkField('avg_minute_volumes')
+    volatility = NetworkField('volatilities')
+
     def __init__(self, price, daily_volume, volatility, symbol):
         self.price = price
         self.daily_volume = daily_volume
@@ -13,3 +22,12 @@ class Asset:
     def __eq__(self, other):
         return isinstance(other, Asset) and self.price == other.price and self.daily_volume == other.daily_volume \
                and self.volatility == other.volatility and self.symbol == other.symbol
+
+    'copies and pickles hold the values, the network that owns the copy binds it again'
+    def __getstate__(self):
+        return {'price': self.price, 'daily_volume': self.daily_volume, 'avg_minute_volume': self.avg_minute_volume,
+                'symbol': self.symbol, 'volatility': self.volatility}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
@@ -1,6 +1,6 @@
 #!/usr/bin/python
 import json
-import random
+import os
 from math import floor
 
 import networkx as nx
@@ -11,17 +11,92 @@ from typing import Dict, List
 import jsonpickle
 
 from GameLogic import MarketImpactCalculator
-from GameLogic.Fund import Fund
+from GameLogic.ArrayViews import PortfolioView
+from GameLogic.Fund import Fund, compute_leverages, compute_margin_calls
 from GameLogic.Asset import Asset
-from GameLogic.Orders import Order
+from GameLogic.Holdings import make_holdings, DenseHoldings, SparseHoldings, sparse
+from GameLogic.MarketSetup import gen_connected_adjacency
+from GameLogic.Orders import Order, Sell, Move, OrderBatch
+from GameLogic.StateKey import KEY_DECIMALS, entry_keys, xor_keys, update_key
+from GameLogic.SysConfig import SysConfig
 
 'TODO: do we need the total market cap of assets or do funds hold the entire market'
 
+class CascadeResult:
+    def __init__(self, rounds, margin_calls, defaults, sold_shares):
+        self.rounds = rounds
+        self.margin_calls = margin_calls  # funds mask of the margin calls caused by the cascade
+        self.defaults = defaults  # funds mask of the defaults caused by the cascade
+        self.sold_shares = sold_shares  # shares liquidated per asset
+
+    def __repr__(self):
+        return 'rounds: ' + str(self.rounds) + ' margin calls: ' + str(numpy.flatnonzero(self.margin_calls)) + \
+               ' defaults: ' + str(numpy.flatnonzero(self.defaults))
+
+
+class CanonicalFormBuffer:
+    """ The canonical forms of a network along an episode, written into one preallocated (T, F, A) array that
+        doubles its length when it is full
+    """
+    def __init__(self, network, capacity=32, dtype=float):
+        self.network = network
+        self.size = 0
+        self.boards = numpy.empty((capacity,) + network.holdings.shape, dtype=dtype)
+
+    def __len__(self):
+        return self.size
+
+    def append(self):
+        if self.size == len(self.boards):
+            boards = numpy.empty((2 * len(self.boards),) + self.boards.shape[1:], dtype=self.boards.dtype)
+            boards[:self.size] = self.boards
+            self.boards = boards
+        self.network.get_canonical_form(out=self.boards[self.size])
+        self.size += 1
+
+    'a view of the boards appended so far'
+    def to_array(self):
+        return self.boards[:self.size]
+
+
+ASSET_ARRAYS = ['prices', 'daily_volumes', 'avg_minute_volumes', 'volatilities']
+FUND_ARRAYS = ['initial_capitals', 'initial_leverages', 'loans', 'tolerances', 'is_liquidating', 'is_in_default']
+SPARSE_HOLDINGS_ARRAYS = ['holdings_data', 'holdings_indices', 'holdings_indptr']
+
+
 class AssetFundsNetwork:
+    """ The funds and assets are views over the network arrays: fund i / asset j are row i / column j of the
+        holdings matrix, and their scalar attributes are entries of the fund / asset vectors.
+    """
     def __init__(self, funds: Dict[str, Fund], assets: Dict[str, Asset], mi_calc: MarketImpactCalculator, intraday_asset_gain_max_range =None):
         self.mi_calc = mi_calc
         self.funds = funds
         self.assets = assets
+        self.fund_symbols = list(funds.keys())
+        self.asset_symbols = list(assets.keys())
+        self.asset_index = {sym: j for j, sym in enumerate(self.asset_symbols)}
+
+        assets_list = list(assets.values())
+        self.prices = numpy.array([asset.price for asset in assets_list], dtype=float)
+        self.daily_volumes = numpy.array([asset.daily_volume for asset in assets_list], dtype=float)
+        self.avg_minute_volumes = numpy.array([asset.avg_minute_volume for asset in assets_list], dtype=float)
+        self.volatilities = numpy.array([asset.volatility for asset in assets_list], dtype=float)
+
+        funds_list = list(funds.values())
+        matrix = numpy.zeros((len(funds_list), len(assets_list)))
+        for i, fund in enumerate(funds_list):
+            for asset_symbol, num_shares in fund.portfolio.items():
+                matrix[i, self.asset_index[asset_symbol]] = num_shares
+        self.holdings = make_holdings(matrix)
+        self.initial_capitals = numpy.array([fund.initial_capital for fund in funds_list], dtype=float)
+        self.initial_leverages = numpy.array([fund.initial_leverage for fund in funds_list], dtype=float)
+        self.loans = numpy.array([fund.loan for fund in funds_list], dtype=float)
+        self.tolerances = numpy.array([fund.tolerance for fund in funds_list], dtype=float)
+        self.is_liquidating = numpy.array([fund.is_liquidating for fund in funds_list], dtype=bool)
+        self.is_in_default = numpy.array([fund.is_in_default for fund in funds_list], dtype=bool)
+        self.portfolio_values = self.holdings.dot(self.prices)
+        self.prices_key = self.compute_prices_key(KEY_DECIMALS)
+        self.bind_views()
         if intraday_asset_gain_max_range:
             self.run_intraday_simulation(intraday_asset_gain_max_range, 0.7)
 
@@ -32,50 +107,136 @@ class AssetFundsNetwork:
     def __repr__(self):
         return str(self.funds)
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.bind_views()
+
+    def bind_views(self):
+        for j, asset_symbol in enumerate(self.asset_symbols):
+            asset = self.assets[asset_symbol]
+            asset.network = self
+            asset.index = j
+        for i, fund_symbol in enumerate(self.fund_symbols):
+            fund = self.funds[fund_symbol]
+            fund.network = self
+            fund.index = i
+            fund.portfolio = PortfolioView(self, i)
+
+    'portfolio values are cached and only the funds exposed to a repriced asset are updated'
+    def compute_portfolio_values(self):
+        return self.portfolio_values
+
+    def compute_portfolio_value(self, fund_index):
+        return float(self.portfolio_values[fund_index])
+
+    def revalue_portfolios(self):
+        self.portfolio_values = self.holdings.dot(self.prices)
+
+    def set_asset_price(self, asset_index, new_price):
+        fund_indices, shares = self.holdings.column(asset_index)
+        self.portfolio_values[fund_indices] += (new_price - self.prices[asset_index]) * shares
+        self.prices_key = update_key(self.prices_key, [asset_index], [self.prices[asset_index]], [new_price])
+        self.prices[asset_index] = new_price
+
+    def set_prices(self, new_prices):
+        delta = new_prices - self.prices
+        changed = numpy.flatnonzero(delta)
+        if 2 * len(changed) > len(delta):
+            self.portfolio_values += self.holdings.dot(delta)
+        else:
+            for asset_index in changed:
+                fund_indices, shares = self.holdings.column(asset_index)
+                self.portfolio_values[fund_indices] += delta[asset_index] * shares
+        self.prices_key = update_key(self.prices_key, changed, self.prices[changed], new_prices[changed])
+        self.prices[:] = new_prices
+
+    'snapshot of the state that changes during a game, restored in place so the fund and asset views stay valid'
+    def snapshot(self):
+        return self.prices.copy(), self.prices_key, self.avg_minute_volumes.copy(), self.portfolio_values.copy(), \
+               self.is_liquidating.copy(), self.is_in_default.copy(), self.holdings.snapshot()
+
+    def restore(self, snapshot):
+        prices, self.prices_key, avg_minute_volumes, portfolio_values, is_liquidating, is_in_default, holdings = \
+            snapshot
+        self.prices[:] = prices
+        self.avg_minute_volumes[:] = avg_minute_volumes
+        self.portfolio_values[:] = portfolio_values
+        self.is_liquidating[:] = is_liquidating
+        self.is_in_default[:] = is_in_default
+        self.holdings.restore(holdings)
+
+    def compute_prices_key(self, decimals):
+        return xor_keys(entry_keys(numpy.arange(len(self.prices)), self.prices, decimals))
+
+    def state_key(self, decimals):
+        """ Bytes of the compact state: the keys of the prices and the holdings rounded to decimals, which are
+            kept up to date as they change for KEY_DECIMALS, and the fund flags
+        """
+        prices_key = self.prices_key if decimals == KEY_DECIMALS else self.compute_prices_key(decimals)
+        return numpy.uint64(prices_key).tobytes() + self.holdings.state_key(decimals) + \
+            numpy.packbits(self.is_liquidating).tobytes() + numpy.packbits(self.is_in_default).tobytes()
+
+    def set_holding(self, fund_index, asset_index, num_shares):
+        delta = num_shares - self.holdings.get(fund_index, asset_index)
+        self.portfolio_values[fund_index] += delta * self.prices[asset_index]
+        self.holdings.set(fund_index, asset_index, num_shares)
+
+    def compute_leverages(self):
+        return compute_leverages(self.compute_portfolio_values(), self.loans)
+
+    def evaluate_funds(self):
+        """ Returns the leverage vector, the margin call mask and the default mask of all the funds """
+        leverages = self.compute_leverages()
+        defaults = leverages == numpy.inf
+        margin_calls = compute_margin_calls(leverages, self.initial_leverages, self.tolerances) | defaults
+        return leverages, margin_calls, defaults
+
     def are_funds_leveraged_less_than(self, leverage_goal):
-        for fund in self.funds.values():
-            if leverage_goal < fund.compute_curr_leverage(self.assets):
-                return False
-        return True
+        return not (self.compute_leverages() > leverage_goal).any()
 
     def run_intraday_simulation_2(self, intraday_asset_gain_max_range):
         if (intraday_asset_gain_max_range < 1):
             raise ValueError
-        for asset in self.assets.values():
-            price_gain = random.uniform(1, intraday_asset_gain_max_range)
-            asset.set_price(asset.price * price_gain)
+        self.set_prices(self.prices * numpy.random.uniform(1, intraday_asset_gain_max_range, len(self.prices)))
 
     def run_intraday_simulation(self, intraday_asset_gain_max_range, leverage_goal):
         if intraday_asset_gain_max_range < 1:
             raise ValueError
         while not self.are_funds_leveraged_less_than(leverage_goal):
-            for asset in self.assets.values():
-                price_gain = random.uniform(1, intraday_asset_gain_max_range)
-                asset.set_price(asset.price * price_gain)
+            self.set_prices(self.prices * numpy.random.uniform(1, intraday_asset_gain_max_range, len(self.prices)))
 
     @classmethod
     def generate_random_network(cls, density, num_funds, num_assets, initial_capitals, initial_leverages,
-                                assets_initial_prices, tolerances, assets_num_shares, volatility, mi_calc: MarketImpactCalculator):
-        connected = False
-        while not connected:
-            g = nx.algorithms.bipartite.random_graph(num_funds, num_assets, density, directed=True)
-            connected = True
-            try:
-                fund_nodes, asset_nodes = nx.bipartite.sets(g)
-            except nx.AmbiguousSolution:
-                connected = False
-
-        investment_proportions = {}
-        for fund_node in list(fund_nodes):
-            fund_symbol = 'f' + str(fund_node)
-            investments = list(g.out_edges(fund_node))
-            rand = list(numpy.random.randint(1, 10, size=len(investments)))
-            rand_sum = sum(rand)
-            investment_proportions[fund_symbol] = [float(i) / rand_sum for i in rand]
-
-        return cls.gen_network_from_graph(g, investment_proportions, initial_capitals,
-                                          initial_leverages, assets_initial_prices,
-                                          tolerances, assets_num_shares, volatility, mi_calc)
+                                assets_initial_prices, tolerances, assets_num_shares, volatility, mi_calc: MarketImpactCalculator,
+                                pref_attach=0):
+        """ Every fund invests in each asset with probability density, or by preferential attachment if
+            pref_attach is not 0, see gen_connected_adjacency, and the network is always connected. The fund capital
+            times (1 + leverage) is split between its assets in random proportions.
+        """
+        rows, cols = gen_connected_adjacency(numpy.random.binomial(num_assets, density, num_funds), num_assets,
+                                             pref_attach)
+        prices = numpy.array(assets_initial_prices[:num_assets], dtype=float)
+        initial_capitals = numpy.array(initial_capitals[:num_funds], dtype=float)
+        initial_leverages = numpy.array(initial_leverages[:num_funds], dtype=float)
+        proportions = numpy.random.randint(1, 10, size=len(rows)).astype(float)
+        proportions /= numpy.bincount(rows, proportions, minlength=num_funds)[rows]
+        fund_capitals = initial_capitals * (1 + initial_leverages)
+        shares = numpy.floor(proportions * fund_capitals[rows] / prices[cols])
+        daily_volumes = numpy.array(assets_num_shares[:num_assets], dtype=float)
+        arrays = {'fund_symbols': numpy.array(['f' + str(i) for i in range(num_funds)]),
+                  'asset_symbols': numpy.array(['a' + str(j) for j in range(num_assets)]),
+                  'prices': prices, 'daily_volumes': daily_volumes, 'avg_minute_volumes': daily_volumes / (60 * 6.5),
+                  'volatilities': numpy.array(volatility[:num_assets], dtype=float),
+                  'initial_capitals': initial_capitals, 'initial_leverages': initial_leverages,
+                  'loans': initial_capitals * initial_leverages, 'tolerances': numpy.array(tolerances[:num_funds], dtype=float),
+                  'is_liquidating': numpy.zeros(num_funds, dtype=bool), 'is_in_default': numpy.zeros(num_funds, dtype=bool)}
+        if len(rows) < SysConfig.get(SysConfig.SPARSE_HOLDINGS_DENSITY) * num_funds * num_assets:
+            indptr = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(rows, minlength=num_funds))])
+            arrays.update(zip(SPARSE_HOLDINGS_ARRAYS, [shares, cols, indptr]))
+        else:
+            arrays['holdings'] = numpy.zeros((num_funds, num_assets))
+            arrays['holdings'][rows, cols] = shares
+        return cls.from_arrays(arrays, mi_calc)
 
     @classmethod
     def gen_network_from_graph(cls, g, investment_proportions,
@@ -103,8 +264,77 @@ class AssetFundsNetwork:
         return cls(funds, assets, mi_calc)
 
 
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, numpy.ndarray], mi_calc: MarketImpactCalculator):
+        """ Builds a network over the given arrays without copying them: fund_symbols, asset_symbols, the
+            ASSET_ARRAYS and FUND_ARRAYS, and either a dense holdings matrix or the SPARSE_HOLDINGS_ARRAYS of a
+            CSR matrix. The funds and assets are created as bare views.
+        """
+        network = cls.__new__(cls)
+        network.mi_calc = mi_calc
+        network.fund_symbols = [str(sym) for sym in arrays['fund_symbols'].tolist()]
+        network.asset_symbols = [str(sym) for sym in arrays['asset_symbols'].tolist()]
+        network.asset_index = {sym: j for j, sym in enumerate(network.asset_symbols)}
+        network.funds = {}
+        for sym in network.fund_symbols:
+            network.funds[sym] = Fund.__new__(Fund)
+            network.funds[sym].symbol = sym
+        network.assets = {}
+        for sym in network.asset_symbols:
+            network.assets[sym] = Asset.__new__(Asset)
+            network.assets[sym].symbol = sym
+        for name in ASSET_ARRAYS + FUND_ARRAYS:
+            setattr(network, name, arrays[name])
+        shape = (len(network.fund_symbols), len(network.asset_symbols))
+        if 'holdings' in arrays:
+            network.holdings = DenseHoldings(arrays['holdings'])
+        else:
+            data, indices, indptr = (arrays[name] for name in SPARSE_HOLDINGS_ARRAYS)
+            if sparse is not None:
+                network.holdings = SparseHoldings(sparse.csr_matrix((data, indices, indptr), shape=shape))
+            else:
+                matrix = numpy.zeros(shape)
+                matrix[numpy.repeat(numpy.arange(shape[0]), numpy.diff(indptr)), indices] = data
+                network.holdings = DenseHoldings(matrix)
+        network.portfolio_values = network.holdings.dot(network.prices)
+        network.prices_key = network.compute_prices_key(KEY_DECIMALS)
+        network.bind_views()
+        return network
+
+    def to_arrays(self):
+        arrays = {'fund_symbols': numpy.array(self.fund_symbols), 'asset_symbols': numpy.array(self.asset_symbols)}
+        for name in ASSET_ARRAYS + FUND_ARRAYS:
+            arrays[name] = getattr(self, name)
+        if self.holdings.is_sparse():
+            matrix = self.holdings.matrix
+            arrays.update(zip(SPARSE_HOLDINGS_ARRAYS, [matrix.data, matrix.indices, matrix.indptr]))
+        else:
+            arrays['holdings'] = self.holdings.to_dense()
+        return arrays
+
+    'a directory with one .npy file per array of to_arrays'
+    def save_arrays(self, dir_name):
+        os.makedirs(dir_name, exist_ok=True)
+        for name, array in self.to_arrays().items():
+            numpy.save(os.path.join(dir_name, name + '.npy'), array)
+
+    @classmethod
+    def load_arrays(cls, dir_name, mi_calc: MarketImpactCalculator, mmap_mode='c'):
+        """ Maps the arrays of save_arrays into memory, so processes loading the same network share its pages.
+            With the default copy on write mode the network can be played, and the changes stay in the process.
+        """
+        arrays = {}
+        for file_name in os.listdir(dir_name):
+            name, extension = os.path.splitext(file_name)
+            if extension == '.npy':
+                arrays[name] = numpy.load(os.path.join(dir_name, file_name), mmap_mode=mmap_mode)
+        return cls.from_arrays(arrays, mi_calc)
+
+    'a directory of save_arrays, or a json file of save_to_file'
     @classmethod
     def load_from_file(cls, file_name, mi_calc: MarketImpactCalculator):
+        if os.path.isdir(file_name):
+            return cls.load_arrays(file_name, mi_calc)
         class_dict = json.load(open(file_name))
         class_funds = class_dict['funds']
         class_assets = class_dict['assets']
@@ -119,17 +349,9 @@ class AssetFundsNetwork:
         with open(filename, 'w') as fp:
             json.dump(class_dict, fp)
 
-    def get_canonical_form(self):
-        num_funds = len(self.funds)
-        num_assets = len(self.assets)
-        board = numpy.zeros([num_funds, num_assets])
-        for i in range(num_funds):
-            fund = self.funds['f' + str(i)]
-            for j in range(num_assets):
-                sym = 'a' + str(j)
-                if sym in fund.portfolio:
-                    board[i, j] = fund.portfolio[sym] * self.assets[sym].price
-        return board
+    'the funds x assets board of holding values, written into out if given, e.g. a slot of a CanonicalFormBuffer'
+    def get_canonical_form(self, out=None):
+        return self.holdings.scale_columns(self.prices, out)
 
     def get_liquidation_orders(self):
         orders = []
@@ -138,22 +360,58 @@ class AssetFundsNetwork:
         return orders
 
     def update_funds(self):
-        for fund in self.funds.values():
-            fund.update_state(self.assets)
-
-    def apply_action_old(self, orders: List[Order]):
-        liquidation_orders = []
-        for order in orders:
-            asset = self.assets[order.asset_symbol]
-            new_price = asset.price * self.mi_calc.get_market_impact(order, asset)
-            asset.set_price(new_price)
-        for fund in self.funds.values():
-            if not fund.is_liquidated():
-                if fund.marginal_call(self.assets):
-                    liquidation_orders.extend(fund.gen_liquidation_orders())
-                    fund.liquidate()
-        if liquidation_orders:
-            self.apply_action(liquidation_orders)
+        _, margin_calls, defaults = self.evaluate_funds()
+        self.is_in_default |= defaults
+        self.is_liquidating |= margin_calls
+
+    def orders_to_shares(self, orders: Move):
+        batch = OrderBatch.from_orders(orders)
+        signed_shares = numpy.zeros(len(self.prices))
+        numpy.add.at(signed_shares, batch.indices(self.asset_index), batch.signed_shares())
+        return signed_shares
+
+    def apply_price_impact(self, signed_shares):
+        traded = numpy.flatnonzero(signed_shares)
+        new_prices = self.prices.copy()
+        new_prices[traded] *= self.mi_calc.get_market_impacts(signed_shares[traded], self.daily_volumes[traded],
+                                                              self.volatilities[traded], self.prices[traded])
+        self.set_prices(new_prices)
+
+    def gen_liquidation_shares(self, funds_mask):
+        """ Fund.gen_liquidation_orders for all the funds in the mask at once, returns the shares sold per asset """
+        if not funds_mask.any():
+            return numpy.zeros(len(self.prices))
+        limits = numpy.floor(self.avg_minute_volumes * SysConfig.get("MINUTE_VOLUME_LIMIT"))
+        sold_shares, sold_value = self.holdings.sell_down(funds_mask, limits, self.prices)
+        self.portfolio_values -= sold_value
+        return sold_shares
+
+    def run_cascade(self, orders: Move):
+        """ Applies the price impact of the orders, margin calls the funds whose leverage crossed their tolerance
+            and liquidates them, round after round, until no new fund gets a margin call.
+            Funds margin called on earlier turns keep selling a slice of their holdings along with the orders,
+            until they hold nothing. Orders are aggregated per asset in each round.
+        """
+        was_liquidating = self.is_liquidating.copy()
+        was_in_default = self.is_in_default.copy()
+        sold_shares = self.gen_liquidation_shares(was_liquidating)
+        signed_shares = self.orders_to_shares(orders) - sold_shares
+        rounds = 0
+        while signed_shares.any():
+            rounds += 1
+            self.apply_price_impact(signed_shares)
+            _, margin_calls, defaults = self.evaluate_funds()
+            new_margin_calls = margin_calls & ~self.is_liquidating
+            self.is_in_default |= defaults
+            self.is_liquidating |= margin_calls
+            liquidated_shares = self.gen_liquidation_shares(new_margin_calls)
+            sold_shares += liquidated_shares
+            signed_shares = -liquidated_shares
+        return CascadeResult(rounds, self.is_liquidating & ~was_liquidating, self.is_in_default & ~was_in_default,
+                             sold_shares)
+
+    def apply_action(self, orders: Move):
+        return self.run_cascade(orders)
 
 
 """
@@ -1,12 +1,42 @@
 from math import inf, floor
 from typing import Dict
 
+import numpy
+
+from GameLogic.ArrayViews import NetworkField
 from GameLogic.Asset import Asset
-from GameLogic.Orders import Sell
+from GameLogic.Orders import OrderBatch, asset_indices
 from GameLogic.SysConfig import SysConfig
 
 
+""" leverage = curr_portfolio_value / curr_capital -1
+   = curr_portfolio_value/(curr_portfolio_value - loan) -1
+   funds without positive capital have infinite leverage and are in default.
+   These work on vectors of all the funds as well as on a single fund.
+"""
+
+
+def compute_leverages(portfolio_values, loans):
+    capitals = portfolio_values - loans
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        return numpy.where(capitals > 0, portfolio_values / capitals - 1, inf)
+
+
+def compute_margin_calls(leverages, initial_leverages, tolerances):
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        return leverages / initial_leverages > tolerances
+
+
 class Fund:
+    network = None
+    index = None
+    initial_leverage = NetworkField('initial_leverages')
+    initial_capital = NetworkField('initial_capitals')
+    loan = NetworkField('loans')
+    tolerance = NetworkField('tolerances')
+    is_liquidating = NetworkField('is_liquidating')
+    is_in_default = NetworkField('is_in_default')
+
     def __init__(self, symbol, portfolio: Dict[str, int], initial_capital, initial_leverage, tolerance):
         self.symbol = symbol
         self.portfolio = portfolio
@@ -26,29 +56,45 @@ class Fund:
                self.tolerance == other.tolerance and \
                self.loan == other.loan
 
+    'copies and pickles hold the values, the network that owns the copy binds it again'
+    def __getstate__(self):
+        return {'symbol': self.symbol, 'portfolio': dict(self.portfolio.items()),
+                'initial_leverage': self.initial_leverage, 'initial_capital': self.initial_capital,
+                'loan': self.loan, 'tolerance': self.tolerance,
+                'is_liquidating': self.is_liquidating, 'is_in_default': self.is_in_default}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def update_state(self, assets):
         curr_leverage = self.compute_curr_leverage(assets)
         if curr_leverage == inf:
             self.is_in_default = True
             self.is_liquidating = True
         else:
-            if curr_leverage / self.initial_leverage > self.tolerance:
+            if compute_margin_calls(curr_leverage, self.initial_leverage, self.tolerance):
                 self.is_liquidating = True
 
     def gen_liquidation_orders(self, assets: Dict[str, Asset]):
-        orders = []
+        sold_symbols = []
+        sold_assets = []
+        shares_sold = []
         assets_to_remove = []
         for asset_symbol, num_shares in self.portfolio.items():
             asset = assets[asset_symbol]
             shares_limit = floor(asset.avg_minute_volume * SysConfig.get("MINUTE_VOLUME_LIMIT"))
             shares_to_sell = min(shares_limit, num_shares)
-            orders.append(Sell(asset_symbol, shares_to_sell, asset.price))
+            sold_symbols.append(asset_symbol)
+            sold_assets.append(asset)
+            shares_sold.append(shares_to_sell)
             self.portfolio[asset_symbol] -= shares_to_sell
             if self.portfolio[asset_symbol] == 0:
                 assets_to_remove.append(asset_symbol)
         for asset_symbol in assets_to_remove:
             self.portfolio.pop(asset_symbol)
-        return orders
+        return OrderBatch(sold_symbols, shares_sold, [asset.price for asset in sold_assets], True,
+                          asset_indices(sold_assets))
 
     def get_orders(self, assets: Dict[str, Asset]):
         if self.is_liquidating:
@@ -68,22 +114,16 @@ class Fund:
         return self.compute_portfolio_value(assets) - self.loan
 
     def compute_portfolio_value(self, assets):
+        if self.network is not None:
+            return self.network.compute_portfolio_value(self.index)
         v = 0
         for asset_symbol, num_shares in self.portfolio.items():
             v += num_shares * assets[asset_symbol].price
         return v
 
-    """ leverage = curr_portfolio_value / curr_capital -1
-       = curr_portfolio_value/(curr_portfolio_value - loan) -1
-    """
-
     def compute_curr_leverage(self, assets):
-        curr_portfolio_value = self.compute_portfolio_value(assets)
-        curr_capital = curr_portfolio_value - self.loan
-        if curr_capital <= 0:
-            return inf
-        return curr_portfolio_value / curr_capital - 1 #return self.compute_portfolio_value(assets) / self.capital - 1
+        return float(compute_leverages(self.compute_portfolio_value(assets), self.loan))
 
     def marginal_call(self, assets):
-        return self.compute_curr_leverage(assets) / self.initial_leverage > self.tolerance
+        return bool(compute_margin_calls(self.compute_curr_leverage(assets), self.initial_leverage, self.tolerance))
 
@@ -3,6 +3,7 @@ class GameConfig:
                  num_funds=10,
                  min_order_value=1000,
                  density=0.5,
+                 pref_attach=0,
                  asset_daily_volume=200000,
                  asset_volatility=1.2,
                  initial_asset_price=1000,
@@ -17,12 +18,21 @@ class GameConfig:
                  defender_initial_capital=6000000,
                  impact_calc_constant=1.0536,
                  intraday_asset_gain_max_range=1.1,
+                 uct_iterations=100,
+                 uct_workers=1,
+                 uct_parallel_mode='root',
+                 uct_table_capacity=0,
+                 uct_reuse_tree=True,
+                 uct_time_budget=None,
+                 uct_min_iterations=0,
+                 uct_early_stop=False,
                  verbose=False):
 
         self.num_assets = num_assets
         self.num_funds = num_funds
         self.min_order_value = min_order_value
         self.density = density
+        self.pref_attach = pref_attach
         self.asset_daily_volume = asset_daily_volume
         self.asset_volatility = asset_volatility
         self.initial_asset_price = initial_asset_price
@@ -37,6 +47,14 @@ class GameConfig:
         self.defender_initial_capital = defender_initial_capital
         self.impact_calc_constant = impact_calc_constant
         self.intraday_asset_gain_max_range = intraday_asset_gain_max_range
+        self.uct_iterations = uct_iterations
+        self.uct_workers = uct_workers
+        self.uct_parallel_mode = uct_parallel_mode
+        self.uct_table_capacity = uct_table_capacity
+        self.uct_reuse_tree = uct_reuse_tree
+        self.uct_time_budget = uct_time_budget
+        self.uct_min_iterations = uct_min_iterations
+        self.uct_early_stop = uct_early_stop
         self.verbose = verbose
 
 
@@ -4,14 +4,14 @@ from GameLogic import Market
 from GameLogic.Orders import Move, Order
 from GameLogic.AssetFundNetwork import AssetFundsNetwork
 from GameLogic.Players import Defender, Attacker
+from GameLogic.StateKey import KEY_DECIMALS
 
 
 class GameState:
-    def __init__(self, network: AssetFundsNetwork, players, market: Market):
+    def __init__(self, network: AssetFundsNetwork, players, market: Market = None):
         self.players = players
         self.network = network
         self.market = market
-        self.liquidators = []
         self.turn = 0
 
     def current_player(self):
@@ -20,6 +20,23 @@ class GameState:
     def move_turn(self):
         self.turn = (self.turn + 1) % len(self.players)
 
+    'snapshot/restore replace deep copies of the state, e.g. to replay from the root in every MCTS iteration'
+    def snapshot(self):
+        return self.turn, self.network.snapshot(), [player.snapshot() for player in self.players]
+
+    def restore(self, snapshot):
+        self.turn, network_snapshot, players_snapshots = snapshot
+        self.network.restore(network_snapshot)
+        for player, player_snapshot in zip(self.players, players_snapshots):
+            player.restore(player_snapshot)
+
+    def state_key(self, decimals=KEY_DECIMALS):
+        """ Hash of the turn, the network and the players. States that differ by less than the rounding of
+            prices, shares and capitals to decimals get the same key.
+        """
+        return hash((self.turn, self.network.state_key(decimals),
+                     tuple(player.state_key(decimals) for player in self.players)))
+
     def game_reward(self):
         raise NotImplementedError
 
@@ -35,6 +52,23 @@ class GameState:
     def gen_random_action(self):
         raise NotImplementedError
 
+    def get_action_space(self):
+        return self.current_player().get_action_space(self.network.assets)
+
+    'a state is terminal when the player to move has no valid action'
+    def is_terminal(self):
+        return not self.current_player().has_valid_action(self.network.assets)
+
+    def rollout(self, max_depth=None):
+        """ Plays random actions until the state is terminal or max_depth actions were played.
+            Returns the number of actions played.
+        """
+        depth = 0
+        while (max_depth is None or depth < max_depth) and not self.is_terminal():
+            self.apply_action(self.gen_random_action())
+            depth += 1
+        return depth
+
     def print_winner(self):
         if self.attacker.is_goal_achieved(self.network.funds):
             print('Attacker Won!')
@@ -83,10 +117,8 @@ class TwoPlayersSimultaneousGameState(GameState):
 
     def apply_action(self, action: List[Order]):
         self.players[self.turn].apply_action(action)
-        for liquidator in self.liquidators:
-            self.market.submit_sell_orders(liquidator.get_orders(self.network.assets))
-        self.market.apply_actions()
-        self.liquidators.append(self.network.get_liquidaton_orders(action))
+        self.players[1 - self.turn].observe_opponent(action)
+        self.network.apply_action(action)
         self.move_turn()
 
 
@@ -111,10 +143,8 @@ class TwoPlayersGameState(GameState):
 
     def apply_action(self, action: Move):
         self.players[self.turn].apply_action(action)
-        for liquidator in self.liquidators:
-            self.market.submit_sell_orders(liquidator.get_orders(self.network.assets))
-        self.market.apply_actions()
-        self.liquidators.append(self.network.get_liquidaton_orders(action))
+        self.players[1 - self.turn].observe_opponent(action)
+        self.network.apply_action(action)
         self.move_turn()
 
 
@@ -129,7 +159,7 @@ class SinglePlayerGameState(GameState):
         return self.attacker.game_reward(self.network)
 
     def game_ended(self):
-        return self.attacker.is_goal_achieved(self.network.funds)
+        return self.attacker.is_goal_achieved(self.network.funds) or self.attacker.resources_exhusted()
 
     def get_valid_actions(self):
         return self.attacker.get_valid_actions(self.network.assets)
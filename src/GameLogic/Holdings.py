@@ -0,0 +1,245 @@
+import warnings
+
+import numpy
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+from GameLogic.StateKey import KEY_DECIMALS, entry_keys, xor_keys, update_key
+from GameLogic.SysConfig import SysConfig
+
+
+class Holdings:
+    """ Funds x assets matrix of the number of shares each fund holds. key is the StateKey of the matrix, with
+        entry f * num_assets + a at position (f, a), and is updated on every change.
+    """
+
+    def __init__(self, num_funds, num_assets):
+        self.shape = (num_funds, num_assets)
+
+    def get(self, fund_index, asset_index):
+        raise NotImplementedError
+
+    def set(self, fund_index, asset_index, num_shares):
+        raise NotImplementedError
+
+    def row(self, fund_index):
+        """ Returns the (asset indices, shares) of the non zero holdings of a fund """
+        raise NotImplementedError
+
+    def column(self, asset_index):
+        """ Returns the (fund indices, shares) of the funds exposed to an asset, from the reverse index """
+        raise NotImplementedError
+
+    def dot(self, vector):
+        raise NotImplementedError
+
+    def sell_down(self, funds_mask, limits, prices):
+        """ Every fund in funds_mask sells min(limit, holding) of each asset it holds.
+            Returns the shares sold per asset and the value sold per fund.
+        """
+        raise NotImplementedError
+
+    def to_dense(self):
+        raise NotImplementedError
+
+    def scale_columns(self, vector, out=None):
+        """ The dense matrix with column j multiplied by vector[j], written into out if given """
+        raise NotImplementedError
+
+    def snapshot(self):
+        raise NotImplementedError
+
+    def restore(self, snapshot):
+        raise NotImplementedError
+
+    def compute_key(self, decimals):
+        raise NotImplementedError
+
+    def state_key(self, decimals):
+        """ Bytes of the key of the holdings rounded to decimals, kept up to date for KEY_DECIMALS """
+        key = self.key if decimals == KEY_DECIMALS else self.compute_key(decimals)
+        return numpy.uint64(key).tobytes()
+
+    def is_sparse(self):
+        return False
+
+
+class DenseHoldings(Holdings):
+    def __init__(self, matrix):
+        super().__init__(*matrix.shape)
+        self.matrix = numpy.asarray(matrix, dtype=float)
+        self.asset_funds = [numpy.flatnonzero(self.matrix[:, j]) for j in range(self.shape[1])]
+        self.key = self.compute_key(KEY_DECIMALS)
+
+    def get(self, fund_index, asset_index):
+        return self.matrix[fund_index, asset_index]
+
+    def set(self, fund_index, asset_index, num_shares):
+        if num_shares != 0 and self.matrix[fund_index, asset_index] == 0:
+            self.asset_funds[asset_index] = numpy.union1d(self.asset_funds[asset_index], [fund_index])
+        self.key = update_key(self.key, [fund_index * self.shape[1] + asset_index],
+                              [self.matrix[fund_index, asset_index]], [num_shares])
+        self.matrix[fund_index, asset_index] = num_shares
+
+    def row(self, fund_index):
+        fund_row = self.matrix[fund_index]
+        cols = numpy.flatnonzero(fund_row)
+        return cols, fund_row[cols]
+
+    def column(self, asset_index):
+        rows = self.asset_funds[asset_index]
+        return rows, self.matrix[rows, asset_index]
+
+    def dot(self, vector):
+        return self.matrix.dot(vector)
+
+    def sell_down(self, funds_mask, limits, prices):
+        rows = numpy.flatnonzero(funds_mask)
+        holdings = self.matrix[rows]
+        sold = numpy.minimum(holdings, limits)
+        self.matrix[rows] = holdings - sold
+        sold_rows, cols = numpy.nonzero(sold)
+        self.key = update_key(self.key, rows[sold_rows] * self.shape[1] + cols, holdings[sold_rows, cols],
+                              self.matrix[rows[sold_rows], cols])
+        sold_value = numpy.zeros(self.shape[0])
+        sold_value[rows] = sold.dot(prices)
+        return sold.sum(axis=0), sold_value
+
+    def to_dense(self):
+        return self.matrix
+
+    def scale_columns(self, vector, out=None):
+        return numpy.multiply(self.matrix, vector, out=out)
+
+    'funds never start holding an asset while the game runs, so the reverse index stays valid after a restore'
+    def snapshot(self):
+        return self.matrix.copy(), self.key
+
+    def restore(self, snapshot):
+        matrix, self.key = snapshot
+        self.matrix[:] = matrix
+
+    def compute_key(self, decimals):
+        positions = numpy.flatnonzero(self.matrix)
+        return xor_keys(entry_keys(positions, self.matrix.flat[positions], decimals))
+
+
+class SparseHoldings(Holdings):
+    """ CSR holdings. The sparsity structure only grows: holdings that drop to zero are kept as explicit zeros
+        so the data array can be updated in place.
+    """
+    def __init__(self, matrix):
+        super().__init__(*matrix.shape)
+        self.matrix = sparse.csr_matrix(matrix, dtype=float)
+        self.matrix.sort_indices()
+        self.structure_version = 0
+        self.build_reverse_index()
+        self.key = self.compute_key(KEY_DECIMALS)
+
+    def build_reverse_index(self):
+        """ Orders the positions in the data array by asset, so the funds exposed to an asset are a slice """
+        indptr = self.matrix.indptr
+        self.data_rows = numpy.repeat(numpy.arange(self.shape[0]), numpy.diff(indptr))
+        self.positions_by_asset = numpy.argsort(self.matrix.indices, kind='stable')
+        self.asset_ptr = numpy.searchsorted(self.matrix.indices[self.positions_by_asset],
+                                            numpy.arange(self.shape[1] + 1))
+
+    def _position(self, fund_index, asset_index):
+        start = self.matrix.indptr[fund_index]
+        end = self.matrix.indptr[fund_index + 1]
+        pos = start + numpy.searchsorted(self.matrix.indices[start:end], asset_index)
+        if pos < end and self.matrix.indices[pos] == asset_index:
+            return pos
+        return None
+
+    def get(self, fund_index, asset_index):
+        pos = self._position(fund_index, asset_index)
+        return 0.0 if pos is None else self.matrix.data[pos]
+
+    def set(self, fund_index, asset_index, num_shares):
+        pos = self._position(fund_index, asset_index)
+        self.key = update_key(self.key, [fund_index * self.shape[1] + asset_index],
+                              [0.0 if pos is None else self.matrix.data[pos]], [num_shares])
+        if pos is not None:
+            self.matrix.data[pos] = num_shares
+            return
+        if num_shares == 0:
+            return
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', sparse.SparseEfficiencyWarning)
+            self.matrix[fund_index, asset_index] = num_shares
+        self.matrix.sort_indices()
+        self.structure_version += 1
+        self.build_reverse_index()
+
+    def row(self, fund_index):
+        start = self.matrix.indptr[fund_index]
+        end = self.matrix.indptr[fund_index + 1]
+        data = self.matrix.data[start:end]
+        nonzero = data != 0
+        return self.matrix.indices[start:end][nonzero], data[nonzero]
+
+    def column(self, asset_index):
+        positions = self.positions_by_asset[self.asset_ptr[asset_index]:self.asset_ptr[asset_index + 1]]
+        return self.data_rows[positions], self.matrix.data[positions]
+
+    def dot(self, vector):
+        return self.matrix.dot(vector)
+
+    def sell_down(self, funds_mask, limits, prices):
+        positions = numpy.flatnonzero(funds_mask[self.data_rows])
+        assets = self.matrix.indices[positions]
+        holdings = self.matrix.data[positions]
+        sold = numpy.minimum(holdings, limits[assets])
+        self.matrix.data[positions] = holdings - sold
+        changed = sold != 0
+        self.key = update_key(self.key, self.data_rows[positions[changed]] * self.shape[1] + assets[changed],
+                              holdings[changed], self.matrix.data[positions[changed]])
+        sold_per_asset = numpy.bincount(assets, sold, minlength=self.shape[1])
+        sold_value = numpy.bincount(self.data_rows[positions], sold * prices[assets], minlength=self.shape[0])
+        return sold_per_asset, sold_value
+
+    def to_dense(self):
+        return self.matrix.toarray()
+
+    def scale_columns(self, vector, out=None):
+        if out is None:
+            out = numpy.zeros(self.shape)
+        else:
+            out[:] = 0
+        out[self.data_rows, self.matrix.indices] = self.matrix.data * vector[self.matrix.indices]
+        return out
+
+    def snapshot(self):
+        return self.structure_version, self.matrix.data.copy(), self.matrix.indices.copy(), \
+            self.matrix.indptr.copy(), self.key
+
+    def restore(self, snapshot):
+        structure_version, data, indices, indptr, self.key = snapshot
+        if structure_version == self.structure_version:
+            self.matrix.data[:] = data
+            return
+        self.matrix = sparse.csr_matrix((data.copy(), indices.copy(), indptr.copy()), shape=self.shape)
+        self.structure_version = structure_version
+        self.build_reverse_index()
+
+    def compute_key(self, decimals):
+        positions = self.data_rows * self.shape[1] + self.matrix.indices
+        return xor_keys(entry_keys(positions, self.matrix.data, decimals))
+
+    def is_sparse(self):
+        return True
+
+
+def make_holdings(matrix, use_sparse=None):
+    """ Picks the holdings representation by the density of the matrix, unless use_sparse is given. """
+    if use_sparse is None:
+        size = matrix.shape[0] * matrix.shape[1]
+        density = numpy.count_nonzero(matrix) / size if size else 1
+        use_sparse = density < SysConfig.get(SysConfig.SPARSE_HOLDINGS_DENSITY)
+    if use_sparse and sparse is not None:
+        return SparseHoldings(matrix)
+    return DenseHoldings(matrix)
@@ -1,99 +1,96 @@
 from typing import Dict, List
 
+import numpy
+
 from GameLogic.Asset import Asset
 from GameLogic.MarketImpactCalculator import MarketImpactCalculator
-from GameLogic.Orders import Buy, Sell, Order
-from GameLogic.SysConfig import SysConfig
+from GameLogic.Orders import Buy, Sell, Order, Move, OrderBatch
 
 
 class Market:
+    """ The order logs and minute volume counters are vectors aligned to the asset indices of a network, and
+        every step clears all the assets at once. The assets must be all the assets of a network, a network with
+        no funds for a market of bare assets, as in AssetFundsNetwork({}, assets, mic).
+    """
 
     def __init__(self, mic:MarketImpactCalculator, timestep_seconds, timestep_order_limit, assets: Dict[str, Asset]):
-        self.buy_orders_log = {}
-        self.sell_orders_log = {}
         self.mic = mic
         self.timestep_order_limit = timestep_order_limit
         self.timestep_seconds = timestep_seconds
         self.minute_counter = 0
-        self.minute_volume_counter = {}
         self.assets = assets
-        for sym, asset in assets.items():
-            self.minute_volume_counter[sym] = 0
-            self.buy_orders_log[sym] = 0
-            self.sell_orders_log[sym] = 0
-
+        self.network = self.bind_network(assets)
+        self.buy_orders = numpy.zeros(len(assets))
+        self.sell_orders = numpy.zeros(len(assets))
+        self.minute_volumes = numpy.zeros(len(assets))
+
+    @staticmethod
+    def bind_network(assets):
+        network = next(iter(assets.values())).network if assets else None
+        if network is None:
+            raise ValueError('the market assets must be bound to a network')
+        if network.asset_symbols != list(assets.keys()):
+            raise ValueError('the market assets must be all the assets of their network, in the same order')
+        return network
+
+    'dict views of the vectors, asset symbol -> shares'
+    @property
+    def buy_orders_log(self):
+        return dict(zip(self.network.asset_symbols, self.buy_orders.tolist()))
+
+    @property
+    def sell_orders_log(self):
+        return dict(zip(self.network.asset_symbols, self.sell_orders.tolist()))
+
+    @property
+    def minute_volume_counter(self):
+        return dict(zip(self.network.asset_symbols, self.minute_volumes.tolist()))
 
     def submit_sell_orders(self, orders:List[Sell]):
-        self.submit_orders(orders, self.sell_orders_log, Sell)
+        self.submit_orders(orders, self.sell_orders, Sell)
 
     def submit_buy_orders(self, orders: List[Buy]):
-        self.submit_orders(orders, self.buy_orders_log, Buy)
-
-    def submit_orders(self, orders: List[Order], orders_log, cls):
-        for order in orders:
-            if not isinstance(order, cls):
-                raise TypeError()
-            orders_log[order.asset_symbol] += order.num_shares
-
-    def update_symmetric_trades(self):
-        for order in self.orders:
-            if order.asset_symbol in self.buy_orders_log:
-                buy_order_size = self.buy_orders_log[order.asset_symbol]
-                traded_shares = min(buy_order_size, order.num_shares)
-                delta = buy_order_size - order.num_shares
-                if delta > 0:
-                    self.buy_orders_log[order.asset_symbol] -= delta
-                else:
-                    self.sell_orders_log[order.asset_symbol] -= delta
-                self.avg_minute_volume += traded_shares
-
-    def update_logs(self, delta, sym, buy, sell, asym_trade):
-        if delta < 0:  # supply > demand
-            self.buy_orders_log[sym] = 0
-            self.sell_orders_log[sym] = self.sell_orders_log[sym] - buy - asym_trade
-        else:
-            self.buy_orders_log[sym] = self.buy_orders_log[sym] - sell - asym_trade
-            self.sell_orders_log[sym] = 0
+        self.submit_orders(orders, self.buy_orders, Buy)
+
+    def submit_orders(self, orders: Move, orders_log, cls):
+        batch = OrderBatch.from_orders(orders)
+        if (batch.is_sell != issubclass(cls, Sell)).any():
+            raise TypeError()
+        numpy.add.at(orders_log, batch.indices(self.network.asset_index), batch.num_shares)
+
+    def update_logs(self, delta, buy, sell, asym_trade):
+        supply = delta < 0  # supply > demand
+        self.buy_orders = numpy.where(supply, 0, buy - sell - asym_trade)
+        self.sell_orders = numpy.where(supply, sell - buy - asym_trade, 0)
 
     def update_avg_minute_volume(self):
-        for sym, asset in self.assets.items():
-            # curr minute average is the previous minutes average + this minutes distressed trades
-            asset.avg_minute_volume = (asset.avg_minute_volume * 2 + self.minute_volume_counter[sym]) / 2
-            self.minute_volume_counter[sym] = 0
+        # curr minute average is the previous minutes average + this minutes distressed trades
+        self.network.avg_minute_volumes[:] = (self.network.avg_minute_volumes * 2 + self.minute_volumes) / 2
+        self.minute_volumes[:] = 0
 
     def apply_actions(self):
+        """ Trades the matching buy and sell shares of every asset, then up to timestep_order_limit times the
+            average minute volume of the remaining side, which moves the price. The rest stays in the logs.
+        """
         self.minute_counter += self.timestep_seconds
-        orders = self.buy_orders_log.keys() & self.sell_orders_log.keys()
-
-        for sym in orders:
-            asset = self.assets[sym]
-            buy = self.buy_orders_log[sym]
-            sell = self.sell_orders_log[sym]
-            sym_trade = min(buy, sell)
-            self.minute_volume_counter[sym] += sym_trade
-            delta = buy - sell
-            abs_delta = abs(delta)
-            limit = self.timestep_order_limit * asset.avg_minute_volume
-            asym_trade = min(abs_delta, limit)
-            self.minute_volume_counter[sym] += asym_trade
-            num_shares = asym_trade if delta > 0 else -1*asym_trade
-            new_price = self.mic.get_updated_price(num_shares, asset)
-            asset.set_price(new_price)
-            self.update_logs(delta, sym, buy, sell, asym_trade)
+        buy = self.buy_orders
+        sell = self.sell_orders
+        delta = buy - sell
+        limits = self.timestep_order_limit * self.network.avg_minute_volumes
+        asym_trade = numpy.minimum(numpy.abs(delta), limits)
+        self.minute_volumes += numpy.minimum(buy, sell) + asym_trade
+        self.update_logs(delta, buy, sell, asym_trade)
+        self.update_prices(numpy.where(delta > 0, asym_trade, -asym_trade))
         if self.minute_counter == 1:
             self.update_avg_minute_volume()
             self.minute_counter = 0
 
-
-
-    def submit_sell_orders_new(self, orders: List[Sell]):
-        for order in orders:
-            if order.asset_symbol in self.buy_orders_log:
-                buy_order_size = self.buy_orders_log[order.asset_symbol]
-                traded_shares = min(buy_order_size, order.num_shares)
-                delta = buy_order_size - order.num_shares
-                if delta > 0:
-                    self.buy_orders_log[order.asset_symbol] -= delta
-                else:
-                    self.sell_orders_log[order.asset_symbol] -= delta
-                self.avg_minute_volume += traded_shares
+    def update_prices(self, signed_shares):
+        network = self.network
+        traded = numpy.flatnonzero(signed_shares)
+        if not len(traded):
+            return
+        new_prices = network.prices.copy()
+        new_prices[traded] = self.mic.get_updated_prices(signed_shares[traded], network.daily_volumes[traded],
+                                                         network.volatilities[traded], network.prices[traded])
+        network.set_prices(new_prices)
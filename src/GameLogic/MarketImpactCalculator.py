@@ -1,4 +1,8 @@
 from math import exp, sqrt
+
+import numpy
+
+from GameLogic.Asset import Asset
 from GameLogic.Orders import Order, Sell, Buy
 
 
@@ -9,6 +13,21 @@ class MarketImpactCalculator:
     def get_updated_price(self, num_shares, asset):
         raise NotImplementedError
 
+    'array versions over signed num_shares (negative for sells), falling back to the single order methods'
+    def get_market_impacts(self, num_shares, daily_volumes, volatilities, prices):
+        impacts = numpy.empty(len(num_shares))
+        for i in range(len(num_shares)):
+            asset = Asset(prices[i], daily_volumes[i], volatilities[i], None)
+            order = Buy(None, num_shares[i], prices[i]) if num_shares[i] > 0 else Sell(None, -num_shares[i], prices[i])
+            impacts[i] = self.get_market_impact(order, asset)
+        return impacts
+
+    def get_updated_prices(self, num_shares, daily_volumes, volatilities, prices):
+        new_prices = numpy.empty(len(num_shares))
+        for i in range(len(num_shares)):
+            new_prices[i] = self.get_updated_price(num_shares[i], Asset(prices[i], daily_volumes[i], volatilities[i], None))
+        return new_prices
+
 
 class ExponentialMarketImpactCalculator(MarketImpactCalculator):
     def __init__(self, alpha):
@@ -24,6 +43,12 @@ class ExponentialMarketImpactCalculator(MarketImpactCalculator):
         frac_liquidated = num_shares / asset.daily_volume
         return asset.price * exp(self.alpha * frac_liquidated)
 
+    def get_market_impacts(self, num_shares, daily_volumes, volatilities, prices):
+        return numpy.exp(self.alpha * (num_shares / daily_volumes))
+
+    def get_updated_prices(self, num_shares, daily_volumes, volatilities, prices):
+        return prices * self.get_market_impacts(num_shares, daily_volumes, volatilities, prices)
+
 
 class SqrtMarketImpactCalculator(MarketImpactCalculator):
     def __init__(self, Y=0.5):
@@ -41,9 +66,15 @@ class SqrtMarketImpactCalculator(MarketImpactCalculator):
         frac_liquidated = num_shares / asset.daily_volume
         delta = sqrt(abs(frac_liquidated)) * self.Y * asset.volatility
         if frac_liquidated < 0:
-            return 1 - delta
+            return asset.price * (1 - delta)
         else:
-            return 1 + delta
-        raise ValueError
+            return asset.price * (1 + delta)
+
+    def get_market_impacts(self, num_shares, daily_volumes, volatilities, prices):
+        delta = numpy.sqrt(numpy.abs(num_shares) / daily_volumes) * self.Y * volatilities
+        return numpy.where(num_shares < 0, 1 - delta, 1 + delta)
+
+    def get_updated_prices(self, num_shares, daily_volumes, volatilities, prices):
+        return prices * self.get_market_impacts(num_shares, daily_volumes, volatilities, prices)
 
 
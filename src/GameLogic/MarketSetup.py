@@ -6,44 +6,69 @@ import numpy as np
 'TODO: factor in initial price and market cap of assets'
 
 
+def gen_spanning_tree(num_funds, num_assets):
+    """ (fund, asset) edges of a random tree over all the funds and assets. After a first fund and asset, the
+        nodes join in a random order and each is linked to a random node of the other side that joined before it.
+    """
+    if num_funds < 1 or num_assets < 1:
+        raise ValueError('a network needs at least one fund and one asset')
+    funds = np.random.permutation(num_funds)
+    assets = np.random.permutation(num_assets)
+    is_fund = np.zeros(num_funds + num_assets - 2, dtype=bool)
+    is_fund[:num_funds - 1] = True
+    np.random.shuffle(is_fund)
+    fund_positions = np.flatnonzero(is_fund)
+    asset_positions = np.flatnonzero(~is_fund)
+    assets_before = 1 + np.cumsum(~is_fund)[fund_positions]
+    funds_before = 1 + np.cumsum(is_fund)[asset_positions]
+    rows = np.concatenate([funds, funds[(np.random.random(len(asset_positions)) * funds_before).astype(int)]])
+    cols = np.concatenate([assets[:1], assets[(np.random.random(len(fund_positions)) * assets_before).astype(int)],
+                           assets[1:]])
+    return rows, cols
+
+
+def gen_connected_adjacency(fund_degrees, num_assets, pref_attach=0, chunk_size=256):
+    """ (fund, asset) edges of a connected bipartite network, sorted by fund and then by asset.
+        Fund i invests in fund_degrees[i] distinct assets, drawn with weights (asset degree + 1) ** pref_attach so
+        popular assets attract more funds (pref_attach > 0) or fewer (pref_attach < 0), and 0 is uniform. The
+        funds draw in chunks of chunk_size, with the asset degrees updated after each chunk. A random spanning
+        tree is added so the network is connected, which can add an edge to a fund.
+    """
+    num_funds = len(fund_degrees)
+    tree_rows, tree_cols = gen_spanning_tree(num_funds, num_assets)
+    rows = [tree_rows]
+    cols = [tree_cols]
+    asset_degrees = np.bincount(tree_cols, minlength=num_assets).astype(float)
+    fund_degrees = np.clip(np.asarray(fund_degrees, dtype=int), 0, num_assets)
+    for start in range(0, num_funds, chunk_size):
+        degrees = fund_degrees[start:start + chunk_size]
+        max_degree = degrees.max()
+        if not max_degree:
+            continue
+        'weighted sampling without replacement: the assets with the largest log(u) / weight keys'
+        keys = np.log1p(-np.random.random((len(degrees), num_assets))) / (asset_degrees + 1) ** pref_attach
+        top = np.argpartition(-keys, max_degree - 1, axis=1)[:, :max_degree]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1), axis=1)
+        chunk_cols = top[np.arange(max_degree) < degrees[:, None]]
+        rows.append(np.repeat(np.arange(start, start + len(degrees)), degrees))
+        cols.append(chunk_cols)
+        asset_degrees += np.bincount(chunk_cols, minlength=num_assets)
+    edges = np.unique(np.concatenate(rows).astype(np.int64) * num_assets + np.concatenate(cols))
+    return edges // num_assets, edges % num_assets
+
+
 def gen_bipartite_network(num_funds, num_assets, density, pref_attach, initial_capital, initial_leverage, sigma):
-    a = np.zeros((num_funds, num_assets), numpy.int8)
-    for i in range(num_funds):
-        investments = {}
-        total = a.sum(axis=1)
-        for j in range(num_assets):
-            investments[j] = total[j]
-        rank = [0] * num_assets
-        index = 1
-        rank_sum = 0
-        'Calculate preferential probability of selecting each asset'
-        for (k, v) in sorted(investments.items(), key=lambda kv: kv[1]):
-            asset_index = int(k)
-            rank[asset_index] = index
-            'prefer to scatter'
-            if pref_attach < 0:
-                rank[asset_index] = num_assets - rank[asset_index] + 1
-            rank_sum += pow(index, pref_attach)
-            index += 1
-
-        asset_selection_prob = [0] * num_assets
-        for j in range(num_assets):
-            asset_selection_prob[j] = rank[j]/rank_sum
-        'Calculate fund fractional investment to assets'
-        'TODO: factor in initial asset price and make sure values are multiplications of single share price'
-        frac = np.random.normal(density, sigma, 1)
-        k_fund = min(max(int(frac * num_assets), 1), num_assets)
-        'TODO: make sure distinct'
-        assets_selected = np.random.choice(num_assets, k_fund, False, asset_selection_prob)
-        'why is it important that its in descending order'
-        investment_portions = np.random.normal(0, 1, k_fund)
-        sum_inv = sum(investment_portions)
-        normed_investment_portions = list(map(lambda x: x/sum_inv, investment_portions))
-        for k in range(k_fund):
-            a[i][assets_selected[k]] = normed_investment_portions[k]
-        available_cash = initial_capital * (1 + initial_leverage)
-        for j in range(num_assets):
-            a[i][j] = int(round(available_cash * a[i][j]))
+    """ Funds x assets matrix of shares. The fraction of the assets a fund invests in is drawn from
+        N(density, sigma), the assets by gen_connected_adjacency, and the portions of the fund capital invested in
+        each asset from |N(0, 1)|.
+    """
+    degrees = np.clip((np.random.normal(density, sigma, num_funds) * num_assets).astype(int), 1, num_assets)
+    rows, cols = gen_connected_adjacency(degrees, num_assets, pref_attach)
+    portions = np.abs(np.random.normal(0, 1, len(rows)))
+    portions /= np.bincount(rows, portions, minlength=num_funds)[rows]
+    available_cash = initial_capital * (1 + initial_leverage)
+    a = np.zeros((num_funds, num_assets), dtype=np.int64)
+    a[rows, cols] = np.round(available_cash * portions)
     return a
 
 
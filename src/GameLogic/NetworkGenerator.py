@@ -20,7 +20,8 @@ def generate_rand_network(game_config: GameConfig):
                                                 initial_leverages, initial_prices,
                                                 tolerances, assets_num_shares,
                                                 volatility,
-                                                SqrtMarketImpactCalculator())
+                                                SqrtMarketImpactCalculator(),
+                                                game_config.pref_attach)
     return g
 
 
@@ -1,4 +1,6 @@
-from typing import List
+from typing import List, Union
+
+import numpy
 
 
 class Order:
@@ -32,7 +34,72 @@ class Sell(Order):
                + ' at ' + str(self.share_price)
 
 
-Move = List[Order]
+class OrderBatch:
+    """ Orders as parallel arrays: asset symbols, asset indices, numbers of shares, share prices and a mask of
+        the sells, or a single bool if all the orders are sells or all are buys. Iterating a batch yields its Buy
+        and Sell orders, so a batch is accepted wherever a list of orders is, and the network and the market add
+        it to their vectors with one scatter-add.
+        asset_indices are the indices of the assets in their network, None if the assets are not bound to one.
+    """
+    def __init__(self, asset_symbols, num_shares, share_prices, is_sell, asset_indices=None):
+        self.asset_symbols = list(asset_symbols)
+        self.num_shares = numpy.asarray(num_shares)
+        self.share_prices = numpy.asarray(share_prices)
+        if isinstance(is_sell, bool):
+            self.is_sell = numpy.full(len(self.num_shares), is_sell)
+        else:
+            self.is_sell = numpy.asarray(is_sell, dtype=bool)
+        self.asset_indices = None if asset_indices is None else numpy.asarray(asset_indices, dtype=numpy.intp)
+
+    @classmethod
+    def from_orders(cls, orders: List[Order]):
+        if isinstance(orders, OrderBatch):
+            return orders
+        orders = list(orders)
+        return cls([order.asset_symbol for order in orders], [order.num_shares for order in orders],
+                   [order.share_price for order in orders], [isinstance(order, Sell) for order in orders])
+
+    def indices(self, asset_index):
+        """ The asset index of every order, looked up by symbol in asset_index if the batch has none """
+        if self.asset_indices is None:
+            return numpy.array([asset_index[sym] for sym in self.asset_symbols], dtype=numpy.intp)
+        return self.asset_indices
+
+    'shares of the buys, minus shares of the sells'
+    def signed_shares(self):
+        num_shares = self.num_shares.astype(float)
+        return numpy.where(self.is_sell, -num_shares, num_shares)
+
+    def __len__(self):
+        return len(self.asset_symbols)
+
+    def __getitem__(self, i):
+        order_type = Sell if self.is_sell[i] else Buy
+        return order_type(self.asset_symbols[i], self.num_shares[i].item(), self.share_prices[i].item())
+
+    def __iter__(self):
+        for sym, num_shares, share_price, is_sell in zip(self.asset_symbols, self.num_shares.tolist(),
+                                                         self.share_prices.tolist(), self.is_sell.tolist()):
+            yield Sell(sym, num_shares, share_price) if is_sell else Buy(sym, num_shares, share_price)
+
+    def __eq__(self, other):
+        if not isinstance(other, (OrderBatch, list, tuple)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+'the network indices of the assets, None if they are not bound to a network'
+def asset_indices(assets):
+    indices = [asset.index for asset in assets]
+    return None if None in indices else indices
+
+
+Move = Union[List[Order], OrderBatch]
 
 """class Action:
     def __init__(self, orders: List[Order]):
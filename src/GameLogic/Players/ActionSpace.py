@@ -0,0 +1,127 @@
+import itertools
+import random
+from typing import List, Tuple
+
+import numpy
+
+from GameLogic.Orders import Order, Move, OrderBatch, Sell
+
+
+class AssetOrders:
+    """ The orders of one asset that actions can include, kept as arrays of share counts and costs.
+        Indexing returns an (order, cost) pair and builds the order.
+    """
+    def __init__(self, order_type, asset_symbol, share_price, num_shares, costs=None, asset_index=None):
+        self.order_type = order_type
+        self.is_sell = issubclass(order_type, Sell)
+        self.asset_symbol = asset_symbol
+        self.asset_index = asset_index
+        self.share_price = share_price
+        self.num_shares = numpy.array(num_shares, dtype=numpy.int64)
+        self.costs = None if costs is None else numpy.array(costs, dtype=float)
+
+    'options of a single asset given as (order, cost) pairs'
+    @classmethod
+    def from_pairs(cls, pairs: List[Tuple[Order, float]]):
+        first_order = pairs[0][0]
+        return cls(type(first_order), first_order.asset_symbol, first_order.share_price,
+                   [order.num_shares for order, _ in pairs], [cost for _, cost in pairs])
+
+    def __len__(self):
+        return len(self.num_shares)
+
+    def __getitem__(self, option):
+        return self.order_type(self.asset_symbol, self.num_shares[option].item(), self.share_price), \
+               self.cost(option)
+
+    def cost(self, option):
+        return 0 if self.costs is None else self.costs[option].item()
+
+
+class ActionSpace:
+    """ The actions of a player: every choice of 1 to max_assets_in_action assets, with one order for each
+        chosen asset. Actions are numbered from 0 to size - 1 and their orders are only built when decoded.
+        If a budget is given, actions whose orders cost more than the budget are invalid. The budget is
+        checked lazily, when an action is decoded, so size counts the invalid actions too.
+    """
+
+    'options holds the (order, cost) pairs of every asset, as AssetOrders or as lists of pairs'
+    def __init__(self, options: List[List[Tuple[Order, float]]], max_assets_in_action, budget=None):
+        self.options = [asset_options if isinstance(asset_options, AssetOrders) else AssetOrders.from_pairs(asset_options)
+                        for asset_options in options if asset_options]
+        self.max_assets_in_action = max_assets_in_action
+        self.budget = budget
+        self.counts = self.count_actions()
+        self.size = self.counts[0][max_assets_in_action] - 1
+
+    def count_actions(self):
+        """ counts[k][r] is the number of ways to pick at most r orders from assets k onwards, the empty pick
+            included, so counts[k][r] = counts[k + 1][r] + len(options[k]) * counts[k + 1][r - 1]
+        """
+        max_assets = self.max_assets_in_action
+        counts = [[1] * (max_assets + 1) for _ in range(len(self.options) + 1)]
+        for k in range(len(self.options) - 1, -1, -1):
+            for r in range(1, max_assets + 1):
+                counts[k][r] = counts[k + 1][r] + len(self.options[k]) * counts[k + 1][r - 1]
+        return counts
+
+    def picks(self, index):
+        """ Returns the (asset, option) pairs of an action """
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        index += 1  # index 0 is the empty pick
+        remaining = self.max_assets_in_action
+        picks = []
+        for k in range(len(self.options)):
+            if index == 0:
+                break
+            without_asset = self.counts[k + 1][remaining]
+            if index < without_asset:
+                continue
+            index -= without_asset
+            option, index = divmod(index, self.counts[k + 1][remaining - 1])
+            picks.append((k, option))
+            remaining -= 1
+        return picks
+
+    def cost(self, index):
+        return sum(self.options[k].cost(option) for k, option in self.picks(index))
+
+    def is_valid(self, index):
+        return self.budget is None or self.cost(index) <= self.budget
+
+    def decode(self, index) -> OrderBatch:
+        picks = [(self.options[k], option) for k, option in self.picks(index)]
+        asset_indices = [asset_orders.asset_index for asset_orders, _ in picks]
+        return OrderBatch([asset_orders.asset_symbol for asset_orders, _ in picks],
+                          [asset_orders.num_shares[option] for asset_orders, option in picks],
+                          [asset_orders.share_price for asset_orders, _ in picks],
+                          [asset_orders.is_sell for asset_orders, _ in picks],
+                          None if None in asset_indices else asset_indices)
+
+    def sample_index(self):
+        """ Uniform over the valid actions. Every single order is affordable, so a valid action exists. """
+        if self.size == 0:
+            return None
+        while True:
+            index = random.randrange(self.size)
+            if self.is_valid(index):
+                return index
+
+    def sample(self) -> OrderBatch:
+        index = self.sample_index()
+        return OrderBatch([], [], [], []) if index is None else self.decode(index)
+
+    def valid_indices(self):
+        for index in range(self.size):
+            if self.is_valid(index):
+                yield index
+
+    def single_valid_index(self):
+        """ The index of the only valid action, or None if there are none or more than one """
+        indices = list(itertools.islice(self.valid_indices(), 2))
+        return indices[0] if len(indices) == 1 else None
+
+    def __iter__(self):
+        for index in self.valid_indices():
+            yield self.decode(index)
@@ -1,9 +1,10 @@
 import random
 from typing import List, Dict
 
+from GameLogic.Players.ActionSpace import ActionSpace, AssetOrders
 from GameLogic.Players.Players import Player
 from GameLogic.SysConfig import SysConfig
-from GameLogic.Orders import Sell
+from GameLogic.Orders import Sell, OrderBatch, asset_indices
 from GameLogic.AssetFundNetwork import Asset, Fund
 
 
@@ -18,6 +19,16 @@ class Attacker(Player):
             self.resources_exhusted_flag = True
         return self.resources_exhusted_flag
 
+    def snapshot(self):
+        return super().snapshot(), self.resources_exhusted_flag
+
+    def restore(self, snapshot):
+        player_snapshot, self.resources_exhusted_flag = snapshot
+        super().restore(player_snapshot)
+
+    def state_key(self, decimals):
+        return super().state_key(decimals), self.resources_exhusted_flag
+
     def is_goal_achieved(self, funds: Dict[str, Fund]):
         for fund_symbol in self.goals:
             if not funds[fund_symbol].is_in_margin_call():
@@ -52,6 +63,33 @@ class Attacker(Player):
             self.resources_exhusted_flag = True
         return orders
 
+    'the actions of get_valid_actions, numbered and built on demand'
+    def get_action_space(self, assets: Dict[str, Asset]):
+        min_order_value = SysConfig.get(SysConfig.MIN_ORDER_VALUE)
+        options = []
+        for sym, num_shares in self.portfolio.items():
+            asset = assets[sym]
+            price = asset.price
+            shares = []
+            for i in range(1, self.asset_slicing + 1):
+                shares_to_sell = int(i * num_shares / self.asset_slicing)
+                if price * shares_to_sell < min_order_value:  # ignore small orders
+                    continue
+                shares.append(shares_to_sell)
+            options.append(AssetOrders(Sell, sym, price, shares, asset_index=asset.index))
+        action_space = ActionSpace(options, self.max_assets_in_action)
+        if not action_space.size:
+            self.resources_exhusted_flag = True
+        return action_space
+
+    'selling the whole holding is the largest order of an asset, if it is below the minimum so are the rest'
+    def has_valid_action(self, assets: Dict[str, Asset]):
+        min_order_value = SysConfig.get(SysConfig.MIN_ORDER_VALUE)
+        for sym, num_shares in self.portfolio.items():
+            if assets[sym].price * int(num_shares) >= min_order_value:
+                return True
+        return False
+
     def gen_single_asset_orders(self, assets: List[Asset]):
         if not assets:
             return []
@@ -107,19 +145,15 @@ class Attacker(Player):
         return orders_list
 
     def gen_random_action(self, assets: Dict[str, Asset] = None):
-        orders = []
         portfolio_assets = list(self.portfolio.keys())
         num_assets = min(len(portfolio_assets), random.randint(1, self.max_assets_in_action))
-        chosen_assets = random.sample(portfolio_assets, num_assets)
-
-        for sym in chosen_assets:
-            asset = assets[sym]
+        chosen_assets = [assets[sym] for sym in random.sample(portfolio_assets, num_assets)]
+        shares_to_sell = []
+        for asset in chosen_assets:
             portion = random.randint(1, self.asset_slicing)
-            shares_to_sell = int(portion * self.portfolio[asset.symbol] / self.asset_slicing)
-            order = Sell(asset.symbol, shares_to_sell, asset.price)
-            orders.append(order)
-
-        return orders
+            shares_to_sell.append(int(portion * self.portfolio[asset.symbol] / self.asset_slicing))
+        return OrderBatch([asset.symbol for asset in chosen_assets], shares_to_sell,
+                          [asset.price for asset in chosen_assets], True, asset_indices(chosen_assets))
 
     def __str__(self):
         return 'Attacker'
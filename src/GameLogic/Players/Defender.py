@@ -2,10 +2,12 @@ import random
 from math import floor
 from typing import List, Dict
 
+from GameLogic.Players.ActionSpace import ActionSpace, AssetOrders
 from GameLogic.Players.Players import Player
 from GameLogic.SysConfig import SysConfig
-from GameLogic.Orders import  Order, Buy
+from GameLogic.Orders import  Move, Order, Buy, OrderBatch, asset_indices
 from GameLogic.AssetFundNetwork import Asset, Fund
+from GameLogic.Players.GoalPosterior import GoalPosterior
 
 class Defender(Player):
     def __init__(self, initial_capital, asset_slicing, max_assets_in_action):
@@ -22,6 +24,16 @@ class Defender(Player):
 
         'TODO: make sure we dont get to very small numbers'
 
+    def snapshot(self):
+        return super().snapshot(), self.resources_exhusted_flag
+
+    def restore(self, snapshot):
+        player_snapshot, self.resources_exhusted_flag = snapshot
+        super().restore(player_snapshot)
+
+    def state_key(self, decimals):
+        return super().state_key(decimals), self.resources_exhusted_flag
+
     def apply_order(self, order: Buy):
         if not isinstance(order, Buy):
             raise ValueError("attacker only buys")
@@ -53,11 +65,12 @@ class Defender(Player):
         return orders_list
 
     def gen_random_action(self, assets: Dict[str, Asset] = None):
-        orders = []
+        assets_to_buy = []
+        shares_to_buy = []
         num_assets = random.randint(1, self.max_assets_in_action)
         chosen_assets = random.sample(list(assets.values()), num_assets)
         action_required_capital = 0
-        while not orders: #in case no valid orders for the entire iteration
+        while not assets_to_buy: #in case no valid orders for the entire iteration
             i = 0
             while i < num_assets and action_required_capital < self.initial_capital:
                 asset = chosen_assets[i]
@@ -65,11 +78,48 @@ class Defender(Player):
                 order_required_capital = portion * asset.price * asset.daily_volume/ self.asset_slicing
                 if order_required_capital + action_required_capital > self.initial_capital:
                     portion = int(floor((self.initial_capital * self.asset_slicing) / (asset.price * asset.daily_volume)))
-                order = Buy(asset.symbol, portion*chosen_assets[i].daily_volume/self.asset_slicing, asset.price)
                 action_required_capital += order_required_capital
-                orders.append(order)
+                assets_to_buy.append(asset)
+                shares_to_buy.append(portion*chosen_assets[i].daily_volume/self.asset_slicing)
                 i += 1
-        return orders
+        return OrderBatch([asset.symbol for asset in assets_to_buy], shares_to_buy,
+                          [asset.price for asset in assets_to_buy], False, asset_indices(assets_to_buy))
+
+    'the actions of get_valid_actions, numbered and built on demand. The capital is checked when an action is decoded'
+    def get_action_space(self, assets: Dict[str, Asset]):
+        min_order_value = SysConfig.get(SysConfig.MIN_ORDER_VALUE)
+        options = []
+        for asset in assets.values():
+            price = asset.price
+            daily_volume = asset.daily_volume
+            shares = []
+            costs = []
+            buy_slice = 1
+            capital_jump = price * daily_volume / self.asset_slicing
+            capital_needed = capital_jump
+            while buy_slice <= self.asset_slicing and capital_needed <= self.initial_capital:
+                shares_to_buy = int(daily_volume * buy_slice / self.asset_slicing)
+                buy_slice += 1
+                if price * shares_to_buy < min_order_value:  # ignore small orders
+                    continue
+                shares.append(shares_to_buy)
+                costs.append(capital_needed)
+                capital_needed += capital_jump
+            options.append(AssetOrders(Buy, asset.symbol, price, shares, costs, asset.index))
+        action_space = ActionSpace(options, self.max_assets_in_action, self.initial_capital)
+        if not action_space.size:
+            self.resources_exhusted_flag = True
+        return action_space
+
+    'an asset has orders if its first slice is affordable and buying all the slices is above the minimum'
+    def has_valid_action(self, assets: Dict[str, Asset]):
+        min_order_value = SysConfig.get(SysConfig.MIN_ORDER_VALUE)
+        for asset in assets.values():
+            if asset.price * asset.daily_volume / self.asset_slicing > self.initial_capital:
+                continue
+            if asset.price * int(asset.daily_volume * self.asset_slicing / self.asset_slicing) >= min_order_value:
+                return True
+        return False
 
     def gen_single_asset_orders(self, assets: List[Asset]):
         orders_list = []
@@ -171,13 +221,29 @@ class OracleDefender(Defender):
         return 'Oracle Defender'
 
 class NNDefender(Defender):
-    def __init__(self, initial_capital, asset_slicing, max_assets_in_action, neural_network):
+    """ Weighs every fund in margin call by the probability that it is a goal of the attacker, from a
+        GoalPosterior that observes the attacker moves
+    """
+    def __init__(self, initial_capital, asset_slicing, max_assets_in_action, goal_posterior: GoalPosterior):
         super().__init__(initial_capital, asset_slicing, max_assets_in_action)
-        self.neural_network = neural_network
+        self.goal_posterior = goal_posterior
 
-    def game_reward(self, funds: Dict[str, Fund], history):
-        reward = 0
-        for fund in funds:
-            if funds[fund].is_liquidated():
-                reward -= self.neural_network.predict(fund.symbol, history)
-        return reward
+    def observe_opponent(self, orders: Move):
+        self.goal_posterior.observe(orders)
+
+    def snapshot(self):
+        return super().snapshot(), self.goal_posterior.snapshot()
+
+    def restore(self, snapshot):
+        defender_snapshot, posterior_snapshot = snapshot
+        super().restore(defender_snapshot)
+        self.goal_posterior.restore(posterior_snapshot)
+
+    def state_key(self, decimals):
+        return super().state_key(decimals), self.goal_posterior.state_key(decimals)
+
+    def game_reward(self, funds: Dict[str, Fund], history=None):
+        return -float(self.goal_posterior.probabilities.dot(self.goal_posterior.network.is_liquidating))
+
+    def __repr__(self):
+        return 'NN Defender'
@@ -0,0 +1,58 @@
+from math import log
+
+import numpy
+
+from GameLogic.AssetFundNetwork import AssetFundsNetwork
+from GameLogic.Orders import Move, OrderBatch
+
+
+class GoalPosterior:
+    """ The probability that each fund is a goal of the attacker, kept as independent per-fund log-odds that
+        are updated with every attacker move, so the probabilities are always at hand.
+        The attacker holds the assets of its goal funds, so an asset it sells is held by a goal fund with
+        probability hit_rate, and by any other fund as often as that fund holds assets at all, its density.
+        Every sold asset thus adds log(hit_rate / density) to the log-odds of the funds that held it when the
+        posterior was created, and log((1 - hit_rate) / (1 - density)) to the others.
+    """
+    def __init__(self, network: AssetFundsNetwork, prior=0.5, hit_rate=0.9):
+        self.network = network
+        num_funds = len(network.fund_symbols)
+        num_assets = len(network.asset_symbols)
+        self.asset_holders = []
+        num_held = numpy.zeros(num_funds)
+        for asset_index in range(num_assets):
+            rows, shares = network.holdings.column(asset_index)
+            self.asset_holders.append(rows[shares > 0])
+            num_held[self.asset_holders[-1]] += 1
+        density = numpy.clip(num_held / num_assets, 0.5 / num_assets, 1 - 0.5 / num_assets)
+        self.hit_log_odds = numpy.log(hit_rate / density)
+        self.miss_log_odds = numpy.log((1 - hit_rate) / (1 - density))
+        self.log_odds = numpy.full(num_funds, log(prior / (1 - prior)))
+        self.update_probabilities()
+
+    def update_probabilities(self):
+        self.probabilities = 1 / (1 + numpy.exp(-self.log_odds))
+
+    def move_log_odds(self, orders: Move):
+        """ The log-likelihood ratio of the sells of orders for every fund """
+        batch = OrderBatch.from_orders(orders)
+        sold_assets = batch.indices(self.network.asset_index)[batch.signed_shares() < 0]
+        log_odds = len(sold_assets) * self.miss_log_odds
+        for asset_index in sold_assets:
+            holders = self.asset_holders[asset_index]
+            log_odds[holders] += self.hit_log_odds[holders] - self.miss_log_odds[holders]
+        return log_odds
+
+    def observe(self, orders: Move):
+        self.log_odds += self.move_log_odds(orders)
+        self.update_probabilities()
+
+    def snapshot(self):
+        return self.log_odds.copy()
+
+    def restore(self, snapshot):
+        self.log_odds[:] = snapshot
+        self.update_probabilities()
+
+    def state_key(self, decimals):
+        return (numpy.round(self.log_odds, decimals) + 0.0).tobytes()
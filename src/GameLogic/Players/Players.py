@@ -11,10 +11,25 @@ class Player:
         self.max_assets_in_action = max_assets_in_action
         self.asset_slicing = asset_slicing
 
+    def snapshot(self):
+        return self.initial_capital, dict(self.portfolio)
+
+    def restore(self, snapshot):
+        self.initial_capital, portfolio = snapshot
+        self.portfolio = dict(portfolio)
+
+    def state_key(self, decimals):
+        return round(self.initial_capital, decimals), \
+               tuple(sorted((sym, round(num_shares, decimals)) for sym, num_shares in self.portfolio.items()))
+
     def apply_action(self, orders: Move):
         for order in orders:
             self.apply_order(order)
 
+    'called with the moves of the other players'
+    def observe_opponent(self, orders: Move):
+        pass
+
     def get_valid_actions(self, assets: Dict[str, Asset]):
         raise NotImplementedError
 
@@ -22,6 +37,13 @@ class Player:
     def gen_random_action(self, assets: Dict[str, Asset]):
         raise NotImplementedError
 
+    def get_action_space(self, assets: Dict[str, Asset]):
+        raise NotImplementedError
+
+    'same as bool(get_valid_actions(assets)) without building the actions and without changing the player'
+    def has_valid_action(self, assets: Dict[str, Asset]):
+        raise NotImplementedError
+
     def is_legal(self, orders: List[Order]):
         return True
 
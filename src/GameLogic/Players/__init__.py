@@ -0,0 +1,5 @@
+from GameLogic.Players.ActionSpace import ActionSpace
+from GameLogic.Players.GoalPosterior import GoalPosterior
+from GameLogic.Players.Players import Player
+from GameLogic.Players.Attacker import Attacker
+from GameLogic.Players.Defender import Defender, RobustDefender, OracleDefender, NNDefender
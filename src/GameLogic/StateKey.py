@@ -0,0 +1,37 @@
+import numpy
+
+KEY_DECIMALS = 4
+
+_GOLDEN = numpy.uint64(0x9e3779b97f4a7c15)
+_SHIFTS = tuple(numpy.uint64(shift) for shift in (30, 27, 31))
+_MULTIPLIERS = (numpy.uint64(0xbf58476d1ce4e5b9), numpy.uint64(0x94d049bb133111eb))
+
+
+def mix(x):
+    'the splitmix64 finalizer, over uint64 arrays'
+    x = (x ^ (x >> _SHIFTS[0])) * _MULTIPLIERS[0]
+    x = (x ^ (x >> _SHIFTS[1])) * _MULTIPLIERS[1]
+    return x ^ (x >> _SHIFTS[2])
+
+
+def entry_keys(positions, values, decimals=KEY_DECIMALS):
+    """ 64 bit keys of the (position, value rounded to decimals) entries of an array, 0 for zero values.
+        The key of an array is the xor of the keys of its entries, so it is updated entry by entry as entries
+        change, as in Zobrist hashing, and does not depend on which zero entries are stored.
+    """
+    quantized = numpy.round(numpy.asarray(values, dtype=float) * 10 ** decimals).astype(numpy.int64)
+    keys = mix(numpy.asarray(positions, dtype=numpy.uint64) * _GOLDEN + quantized.view(numpy.uint64))
+    keys[quantized == 0] = 0
+    return keys
+
+
+def xor_keys(keys):
+    return numpy.bitwise_xor.reduce(keys, initial=numpy.uint64(0))
+
+
+def update_key(key, positions, old_values, new_values):
+    """ key with the entries at positions changed from old_values to new_values """
+    if len(positions) == 0:
+        return key
+    return key ^ xor_keys(entry_keys(numpy.concatenate([positions, positions]),
+                                     numpy.concatenate([old_values, new_values])))
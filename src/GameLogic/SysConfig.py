@@ -1,10 +1,12 @@
 class SysConfig:
     MIN_ORDER_VALUE = "MIN_ORDER_VALUE"
     DENSITY = "DENSITY"
+    SPARSE_HOLDINGS_DENSITY = "SPARSE_HOLDINGS_DENSITY"
 
     __conf = {"MIN_ORDER_VALUE": 1000,
               "MINUTE_VOLUME_LIMIT": 0.09,
-              "DENSITY": 0.5
+              "DENSITY": 0.5,
+              "SPARSE_HOLDINGS_DENSITY": 0.1
               }
 
     @staticmethod
@@ -18,6 +20,16 @@ class SysConfig:
         else:
             raise NameError("Name not accepted in set() method")
 
+    'used to hand the configuration to worker processes'
+    @staticmethod
+    def get_all():
+        return dict(SysConfig.__conf)
+
+    @staticmethod
+    def set_all(conf):
+        for name, value in conf.items():
+            SysConfig.set(name, value)
+
 """
 
     MIN_ORDER_VALUE = "MIN_ORDER_VALUE"
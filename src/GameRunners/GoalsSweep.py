@@ -0,0 +1,82 @@
+import os
+
+import numpy
+
+
+class GoalsSweep:
+    """ The non empty goal sets over num_funds funds, in the order of itertools.product([0, 1], repeat=num_funds).
+        Goal set i is built from the bits of i, fund j is a goal if bit num_funds - 1 - j is set, so the sets are
+        never materialized. The indices are split into shards of shard_size goal sets and the completed shards are
+        kept as a bitmap in checkpoint_file, so a restarted sweep skips them.
+    """
+    def __init__(self, num_funds, shard_size=64, checkpoint_file=None):
+        self.num_funds = num_funds
+        self.shard_size = shard_size
+        self.checkpoint_file = checkpoint_file
+        self.num_goal_sets = 2 ** num_funds - 1
+        self.num_shards = -(-self.num_goal_sets // shard_size)
+        self.completed = numpy.zeros(self.num_shards, dtype=bool)
+        if checkpoint_file and os.path.isfile(checkpoint_file):
+            self.load_checkpoint()
+
+    def __len__(self):
+        return self.num_goal_sets
+
+    def goals(self, index):
+        """ The goal set with the given index, 0 is the first non empty set """
+        bits = index + 1
+        return ['f' + str(j) for j in range(self.num_funds) if bits >> (self.num_funds - 1 - j) & 1]
+
+    def goal_sets(self, start=0, stop=None):
+        stop = self.num_goal_sets if stop is None else min(stop, self.num_goal_sets)
+        for index in range(start, stop):
+            yield self.goals(index)
+
+    def shard_goal_sets(self, shard):
+        return self.goal_sets(shard * self.shard_size, (shard + 1) * self.shard_size)
+
+    def pending_shards(self):
+        return numpy.flatnonzero(~self.completed).tolist()
+
+    def complete(self, shard):
+        self.completed[shard] = True
+        if self.checkpoint_file:
+            self.save_checkpoint()
+
+    def is_done(self):
+        return bool(self.completed.all())
+
+    def run(self, process_shard, pool=None):
+        """ Calls process_shard(shard, goal_sets) for every pending shard and records it as completed when it
+            returns. With a pool, idle workers take the next pending shard, one shard at a time, so slow shards
+            do not hold back the rest. process_shard must then be picklable.
+        """
+        shards = self.pending_shards()
+        if pool is None:
+            for shard in shards:
+                process_shard(shard, list(self.shard_goal_sets(shard)))
+                self.complete(shard)
+            return
+        tasks = ((process_shard, self.num_funds, self.shard_size, shard) for shard in shards)
+        for shard in pool.imap_unordered(_run_shard, tasks, chunksize=1):
+            self.complete(shard)
+
+    def save_checkpoint(self):
+        tmp_file = self.checkpoint_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            numpy.savez(f, num_funds=self.num_funds, shard_size=self.shard_size,
+                        completed=numpy.packbits(self.completed))
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def load_checkpoint(self):
+        with numpy.load(self.checkpoint_file) as checkpoint:
+            if checkpoint['num_funds'] != self.num_funds or checkpoint['shard_size'] != self.shard_size:
+                raise ValueError('checkpoint ' + self.checkpoint_file + ' is of a different sweep')
+            self.completed = numpy.unpackbits(checkpoint['completed'], count=self.num_shards).astype(bool)
+
+
+'the goal sets of a shard are built in the worker, so only the shard indices are sent to the pool'
+def _run_shard(task):
+    process_shard, num_funds, shard_size, shard = task
+    process_shard(shard, list(GoalsSweep(num_funds, shard_size).shard_goal_sets(shard)))
+    return shard
@@ -1,7 +1,5 @@
 #from __future__ import division
 
-from copy import deepcopy
-
 # This is a very simple implementation of the UCT Monte Carlo Tree Search algorithm in Python 2.7.
 # The function UCT(rootstate, itermax, verbose = False) is towards the bottom of the code.
 # It aims to have the clearest and simplest possible code, and for the sake of clarity, the code
@@ -19,57 +17,415 @@ from copy import deepcopy
 #
 # For more information about Monte Carlo Tree Search check out our web site at www.mcts.ai
 
+from collections import OrderedDict
 from math import *
 import random
+import time
+
+import numpy
 
 from GameLogic import GameState
 from GameLogic.Orders import Move
 from GameLogic.AssetFundNetwork import AssetFundsNetwork
 from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator
 from GameLogic.Players import Attacker, RobustDefender, OracleDefender
+from GameLogic.StateKey import KEY_DECIMALS
+
+
+class StatsPool:
+    """ Wins and visits of the searched states in two arrays, the stats of a node are a slot in them.
+        The arrays grow by doubling. With a transposition table, refs counts the table entry and the tree nodes
+        that use a slot, and a slot is put on the free list for reuse once nothing uses it.
+    """
+    def __init__(self, capacity=1024):
+        self.visits = numpy.zeros(capacity, dtype=numpy.int64)
+        self.wins = numpy.zeros(capacity)
+        self.refs = numpy.zeros(capacity, dtype=numpy.int64)
+        self.size = 0
+        self.free = []
+
+    def new_slot(self):
+        if self.free:
+            slot = self.free.pop()
+            self.visits[slot] = 0
+            self.wins[slot] = 0
+            return slot
+        if self.size == len(self.visits):
+            self.visits = numpy.concatenate([self.visits, numpy.zeros_like(self.visits)])
+            self.wins = numpy.concatenate([self.wins, numpy.zeros_like(self.wins)])
+            self.refs = numpy.concatenate([self.refs, numpy.zeros_like(self.refs)])
+        self.size += 1
+        return self.size - 1
+
+    def acquire(self, slots):
+        numpy.add.at(self.refs, slots, 1)
+
+    def release(self, slots):
+        numpy.subtract.at(self.refs, slots, 1)
+        self.free.extend(numpy.unique(slots[self.refs[slots] == 0]).tolist())
+
+
+class TranspositionTable:
+    """ Statistics of the states searched so far, keyed by GameState.state_key. Nodes of the same state share
+        one stats slot, however the state was reached. Holds at most capacity states, and evicts the least
+        recently used one when full. Nodes keep the slot of an evicted state, it is just no longer shared, and
+        the slot is reused once no live tree has a node on it.
+    """
+    def __init__(self, capacity=100000, decimals=KEY_DECIMALS):
+        self.capacity = capacity
+        self.decimals = decimals
+        self.pool = StatsPool()
+        self.slots = OrderedDict()
+
+    def get(self, state: GameState):
+        """ Return the stats slot of state """
+        key = state.state_key(self.decimals)
+        slot = self.slots.get(key)
+        if slot is None:
+            if len(self.slots) >= self.capacity:
+                _, evicted = self.slots.popitem(last=False)
+                self.pool.release(numpy.array([evicted]))
+            slot = self.pool.new_slot()
+            self.pool.refs[slot] += 1
+            self.slots[key] = slot
+        else:
+            self.slots.move_to_end(key)
+        return slot
+
+    def __len__(self):
+        return len(self.slots)
+
+
+class TreeStore:
+    """ The nodes of a search tree as rows of arrays that grow by doubling. Moves are kept as the index of the
+        action in the action space of the parent node, the wins and visits as a slot of a StatsPool, and the
+        children of a node as a block of the edges array. A full block is moved to the end of the array with
+        twice the size.
+        Action spaces are built when a node is first expanded, and the tried actions of a node are dropped
+        once it is fully expanded. policies keeps the evaluations of the nodes of a PUCT search.
+    """
+    NODE_ARRAYS = ['parent', 'action_index', 'slot', 'player', 'num_untried', 'edge_start', 'edge_count',
+                   'edge_capacity']
+
+    def __init__(self, players, table: TranspositionTable = None, exploration_constant=2, capacity=64):
+        self.players = players
+        self.table = table
+        self.pool = table.pool if table is not None else StatsPool()
+        self.exploration_constant = exploration_constant
+        self.size = 0
+        self.parent = numpy.full(capacity, -1, dtype=numpy.int64)
+        self.action_index = numpy.full(capacity, -1, dtype=numpy.int64)
+        self.slot = numpy.zeros(capacity, dtype=numpy.int64)
+        self.player = numpy.zeros(capacity, dtype=numpy.int8)  # index in players of the node's playerJustMoved
+        self.num_untried = numpy.full(capacity, -1, dtype=numpy.int64)  # -1 until the action space is built
+        self.edge_start = numpy.zeros(capacity, dtype=numpy.int64)
+        self.edge_count = numpy.zeros(capacity, dtype=numpy.int64)
+        self.edge_capacity = numpy.zeros(capacity, dtype=numpy.int64)
+        self.edges = numpy.zeros(4 * capacity, dtype=numpy.int64)
+        self.priors = numpy.ones(4 * capacity)
+        self.num_edges = 0
+        self.action_spaces = {}
+        self.tried_actions = {}
+        self.remaining_actions = {}
+        self.next_untried = {}
+        self.policies = {}
+
+    def add_node(self, state: GameState, parent=-1, action_index=-1):
+        if self.size == len(self.parent):
+            for name in self.NODE_ARRAYS:
+                array = getattr(self, name)
+                setattr(self, name, numpy.concatenate([array, numpy.zeros_like(array)]))
+        node = self.size
+        self.size += 1
+        self.parent[node] = parent
+        self.action_index[node] = action_index
+        if self.table is not None:
+            self.slot[node] = self.table.get(state)
+            self.pool.refs[self.slot[node]] += 1
+        else:
+            self.slot[node] = self.pool.new_slot()
+        self.player[node] = self.players.index(state.current_player())
+        self.num_untried[node] = -1
+        self.edge_start[node] = self.edge_count[node] = self.edge_capacity[node] = 0
+        return node
+
+    'the slots of the nodes of a tree over a transposition table can be reused once the tree is freed'
+    def __del__(self):
+        if self.table is not None:
+            self.pool.release(self.slot[:self.size])
+
+    def reserve_edges(self, num_edges):
+        if self.num_edges + num_edges > len(self.edges):
+            new_size = max(2 * len(self.edges), self.num_edges + num_edges)
+            self.edges = numpy.concatenate([self.edges, numpy.zeros(new_size - len(self.edges), dtype=numpy.int64)])
+            self.priors = numpy.concatenate([self.priors, numpy.ones(new_size - len(self.priors))])
+        start = self.num_edges
+        self.num_edges += num_edges
+        return start
+
+    def add_edge(self, node, child, prior=1.0):
+        start = self.edge_start[node]
+        count = self.edge_count[node]
+        if count == self.edge_capacity[node]:
+            capacity = max(4, 2 * count)
+            new_start = self.reserve_edges(capacity)
+            self.edges[new_start:new_start + count] = self.edges[start:start + count]
+            self.priors[new_start:new_start + count] = self.priors[start:start + count]
+            self.edge_start[node] = start = new_start
+            self.edge_capacity[node] = capacity
+        self.edges[start + count] = child
+        self.priors[start + count] = prior
+        self.edge_count[node] = count + 1
+
+    def children(self, node):
+        start = self.edge_start[node]
+        return self.edges[start:start + self.edge_count[node]]
+
+    def build_action_space(self, node, state: GameState):
+        """ Builds the action space of node, state must be the state of node """
+        if node not in self.action_spaces:
+            space = state.get_action_space()
+            self.action_spaces[node] = space
+            self.num_untried[node] = space.size
+            self.tried_actions[node] = set()
+            self.next_untried[node] = None
+
+    def pick_untried(self, node):
+        """ Return the index of a random untried valid action of node, or None if there is none.
+            Samples indices while most of the action space is untried. Afterwards the remaining indices are
+            shuffled once into remaining_actions, and later picks pop from it.
+        """
+        space = self.action_spaces[node]
+        tried = self.tried_actions[node]
+        remaining = self.remaining_actions.get(node)
+        while self.num_untried[node] > 0:
+            if remaining is None and len(tried) * 2 < space.size:
+                index = random.randrange(space.size)
+                if index in tried:
+                    continue
+            else:
+                if remaining is None:
+                    remaining = [i for i in range(space.size) if i not in tried]
+                    random.shuffle(remaining)
+                    self.remaining_actions[node] = remaining
+                index = remaining.pop()
+            if space.is_valid(index):
+                return index
+            tried.add(index)
+            self.num_untried[node] -= 1
+        self.tried_actions[node] = None
+        self.remaining_actions.pop(node, None)
+        return None
+
+    def has_untried(self, node):
+        """ Picks the next untried action of node if there is one. The pick is kept until it is expanded. """
+        if self.num_untried[node] == 0:
+            return False
+        if self.next_untried[node] is None:
+            self.next_untried[node] = self.pick_untried(node)
+        return self.next_untried[node] is not None
+
+    def add_child(self, node, index, state: GameState, prior=1.0):
+        """ Marks action index of node as tried and adds a child node for it, state must be the state after the
+            action. Returns the child node.
+        """
+        child = self.add_node(state, node, index)
+        self.add_edge(node, child, prior)
+        self.num_untried[node] -= 1
+        self.next_untried[node] = None
+        if self.num_untried[node]:
+            self.tried_actions[node].add(index)
+        else:
+            self.tried_actions[node] = None
+            self.remaining_actions.pop(node, None)
+        return child
+
+    def move(self, node):
+        parent = self.parent[node]
+        if parent < 0:
+            return None
+        return self.action_spaces[parent].decode(int(self.action_index[node]))
+
+    def update(self, node, result):
+        slot = self.slot[node]
+        self.pool.visits[slot] += 1
+        self.pool.wins[slot] += result
+
+    def extract(self, root):
+        """ Return a store of the subtree of root, where root is node 0. Without a transposition table the
+            statistics are copied to a new pool, so the rest of the tree can be freed.
+        """
+        nodes = [root]
+        for node in nodes:
+            nodes.extend(self.children(node).tolist())
+        nodes = numpy.array(nodes, dtype=numpy.int64)
+        size = len(nodes)
+        new_ids = numpy.full(self.size, -1, dtype=numpy.int64)
+        new_ids[nodes] = numpy.arange(size)
+        tree = TreeStore(self.players, self.table, self.exploration_constant, capacity=size)
+        tree.size = size
+        for name in self.NODE_ARRAYS:
+            getattr(tree, name)[:size] = getattr(self, name)[nodes]
+        tree.parent[:size] = numpy.where(tree.parent[:size] >= 0, new_ids[tree.parent[:size]], -1)
+        tree.parent[0] = -1
+        tree.action_index[0] = -1
+        counts = tree.edge_count[:size]
+        tree.edge_capacity[:size] = counts
+        tree.edge_start[:size] = numpy.cumsum(counts) - counts
+        tree.reserve_edges(int(counts.sum()))
+        for new_id, node in enumerate(nodes.tolist()):
+            start = tree.edge_start[new_id]
+            tree.edges[start:start + counts[new_id]] = new_ids[self.children(node)]
+            old_start = self.edge_start[node]
+            tree.priors[start:start + counts[new_id]] = self.priors[old_start:old_start + counts[new_id]]
+        if self.table is not None:
+            tree.pool.acquire(tree.slot[:size])
+        else:
+            tree.pool = StatsPool(capacity=size)
+            tree.pool.size = size
+            tree.pool.visits[:size] = self.pool.visits[tree.slot[:size]]
+            tree.pool.wins[:size] = self.pool.wins[tree.slot[:size]]
+            tree.slot[:size] = numpy.arange(size)
+        for name in ['action_spaces', 'tried_actions', 'remaining_actions', 'next_untried', 'policies']:
+            side_data = getattr(self, name)
+            setattr(tree, name, {int(new_ids[node]): value for node, value in side_data.items() if new_ids[node] >= 0})
+        return tree
 
 
 class Node:
-    """ A node in the game tree. Note wins is always from the viewpoint of playerJustMoved.
-        Crashes if state not specified.
+    """ A node in the game tree, a view of a row of a TreeStore. Note wins is always from the viewpoint of
+        playerJustMoved.
+        Node(state=...) starts a new tree with the state as its root, which crashes if state is not specified.
+        The wins and visits are a slot of a StatsPool, and with a transposition table the slot is that of the
+        node state, shared by all its nodes.
     """
 
-    def __init__(self, move: Move  =None, parent =None, state: GameState =None, exploration_constant = 2):
-        self.move = move  # the move that got us to this node - "None" for the root node
-        self.parentNode = parent  # "None" for the root node
-        self.childNodes = []
-        self.wins = 0
-        self.visits = 0
-        self.untriedMoves = state.get_valid_actions()  # future child nodes
-        self.playerJustMoved = state.current_player()  # the only part of the state that the Node needs later
-        self.explorationConstant = exploration_constant
+    def __init__(self, tree: TreeStore = None, index=0, state: GameState = None, exploration_constant=2,
+                 table: TranspositionTable = None):
+        if tree is None:
+            tree = TreeStore(state.players, table, exploration_constant)
+            index = tree.add_node(state)
+            tree.build_action_space(index, state)
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    @property
+    def move(self):
+        return self.tree.move(self.index)  # the move that got us to this node - "None" for the root node
+
+    @property
+    def actionIndex(self):
+        index = self.tree.action_index[self.index]  # the index of move in the action space of the parent node
+        return None if index < 0 else int(index)
+
+    @property
+    def parentNode(self):
+        parent = self.tree.parent[self.index]
+        return None if parent < 0 else Node(self.tree, int(parent))  # "None" for the root node
+
+    @property
+    def childNodes(self):
+        return [Node(self.tree, child) for child in self.tree.children(self.index).tolist()]
+
+    def NumChildren(self):
+        return int(self.tree.edge_count[self.index])
+
+    @property
+    def actionSpace(self):
+        return self.tree.action_spaces[self.index]  # future child nodes, decoded on demand
+
+    @property
+    def numUntriedMoves(self):
+        return int(self.tree.num_untried[self.index])
+
+    @property
+    def nextUntriedMove(self):
+        return self.tree.next_untried[self.index]
+
+    @property
+    def playerJustMoved(self):
+        return self.tree.players[self.tree.player[self.index]]
+
+    @property
+    def explorationConstant(self):
+        return self.tree.exploration_constant
+
+    @property
+    def pool(self):
+        return self.tree.pool
+
+    @property
+    def slot(self):
+        return self.tree.slot[self.index]
+
+    @property
+    def wins(self):
+        return self.tree.pool.wins[self.slot]
+
+    @wins.setter
+    def wins(self, wins):
+        self.tree.pool.wins[self.slot] = wins
+
+    @property
+    def visits(self):
+        return self.tree.pool.visits[self.slot]
+
+    @visits.setter
+    def visits(self, visits):
+        self.tree.pool.visits[self.slot] = visits
+
+    def ChildVisits(self):
+        return self.tree.pool.visits[self.tree.slot[self.tree.children(self.index)]]
 
     def UCTSelectChild(self):
         """ Use the UCB1 formula to select a child node. Often a constant UCTK is applied so we have
             lambda c: c.wins/c.visits + UCTK * sqrt(2*log(self.visits)/c.visits to vary the amount of
             exploration versus exploitation.
+            On ties the last child is selected.
         """
-        s = sorted(self.childNodes, key=lambda c: c.wins / c.visits + sqrt(self.explorationConstant * log(self.visits) / c.visits))[-1]
-        return s
+        children = self.tree.children(self.index)
+        slots = self.tree.slot[children]
+        visits = self.tree.pool.visits[slots]
+        ucb = self.tree.pool.wins[slots] / visits + numpy.sqrt(self.explorationConstant * log(self.visits) / visits)
+        return Node(self.tree, int(children[len(ucb) - 1 - int(numpy.argmax(ucb[::-1]))]))
+
+    def BuildActionSpace(self, state: GameState):
+        self.tree.build_action_space(self.index, state)
+
+    def HasUntriedMoves(self):
+        """ Picks the next untried move if there is one. The pick is kept in nextUntriedMove until it is expanded.
+        """
+        return self.tree.has_untried(self.index)
+
+    def SubtreeForMove(self, m):
+        """ Return the child node of move m as the root of a new tree, so the rest of the tree can be freed, or
+            None if m was not expanded. Used to continue searching after m is played.
+        """
+        for child in self.childNodes:
+            if child.move == m:
+                return Node(self.tree.extract(child.index))
+        return None
 
-    def AddChild(self, m, s):
-        """ Remove m from untriedMoves and add a new child node for this move.
+    def AddChild(self, index, s, prior=1.0):
+        """ Mark the action index as tried and add a new child node for it, s is the state after the action.
             Return the added child node
         """
-        n = Node(move=m, parent=self, state=s)
-        self.untriedMoves.remove(m)
-        self.childNodes.append(n)
-        return n
+        return Node(self.tree, self.tree.add_child(self.index, index, s, prior))
 
     def Update(self, result):
         """ Update this node - one additional visit and result additional wins. result must be from the viewpoint of playerJustmoved.
         """
-        self.visits += 1
-        self.wins += result
+        self.tree.update(self.index, result)
 
     def __repr__(self):
         return "[M:" + str(self.move) + " W/V:" + str(self.wins) + "/" + str(self.visits) + " U:" + str(
-            self.untriedMoves) + "]"
+            self.numUntriedMoves) + "]"
 
     def TreeToString(self, indent):
         s = self.IndentString(indent) + str(self)
@@ -90,37 +446,115 @@ class Node:
         return s
 
 
-def UCT(rootstate: GameState, itermax, verbose=False):
-    """ Conduct a UCT search for itermax iterations starting from rootstate.
-        Return the best move from the rootstate.
-        Assumes 2 alternating players (player 1 starts), with game results in the range [0.0, 1.0]."""
+def SelectAndExpand(rootnode: Node, state: GameState):
+    """ Descend from rootnode, applying the moves to state, and expand one untried move if the node reached has one.
+        Return the node reached.
+    """
+    node = rootnode
+
+    # Select
+    while not node.HasUntriedMoves() and node.NumChildren():  # node is fully expanded and non-terminal
+        node = node.UCTSelectChild()
+        state.apply_action(node.move)
+        node.BuildActionSpace(state)
+
+    # Expand
+    if node.HasUntriedMoves():  # if we can expand (i.e. state/node is non-terminal)
+        index = node.nextUntriedMove
+        state.apply_action(node.actionSpace.decode(index))
+        node = node.AddChild(index, state)  # add child and descend tree
+    return node
+
 
-    rootnode = Node(state=rootstate)
+def Backpropagate(node: Node, state: GameState):
+    """ Update the nodes from node back to the root. state is terminal, the result of a node is from the
+        viewpoint of its playerJustMoved.
+    """
+    tree = node.tree
+    results = [state.GetResult(player) for player in tree.players]
+    index = node.index
+    while index >= 0:
+        tree.update(index, results[tree.player[index]])
+        index = tree.parent[index]
+
+
+def BestMove(rootnode: Node):
+    if not rootnode.NumChildren():
+        index = rootnode.actionSpace.single_valid_index()
+        return [] if index is None else rootnode.actionSpace.decode(index)
+    visits = rootnode.ChildVisits()
+    best = rootnode.tree.children(rootnode.index)[len(visits) - 1 - int(numpy.argmax(visits[::-1]))]
+    return Node(rootnode.tree, int(best)).move  # return the move that was most visited
+
+
+def CanBeOvertaken(rootnode: Node, remaining):
+    """ Whether remaining more iterations can change the most visited child of rootnode """
+    visits = rootnode.ChildVisits()
+    if rootnode.HasUntriedMoves():
+        visits = numpy.append(visits, 0)
+    if len(visits) < 2:
+        return False
+    first, second = numpy.partition(visits, len(visits) - 2)[-2:][::-1]
+    return first - second <= remaining
+
+
+def UCTSearch(rootstate: GameState, itermax, table: TranspositionTable = None, rootnode: Node = None,
+              time_budget=None, min_iterations=0, early_stop=False, check_interval=10):
+    """ Conduct a UCT search for at most itermax iterations starting from rootstate and return the root node.
+        rootstate is restored to its initial state when the search is done.
+        The statistics in table are shared by the nodes of the same state, and kept for the next searches.
+        If rootnode is given, a tree of rootstate from an earlier search, the search continues it.
+        The search stops after time_budget seconds, and with early_stop once the most visited child cannot be
+        overtaken in the iterations left, but not before min_iterations. Both are checked every check_interval
+        iterations. With a single valid action there is nothing to search, and BestMove returns that action.
+    """
+    if rootnode is None:
+        rootnode = Node(state=rootstate, table=table)
+    else:
+        rootnode.BuildActionSpace(rootstate)
+        if not rootnode.actionSpace.size:
+            rootstate.get_action_space()  # marks the player's resources as exhausted, as creating the root node does
+    root_snapshot = rootstate.snapshot()
+    if rootnode.actionSpace.single_valid_index() is not None:
+        itermax = 0
+    start = time.perf_counter()
 
     for i in range(itermax):
-        node = rootnode
-        state = deepcopy(rootstate)
-
-        # Select
-        while node.untriedMoves == [] and node.childNodes != []:  # node is fully expanded and non-terminal
-            node = node.UCTSelectChild()
-            state.apply_action(node.move)
-
-        # Expand
-        if node.untriedMoves != []:  # if we can expand (i.e. state/node is non-terminal)
-            m = random.choice(node.untriedMoves)
-            state.apply_action(m)
-            node = node.AddChild(m, state)  # add child and descend tree
-
-        # Rollout - this can often be made orders of magnitude quicker using a state.GetRandomMove() function
-        while state.get_valid_actions() != []:  # while state is non-terminal
-            state.apply_action(state.gen_random_action())
-
-        # Backpropagate
-        while node != None:  # backpropagate from the expanded node and work back to the root node
-            node.Update(state.GetResult(
-                node.playerJustMoved))  # state is terminal. Update node with result from POV of node.playerJustMoved
-            node = node.parentNode
+        state = rootstate
+        node = SelectAndExpand(rootnode, state)
+
+        # Rollout - random actions until the state is terminal, without enumerating the valid actions
+        state.rollout()
+
+        Backpropagate(node, state)
+
+        # Replay the next iteration from the root
+        state.restore(root_snapshot)
+
+        done = i + 1
+        if done < min_iterations or done % check_interval:
+            continue
+        remaining = itermax - done
+        if time_budget is not None:
+            elapsed = time.perf_counter() - start
+            if elapsed >= time_budget:
+                break
+            if elapsed > 0:
+                remaining = min(remaining, int(done * (time_budget - elapsed) / elapsed) + 1)
+        if early_stop and not CanBeOvertaken(rootnode, remaining):
+            break
+    return rootnode
+
+
+def UCT(rootstate: GameState, itermax, verbose=False, table: TranspositionTable = None, rootnode: Node = None,
+        return_tree=False, time_budget=None, min_iterations=0, early_stop=False):
+    """ Conduct a UCT search for itermax iterations starting from rootstate.
+        Return the best move from the rootstate, and the searched tree if return_tree is set.
+        rootnode is a tree of rootstate to continue, e.g. rootnode.SubtreeForMove(m) of the previous search.
+        time_budget, min_iterations and early_stop end the search before itermax, see UCTSearch.
+        Assumes 2 alternating players (player 1 starts), with game results in the range [0.0, 1.0]."""
+
+    rootnode = UCTSearch(rootstate, itermax, table, rootnode, time_budget, min_iterations, early_stop)
 
     # Output some information about the tree - can be omitted
     if (verbose):
@@ -128,14 +562,15 @@ def UCT(rootstate: GameState, itermax, verbose=False):
 #    else:
 #        print(rootnode.ChildrenToString())
 
-    if not rootnode.childNodes:
-       return rootnode.childNodes
-    return sorted(rootnode.childNodes, key=lambda c: c.visits)[-1].move  # return the move that was most visited
+    if return_tree:
+        return BestMove(rootnode), rootnode
+    return BestMove(rootnode)
 
 
-def UCTPlayTwoPlayersGame():
+def UCTPlayTwoPlayersGame(itermax=100, workers=1, parallel_mode='root'):
     """ Play a sample game between two UCT players where each player gets a different number
         of UCT iterations (= simulations = tree nodes).
+        With more than one worker the searches run in a ParallelUCT process pool.
     """
     # state = OthelloState(4) # uncomment to play Othello on a square board of the given size
     # state = OXOState() # uncomment to play OXO
@@ -167,6 +602,16 @@ def UCTPlayTwoPlayersGame():
     attacker = Attacker(initial_portfolio=attacker_portfolio, goals=goals, asset_slicing=10, max_assets_in_action=1)
     defender = OracleDefender(initial_capital=100000, asset_slicing=10, max_assets_in_action=2, goals=goals)
 
+    parallel_uct = None
+    if workers > 1:
+        from GameRunners.ParallelMCTS import ParallelUCT
+        parallel_uct = ParallelUCT(workers, parallel_mode)
+
+    def search(state):
+        if parallel_uct:
+            return parallel_uct.search(state, itermax)
+        return UCT(rootstate=state, itermax=itermax, verbose=False)
+
     state = GameState.TwoPlayersGameState(g, attacker, defender)
     while (not state.game_ended()):
         print(str(state))
@@ -175,11 +620,13 @@ def UCTPlayTwoPlayersGame():
                 state.move_turn()
                 continue
             else:
-                m = UCT(rootstate=state, itermax=100, verbose=False) #changed from 1000 for debugginf # play with values for itermax and verbose = True
+                m = search(state)
         else:
-            m = UCT(rootstate=state, itermax=100, verbose=False) #Attacker
+            m = search(state) #Attacker
         print("Best Move: " + str(m) + "\n")
         state.apply_action(m)
+    if parallel_uct:
+        parallel_uct.close()
     if state.game_ended():
         state.print_winner()
 
@@ -190,11 +637,13 @@ def UCTPlaySinglePlayersGame(state):
     """
     # state = OthelloState(4) # uncomment to play Othello on a square board of the given size
     # state = OXOState() # uncomment to play OXO
+    tree = None
     while (not state.game_ended()):
         print(str(state))
-        m = UCT(rootstate=state, itermax=100, verbose=False)  # Attacker
+        m, tree = UCT(rootstate=state, itermax=100, verbose=False, rootnode=tree, return_tree=True)  # Attacker
         print("Best Move: " + str(m) + "\n")
         state.apply_action(m)
+        tree = tree.SubtreeForMove(m)
     if state.game_ended():
         state.print_winner()
 
@@ -0,0 +1,123 @@
+import numpy
+
+from GameLogic import GameState
+from GameRunners.MCTS import Node, TreeStore, BestMove
+from DeepLearning.PolicyValueModel import PolicyValueModel
+
+
+def ActionPrior(tree: TreeStore, node, index, asset_index):
+    """ The mean policy of node over the assets of its action index, or 1 while node is not evaluated """
+    policy = tree.policies.get(node)
+    if policy is None:
+        return 1.0
+    return float(policy[tree.action_spaces[node].decode(index).indices(asset_index)].mean())
+
+
+def SetPolicy(tree: TreeStore, node, policy, asset_index):
+    """ Keeps the policy of node and sets the priors of the children it already has from it """
+    tree.policies[node] = policy
+    start = tree.edge_start[node]
+    for k, child in enumerate(tree.children(node).tolist()):
+        tree.priors[start + k] = ActionPrior(tree, node, int(tree.action_index[child]), asset_index)
+
+
+def PUCTSelectChild(node: Node, exploration_constant):
+    """ Select the child with the highest wins/visits + c * prior * sqrt(node visits) / (1 + child visits).
+        On ties the last child is selected.
+    """
+    tree = node.tree
+    children = tree.children(node.index)
+    start = tree.edge_start[node.index]
+    slots = tree.slot[children]
+    visits = tree.pool.visits[slots]
+    priors = tree.priors[start:start + len(children)]
+    score = tree.pool.wins[slots] / numpy.maximum(visits, 1) + \
+        exploration_constant * priors * numpy.sqrt(node.visits) / (1 + visits)
+    return Node(tree, int(children[len(score) - 1 - int(numpy.argmax(score[::-1]))]))
+
+
+def PUCTSelectAndExpand(rootnode: Node, state: GameState, exploration_constant):
+    """ SelectAndExpand, selecting by PUCTSelectChild and giving the expanded child its prior """
+    node = rootnode
+    while not node.HasUntriedMoves() and node.NumChildren():
+        node = PUCTSelectChild(node, exploration_constant)
+        state.apply_action(node.move)
+        node.BuildActionSpace(state)
+
+    if node.HasUntriedMoves():
+        index = node.nextUntriedMove
+        prior = ActionPrior(node.tree, node.index, index, state.network.asset_index)
+        state.apply_action(node.actionSpace.decode(index))
+        node = node.AddChild(index, state, prior)
+    return node
+
+
+def BackpropagateResults(tree: TreeStore, index, results):
+    """ Update the nodes from index back to the root, results has the result of every player of the tree """
+    while index >= 0:
+        tree.update(index, results[tree.player[index]])
+        index = tree.parent[index]
+
+
+def AddVirtualLoss(tree: TreeStore, index, sign, virtual_loss):
+    while index >= 0:
+        slot = tree.slot[index]
+        tree.pool.visits[slot] += sign
+        tree.pool.wins[slot] -= sign * virtual_loss
+        index = tree.parent[index]
+
+
+def PUCTSearch(rootstate: GameState, itermax, model: PolicyValueModel, batch_size=8, exploration_constant=1.5,
+               virtual_loss=1, rootnode: Node = None):
+    """ Conduct a PUCT search for itermax iterations starting from rootstate and return the root node.
+        Instead of a random rollout, the canonical form of a new leaf is queued, with a virtual loss on its path
+        so the next selections spread out, and model evaluates the queue in one predict call once batch_size
+        leaves are queued. The values of a leaf are backpropagated, and its policy gives the priors of its
+        children. Terminal leaves are backpropagated with their game results right away.
+        rootstate is restored to its initial state when the search is done. If rootnode is given, a tree of
+        rootstate from an earlier search, the search continues it.
+    """
+    if rootnode is None:
+        rootnode = Node(state=rootstate)
+    else:
+        rootnode.BuildActionSpace(rootstate)
+    tree = rootnode.tree
+    network = rootstate.network
+    players = rootstate.players
+    root_snapshot = rootstate.snapshot()
+    boards = numpy.empty((batch_size, len(network.fund_symbols), len(network.asset_symbols)))
+    if rootnode.index not in tree.policies:
+        network.get_canonical_form(out=boards[0])
+        policies, _ = model.predict(boards[:1])
+        SetPolicy(tree, rootnode.index, policies[0], network.asset_index)
+
+    done = 0
+    while done < itermax:
+        leaves = []
+        while len(leaves) < batch_size and done < itermax:
+            node = PUCTSelectAndExpand(rootnode, rootstate, exploration_constant)
+            if rootstate.game_ended() or rootstate.is_terminal():
+                BackpropagateResults(tree, node.index, [rootstate.GetResult(player) for player in players])
+            else:
+                network.get_canonical_form(out=boards[len(leaves)])
+                AddVirtualLoss(tree, node.index, 1, virtual_loss)
+                leaves.append(node.index)
+            rootstate.restore(root_snapshot)
+            done += 1
+        if not leaves:
+            continue
+        policies, values = model.predict(boards[:len(leaves)])
+        for leaf, policy, results in zip(leaves, policies, values):
+            AddVirtualLoss(tree, leaf, -1, virtual_loss)
+            SetPolicy(tree, leaf, policy, network.asset_index)
+            BackpropagateResults(tree, leaf, results)
+    return rootnode
+
+
+def PUCT(rootstate: GameState, itermax, model: PolicyValueModel, batch_size=8, exploration_constant=1.5,
+         rootnode: Node = None, return_tree=False):
+    """ Return the most visited move of a PUCTSearch from rootstate, and the searched tree if return_tree is set """
+    rootnode = PUCTSearch(rootstate, itermax, model, batch_size, exploration_constant, rootnode=rootnode)
+    if return_tree:
+        return BestMove(rootnode), rootnode
+    return BestMove(rootnode)
@@ -0,0 +1,111 @@
+import multiprocessing
+import pickle
+import random
+
+from GameLogic import GameState
+from GameLogic.SysConfig import SysConfig
+from GameRunners.MCTS import Node, UCTSearch, SelectAndExpand, BestMove
+
+
+def _root_search(task):
+    state_bytes, itermax, seed, conf = task
+    SysConfig.set_all(conf)
+    random.seed(seed)
+    rootnode = UCTSearch(pickle.loads(state_bytes), itermax)
+    return [(c.actionIndex, c.visits, c.wins) for c in rootnode.childNodes]
+
+
+def _leaf_rollout(task):
+    state_bytes, seed, conf = task
+    SysConfig.set_all(conf)
+    random.seed(seed)
+    state = pickle.loads(state_bytes)
+    state.rollout()
+    return [state.GetResult(player) for player in state.players]
+
+
+class ParallelUCT:
+    """ UCT search over a pool of worker processes.
+        root: every worker searches its own tree from the root state, and the visits of the root children
+              are summed by action index.
+        leaf: a single tree in this process. Each batch selects one leaf per worker, marking the path to it with
+              a virtual loss so the next selections spread out, and the rollouts of the batch run in the workers.
+    """
+
+    def __init__(self, workers, mode='root', virtual_loss=1):
+        if mode not in ('root', 'leaf'):
+            raise ValueError(mode)
+        self.workers = workers
+        self.mode = mode
+        self.virtual_loss = virtual_loss
+        self.pool = multiprocessing.Pool(workers)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    'on an exception the workers are stopped without waiting for their searches'
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.pool.terminate()
+        self.close()
+
+    def search(self, rootstate: GameState, itermax):
+        """ Return the best move from rootstate, or its only valid action without searching """
+        space = rootstate.get_action_space()
+        index = space.single_valid_index()
+        if index is not None:
+            return space.decode(index)
+        if self.mode == 'root':
+            return self.root_parallel_search(rootstate, itermax)
+        return BestMove(self.leaf_parallel_search(rootstate, itermax))
+
+    def worker_iterations(self, itermax):
+        return [itermax // self.workers + (1 if i < itermax % self.workers else 0) for i in range(self.workers)]
+
+    def root_parallel_search(self, rootstate: GameState, itermax):
+        state_bytes = pickle.dumps(rootstate)
+        conf = SysConfig.get_all()
+        tasks = [(state_bytes, iterations, random.getrandbits(32), conf)
+                 for iterations in self.worker_iterations(itermax) if iterations]
+        visits = {}
+        for children in self.pool.map(_root_search, tasks):
+            for action_index, child_visits, _ in children:
+                visits[action_index] = visits.get(action_index, 0) + child_visits
+        if not visits:
+            return []
+        best_index = max(sorted(visits), key=lambda i: visits[i])
+        return rootstate.get_action_space().decode(best_index)
+
+    def leaf_parallel_search(self, rootstate: GameState, itermax):
+        """ Return the root node of the searched tree """
+        rootnode = Node(state=rootstate)
+        root_snapshot = rootstate.snapshot()
+        conf = SysConfig.get_all()
+        players = rootstate.players
+        done = 0
+        while done < itermax:
+            leaves = []
+            tasks = []
+            for i in range(min(self.workers, itermax - done)):
+                node = SelectAndExpand(rootnode, rootstate)
+                self.add_virtual_loss(node, 1)
+                leaves.append(node)
+                tasks.append((pickle.dumps(rootstate), random.getrandbits(32), conf))
+                rootstate.restore(root_snapshot)
+            for node, results in zip(leaves, self.pool.map(_leaf_rollout, tasks)):
+                self.add_virtual_loss(node, -1)
+                while node != None:
+                    node.Update(results[players.index(node.playerJustMoved)])
+                    node = node.parentNode
+            done += len(leaves)
+        return rootnode
+
+    def add_virtual_loss(self, node: Node, sign):
+        while node != None:
+            node.visits += sign
+            node.wins -= sign * self.virtual_loss
+            node = node.parentNode
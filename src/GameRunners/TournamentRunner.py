@@ -1,13 +1,22 @@
 #from __future__ import division
 import csv
 import itertools
-from copy import deepcopy
+import multiprocessing
+import os
+import pickle
+import random
+
+import numpy
+
 from GameLogic import GameState
 from GameLogic.AssetFundNetwork import AssetFundsNetwork
 from GameLogic.GameConfig import GameConfig
 from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator, SqrtMarketImpactCalculator
-from GameLogic.Players import Attacker, RobustDefender, OracleDefender, Defender
-from GameRunners.MCTS import UCT
+from GameLogic.Players import Attacker, RobustDefender, OracleDefender, NNDefender, Defender, GoalPosterior
+from GameLogic.SysConfig import SysConfig
+from GameRunners.GoalsSweep import GoalsSweep
+from GameRunners.MCTS import UCT, TranspositionTable
+from GameRunners.ParallelMCTS import ParallelUCT
 
 
 class Stats:
@@ -26,14 +35,21 @@ class Stats:
             return
         raise ValueError
 
+    def merge(self, other):
+        self.attacker_wins += other.attacker_wins
+        self.defender_wins += other.defender_wins
+        self.avg_num_moves += other.avg_num_moves
+
     def get_stats(self):
         self.avg_num_moves = self.avg_num_moves / (self.attacker_wins + self.defender_wins)
         return self.__dict__
 
 
 class SingleTournamentRunner:
-    def __init__(self, num_games, network, defender_alg, attacker_goals, config: GameConfig):
+    def __init__(self, num_games, network, defender_alg, attacker_goals, config: GameConfig,
+                 parallel_uct: ParallelUCT = None):
         self.num_games = num_games
+        self.parallel_uct = parallel_uct
         self.network = network
         self.config = config
         self.goals = attacker_goals
@@ -44,11 +60,14 @@ class SingleTournamentRunner:
 
     def gen_defender(self, alg, goals):
         if alg == 'robust':
-            return RobustDefender(config.defender_initial_capital,
-                                  config.defender_asset_slicing, self.config.defender_max_assets_in_action)
+            return RobustDefender(self.config.defender_initial_capital,
+                                  self.config.defender_asset_slicing, self.config.defender_max_assets_in_action)
         if alg == 'oracle':
-            return OracleDefender(config.defender_initial_capital,
-                                  config.defender_asset_slicing, self.config.defender_max_assets_in_action, goals)
+            return OracleDefender(self.config.defender_initial_capital,
+                                  self.config.defender_asset_slicing, self.config.defender_max_assets_in_action, goals)
+        if alg == 'nn':
+            return NNDefender(self.config.defender_initial_capital, self.config.defender_asset_slicing,
+                              self.config.defender_max_assets_in_action, GoalPosterior(self.network))
         raise ValueError
 
     def gen_attacker(self, network, attacker_goals):
@@ -68,32 +87,57 @@ class SingleTournamentRunner:
         print('attacker:')
         print(str(attacker.portfolio))
 
-    def play_single_game(self, network, attacker, defender):
-        state = GameState.TwoPlayersGameState(network, attacker, defender)
+    def search(self, state, table=None, tree=None):
+        """ Return the move to play and the searched tree, None in parallel searches """
+        if self.parallel_uct:
+            return self.parallel_uct.search(state, self.config.uct_iterations), None
+        return UCT(rootstate=state, itermax=self.config.uct_iterations, verbose=False, table=table,
+                   rootnode=tree, return_tree=True, time_budget=self.config.uct_time_budget,
+                   min_iterations=self.config.uct_min_iterations, early_stop=self.config.uct_early_stop)
+
+    def play_single_game(self, state):
         if self.config.verbose:
-            self.print_portfolios(state.network, attacker)
+            self.print_portfolios(state.network, state.attacker)
+        table = None
+        if self.config.uct_table_capacity:
+            table = TranspositionTable(self.config.uct_table_capacity)
+        tree = None
         moves_counter = 0
         while not state.game_ended():
             moves_counter += 1
             if state.turn == 1:
                 if state.players[state.turn].resources_exhusted():  # insert bayesian here
                     state.move_turn()
+                    tree = None
                     continue
                 else:
-                    m = UCT(rootstate=state, itermax=100,
-                            verbose=False)  # changed from 1000 for debugging # play with values for itermax and verbose = True
+                    m, tree = self.search(state, table, tree)
             else:
-                m = UCT(rootstate=state, itermax=100, verbose=False)  # Attacker
+                m, tree = self.search(state, table, tree)  # Attacker
             if self.config.verbose:
                 print(str(m) + "\n")
             state.apply_action(m)
+            # the next search continues from the subtree of the move played
+            tree = tree.SubtreeForMove(m) if tree and self.config.uct_reuse_tree else None
         if state.game_ended():
             self.stats.update_stats(state.get_winner(), moves_counter)
 
     def run_single_tournament(self):
+        if self.parallel_uct or self.config.uct_workers <= 1:
+            return self.play_games()
+        with ParallelUCT(self.config.uct_workers, self.config.uct_parallel_mode) as self.parallel_uct:
+            stats = self.play_games()
+        self.parallel_uct = None
+        return stats
+
+    def play_games(self):
+        state = GameState.TwoPlayersGameState(self.network, self.attacker, self.defender)
+        initial_state = state.snapshot()
         for g in range(self.num_games):
             print('iteration ' + str(g))
-            self.play_single_game(deepcopy(self.network), deepcopy(self.attacker), deepcopy(self.defender))
+            state.restore(initial_state)
+            self.play_single_game(state)
+        state.restore(initial_state)
         return self.stats.get_stats()
 
 
@@ -102,6 +146,7 @@ class MultipleTournamentRunner:
                  config: GameConfig):
         self.config = config
         self.num_games_per_tournaments = num_games_per_tournament
+        self.network_file_name = network_file_name
         self.network = AssetFundsNetwork.load_from_file(network_file_name,
                                                         SqrtMarketImpactCalculator())
         self.network.run_intraday_simulation(config.intraday_asset_gain_max_range, 0.7*config.initial_leverage)
@@ -117,15 +162,24 @@ class MultipleTournamentRunner:
         self.writer.writerow(one_time_params)
 
     def run_for_goals_set(self, goals_set):
+        try:
+            if self.config.uct_workers > 1:
+                with ParallelUCT(self.config.uct_workers, self.config.uct_parallel_mode) as parallel_uct:
+                    self.write_tournaments(goals_set, parallel_uct)
+            else:
+                self.write_tournaments(goals_set)
+        finally:
+            self.csv_file.close()
+
+    def write_tournaments(self, goals_set, parallel_uct=None):
         for goals in goals_set:
             print(str(goals))
             tournament_runner = SingleTournamentRunner(self.num_games_per_tournaments, self.network,
-                                                       self.defender_alg, goals, self.config)
+                                                       self.defender_alg, goals, self.config, parallel_uct)
             params = {'goals': '-'.join(goals)}
             stats = tournament_runner.run_single_tournament()
             params.update(stats)
             self.writer.writerow(params)
-        self.csv_file.close()
 
     def gen_goals_fund_list(self, goals_vector):
         goals_list = []
@@ -135,14 +189,80 @@ class MultipleTournamentRunner:
         return goals_list
 
     def run_for_all_goals(self):
-        goals_set = []
-        goals_indexes = list(itertools.product([0, 1], repeat=self.config.num_funds))
-        goals_indexes = goals_indexes[1:]
-        for goals in goals_indexes[:1]:
-            goals_vector = list(goals)
-            goals_set.append(self.gen_goals_fund_list(goals_vector))
+        goals_set = itertools.islice(GoalsSweep(self.config.num_funds).goal_sets(), 1)
         self.run_for_goals_set(goals_set)
 
+
+_worker_tournament = None
+
+
+def _init_tournament_worker(network_source, prices, defender_alg, config, conf):
+    """ network_source is a pickled network, or a directory of AssetFundsNetwork.save_arrays that every worker
+        maps into memory, sharing its pages, and then sets to the given prices.
+    """
+    global _worker_tournament
+    SysConfig.set_all(conf)
+    if prices is None:
+        network = pickle.loads(network_source)
+    else:
+        network = AssetFundsNetwork.load_arrays(network_source, SqrtMarketImpactCalculator())
+        network.set_prices(prices)
+    _worker_tournament = (network, defender_alg, config)
+
+
+def _play_tournament_game(job):
+    goals_index, goals, seed = job
+    network, defender_alg, config = _worker_tournament
+    random.seed(seed)
+    numpy.random.seed(seed)
+    runner = SingleTournamentRunner(1, network, defender_alg, goals, config)
+    state = GameState.TwoPlayersGameState(network, runner.attacker, runner.defender)
+    initial_state = state.snapshot()
+    runner.play_single_game(state)
+    state.restore(initial_state)
+    return goals_index, runner.stats
+
+
+class ParallelTournamentRunner(MultipleTournamentRunner):
+    """ Plays every (goal set, game) pair as a separate job in a pool of worker processes. Each job is seeded
+        from (seed, goal set index, game index), so a sweep gives the same results for any number of workers.
+        The row of a goal set is written as soon as its last game is done.
+    """
+    def __init__(self, csv_file_name, num_games_per_tournament, network_file_name, defender_alg,
+                 config: GameConfig, workers, seed=0):
+        super().__init__(csv_file_name, num_games_per_tournament, network_file_name, defender_alg, config)
+        self.workers = workers
+        self.seed = seed
+
+    def job_seed(self, goals_index, game):
+        return int(numpy.random.SeedSequence([self.seed, goals_index, game]).generate_state(1)[0])
+
+    def gen_jobs(self, goals_set):
+        for goals_index, goals in enumerate(goals_set):
+            for game in range(self.num_games_per_tournaments):
+                yield goals_index, goals, self.job_seed(goals_index, game)
+
+    def run_for_goals_set(self, goals_set):
+        goals_set = list(goals_set)
+        stats = [Stats() for _ in goals_set]
+        games_left = [self.num_games_per_tournaments] * len(goals_set)
+        if os.path.isdir(self.network_file_name):
+            network_args = (self.network_file_name, numpy.array(self.network.prices))
+        else:
+            network_args = (pickle.dumps(self.network), None)
+        init_args = network_args + (self.defender_alg, self.config, SysConfig.get_all())
+        with multiprocessing.Pool(self.workers, _init_tournament_worker, init_args) as pool:
+            for goals_index, game_stats in pool.imap_unordered(_play_tournament_game, self.gen_jobs(goals_set)):
+                stats[goals_index].merge(game_stats)
+                games_left[goals_index] -= 1
+                if not games_left[goals_index]:
+                    params = {'goals': '-'.join(goals_set[goals_index])}
+                    params.update(stats[goals_index].get_stats())
+                    self.writer.writerow(params)
+                    self.csv_file.flush()
+        self.csv_file.close()
+
+
 if __name__ == "__main__":
     config = GameConfig()
     config.num_assets = 20
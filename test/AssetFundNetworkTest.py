@@ -1,11 +1,15 @@
+import tempfile
 import unittest
 
 import networkx as nx
 import numpy as np
+import numpy.testing as npt
 
 from GameLogic.Orders import Sell, Buy, Order
-from GameLogic.AssetFundNetwork import Asset, Fund, AssetFundsNetwork
+from GameLogic.AssetFundNetwork import Asset, Fund, AssetFundsNetwork, CanonicalFormBuffer
 from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator, MarketImpactCalculator
+from GameLogic.Holdings import make_holdings
+from GameLogic.SysConfig import SysConfig
 
 
 class MockMarketImpactTestCalculator(MarketImpactCalculator):
@@ -21,12 +25,28 @@ class TestAssetFundsNetwork  (unittest.TestCase):
 
     def test_encode_decode_network(self):
         network = AssetFundsNetwork.generate_random_network(0.5, 3, 2, [1]*3, [2]*3, [1]*2, [2]*3, [1]*3,[1.5]*3,
-                                                            ExponentialMarketImpactCalculator(1))
+                                                            ExponentialMarketImpactCalculator(10))
         network.save_to_file('encoding_decoding_test.json')
         decoded_network = AssetFundsNetwork.load_from_file('encoding_decoding_test.json',
-                                                           ExponentialMarketImpactCalculator(1))
+                                                           ExponentialMarketImpactCalculator(10))
         self.assertEqual(network, decoded_network)
 
+    def test_save_load_arrays(self):
+        for use_sparse in [False, True]:
+            network = AssetFundsNetwork.generate_random_network(0.5, 3, 2, [1]*3, [2]*3, [1]*2, [2]*3, [1]*3,
+                                                                [1.5]*3, ExponentialMarketImpactCalculator(10))
+            network.holdings = make_holdings(network.holdings.to_dense(), use_sparse)
+            with tempfile.TemporaryDirectory() as dir_name:
+                network.save_arrays(dir_name)
+                loaded_network = AssetFundsNetwork.load_from_file(dir_name, ExponentialMarketImpactCalculator(10))
+                self.assertEqual(network, loaded_network)
+                self.assertEqual(loaded_network.holdings.is_sparse(), network.holdings.is_sparse())
+                npt.assert_array_equal(loaded_network.compute_portfolio_values(), network.compute_portfolio_values())
+                loaded_network.apply_action([Sell('a0', 1, 1)])
+                self.assertNotEqual(loaded_network.assets['a0'].price, network.assets['a0'].price)
+                reloaded_network = AssetFundsNetwork.load_arrays(dir_name, ExponentialMarketImpactCalculator(10))
+                self.assertEqual(reloaded_network.assets['a0'].price, network.assets['a0'].price)
+
     def test_generate_random_network(self):
         num_funds = 3
         num_assets = 2
@@ -43,7 +63,7 @@ class TestAssetFundsNetwork  (unittest.TestCase):
         g = AssetFundsNetwork.generate_random_network(0.5, num_funds, num_assets,initial_capitals,
                                                       initial_leverages, initial_prices,
                                                       tolerances, assets_num_shares, volatility,
-                                                      ExponentialMarketImpactCalculator(1))
+                                                      ExponentialMarketImpactCalculator(10))
         assets = g.assets
         funds = g.funds
         self.assertEqual(len(assets), num_assets)
@@ -59,6 +79,19 @@ class TestAssetFundsNetwork  (unittest.TestCase):
             self.assertEqual(initial_leverages[i], fund.initial_leverage)
             self.assertEqual(tolerances[i], fund.tolerance)
 
+    def test_generate_random_network_is_connected(self):
+        np.random.seed(0)
+        for density, pref_attach in [(0, 0), (0.05, 0), (0.05, 2), (0.05, -1), (1, 0)]:
+            network = AssetFundsNetwork.generate_random_network(density, 30, 20, [100]*30, [1]*30, [1]*20, [2]*30,
+                                                                [10]*20, [1.5]*20, ExponentialMarketImpactCalculator(1),
+                                                                pref_attach)
+            g = nx.Graph()
+            g.add_nodes_from(list(network.funds) + list(network.assets))
+            for fund in network.funds.values():
+                g.add_edges_from((fund.symbol, asset_symbol) for asset_symbol in fund.portfolio)
+            self.assertTrue(nx.is_connected(g))
+        self.assertEqual(len(network.funds['f0'].portfolio), 20)
+
     def test_generate_network_from_graph(self):
         num_funds = 2
         num_assets = 2
@@ -75,7 +108,7 @@ class TestAssetFundsNetwork  (unittest.TestCase):
         network = AssetFundsNetwork.gen_network_from_graph(g, investment_proportions, initial_capitals,
                                                            initial_leverages, initial_prices,
                                                            tolerances, assets_num_shares, volatility,
-                                                           ExponentialMarketImpactCalculator(1))
+                                                           ExponentialMarketImpactCalculator(10))
         assets = network.assets
         funds = network.funds
         self.assertEqual(len(assets), num_assets)
@@ -136,6 +169,23 @@ class TestAssetFundsNetwork  (unittest.TestCase):
 
         self.assertEqual(network, expected_network)"""
 
+    def test_evaluate_funds(self):
+        assets = {'XXX': Asset(1, 20, 1.5, 'XXX'), 'YYY': Asset(1, 20, 1.5, 'yyy')}
+        f1 = Fund('F1', {'XXX': 10, 'YYY': 10}, 5, 2, 0.25)
+        f2 = Fund('F1', {'XXX': 5, 'YYY': 4}, 5, 2, 0.25)
+        f3 = Fund('F1', {'XXX': 20, 'YYY': 4}, 5, 2, 4)
+        network = AssetFundsNetwork({'f1': f1, 'f2': f2, 'f3': f3}, assets,
+                                    MockMarketImpactTestCalculator())
+        leverages, margin_calls, defaults = network.evaluate_funds()
+        self.assertListEqual(list(leverages), [1, np.inf, 0.7142857142857142])
+        self.assertListEqual(list(margin_calls), [True, True, False])
+        self.assertListEqual(list(defaults), [False, True, False])
+        self.assertEqual(f1.compute_curr_leverage(assets), 1)
+        self.assertTrue(f2.marginal_call(assets))
+        self.assertFalse(network.are_funds_leveraged_less_than(0.8))
+        network.set_holding(1, 0, 20)
+        self.assertTrue(network.are_funds_leveraged_less_than(1))
+
     def test_get_canonical_form(self):
         a0 = Asset(price=1, daily_volume=40, volatility=1.5, symbol='a0')
         a1 = Asset(price=2, daily_volume=40, volatility=1.5, symbol='a1')
@@ -146,6 +196,105 @@ class TestAssetFundsNetwork  (unittest.TestCase):
         expected_canonical_form = np.array([[10., 0.], [10., 20.]])
         actual_canonical_form = network.get_canonical_form()
         self.assertTrue(np.array_equal(expected_canonical_form, actual_canonical_form))
+        for use_sparse in [False, True]:
+            network.holdings = make_holdings(network.holdings.to_dense(), use_sparse)
+            out = np.full((2, 2), -1.0)
+            self.assertIs(network.get_canonical_form(out=out), out)
+            npt.assert_array_equal(out, expected_canonical_form)
+
+    def test_canonical_form_buffer(self):
+        a0 = Asset(price=1, daily_volume=40, volatility=1.5, symbol='a0')
+        a1 = Asset(price=2, daily_volume=40, volatility=1.5, symbol='a1')
+        f0 = Fund('f0', {'a0': 10}, initial_capital=2, initial_leverage=8, tolerance=2)
+        network = AssetFundsNetwork({'f0': f0}, {'a0': a0, 'a1': a1}, MockMarketImpactTestCalculator())
+        boards = CanonicalFormBuffer(network, capacity=2)
+        for price in [1, 2, 3]:
+            a0.price = price
+            boards.append()
+        self.assertEqual(len(boards), 3)
+        npt.assert_array_equal(boards.to_array(), [[[10, 0]], [[20, 0]], [[30, 0]]])
+
+    def test_funds_and_assets_are_network_views(self):
+        a0 = Asset(price=1, daily_volume=40, volatility=1.5, symbol='a0')
+        a1 = Asset(price=2, daily_volume=40, volatility=1.5, symbol='a1')
+        f0 = Fund('f0', {'a0': 10}, initial_capital=2, initial_leverage=8, tolerance=2)
+        f1 = Fund('f1', {'a0': 10, 'a1': 10}, initial_capital=1, initial_leverage=1, tolerance=3)
+        network = AssetFundsNetwork({'f0': f0, 'f1': f1}, {'a0': a0, 'a1': a1},
+                                    MockMarketImpactTestCalculator())
+        self.assertTrue(np.array_equal(network.compute_portfolio_values(), np.array([10., 30.])))
+        a1.set_price(3)
+        self.assertEqual(network.prices[1], 3)
+        f1.portfolio['a1'] -= 4
+        self.assertEqual(f1.portfolio, {'a0': 10, 'a1': 6})
+        self.assertEqual(f1.compute_portfolio_value(network.assets), 28)
+        f0.is_liquidating = True
+        self.assertTrue(network.is_liquidating[0])
+        self.assertListEqual(list(network.loans), [16, 1])
+
+    def test_portfolio_values_updated_for_exposed_funds(self):
+        assets = {'a0': Asset(1, 40, 1.5, 'a0'), 'a1': Asset(2, 40, 1.5, 'a1'), 'a2': Asset(2, 40, 1.5, 'a2')}
+        f0 = Fund('f0', {'a0': 10}, 2, 8, 2)
+        f1 = Fund('f1', {'a0': 10, 'a1': 10}, 1, 1, 3)
+        f2 = Fund('f2', {'a2': 5}, 1, 1, 3)
+        network = AssetFundsNetwork({'f0': f0, 'f1': f1, 'f2': f2}, assets, MockMarketImpactTestCalculator())
+        assets['a1'].set_price(4)
+        self.assertListEqual(list(network.compute_portfolio_values()), [10, 50, 10])
+        network.set_prices(np.array([2., 4., 1.]))
+        self.assertListEqual(list(network.compute_portfolio_values()), [20, 60, 5])
+        f2.portfolio['a0'] = 1
+        assets['a0'].set_price(3)
+        self.assertListEqual(list(network.compute_portfolio_values()), [30, 70, 8])
+        expected = network.holdings.dot(network.prices)
+        self.assertTrue(np.array_equal(expected, network.compute_portfolio_values()))
+
+    def test_run_cascade(self):
+        limit = SysConfig.get("MINUTE_VOLUME_LIMIT")
+        self.addCleanup(SysConfig.set, "MINUTE_VOLUME_LIMIT", limit)
+        SysConfig.set("MINUTE_VOLUME_LIMIT", 1)
+        a0 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a0')
+        a1 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a1')
+        f0 = Fund('f0', {'a0': 100}, initial_capital=500, initial_leverage=1, tolerance=2)
+        f1 = Fund('f1', {'a0': 100, 'a1': 10}, initial_capital=550, initial_leverage=1, tolerance=2)
+        f2 = Fund('f2', {'a1': 100}, initial_capital=20, initial_leverage=49, tolerance=2)
+        network = AssetFundsNetwork({'f0': f0, 'f1': f1, 'f2': f2}, {'a0': a0, 'a1': a1},
+                                    ExponentialMarketImpactCalculator(10))
+        result = network.run_cascade([Sell('a0', 150, 10)])
+        self.assertEqual(result.rounds, 3)
+        self.assertListEqual(list(result.margin_calls), [True, True, True])
+        self.assertListEqual(list(result.defaults), [False, False, True])
+        self.assertListEqual(list(result.sold_shares), [20, 20])
+        self.assertEqual(f0.portfolio, {'a0': 90})
+        self.assertEqual(f1.portfolio, {'a0': 90})
+        self.assertEqual(f2.portfolio, {'a1': 90})
+        npt.assert_almost_equal(a0.price, 10 * np.exp(-10 * 170 / 3900))
+        npt.assert_almost_equal(a1.price, 10 * np.exp(-10 * 20 / 3900))
+        npt.assert_almost_equal(network.compute_portfolio_values(), network.holdings.dot(network.prices))
+        self.assertEqual(network.prices_key, network.compute_prices_key(4))
+        self.assertEqual(network.holdings.key, network.holdings.compute_key(4))
+
+        result = network.apply_action([Sell('a0', 1, 10)])
+        self.assertEqual(result.rounds, 1)
+        self.assertFalse(result.margin_calls.any())
+        self.assertListEqual(list(result.sold_shares), [20, 10])
+        self.assertEqual(f0.portfolio, {'a0': 80})
+
+    def test_liquidating_funds_keep_selling(self):
+        limit = SysConfig.get("MINUTE_VOLUME_LIMIT")
+        self.addCleanup(SysConfig.set, "MINUTE_VOLUME_LIMIT", limit)
+        SysConfig.set("MINUTE_VOLUME_LIMIT", 1)
+        a0 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a0')
+        f0 = Fund('f0', {'a0': 25}, initial_capital=100, initial_leverage=1, tolerance=1.1)
+        network = AssetFundsNetwork({'f0': f0}, {'a0': a0}, ExponentialMarketImpactCalculator(10))
+        result = network.run_cascade([Sell('a0', 200, 10)])
+        self.assertListEqual(list(result.margin_calls), [True])
+        self.assertEqual(f0.portfolio, {'a0': 15})
+        'a minute volume is 10 shares, so the fund needs two more turns to unwind'
+        for expected in [5, 0]:
+            result = network.run_cascade([])
+            self.assertFalse(result.margin_calls.any())
+            self.assertListEqual(list(result.sold_shares), [10 if expected else 5])
+            self.assertEqual(f0.portfolio.get('a0', 0), expected)
+        self.assertListEqual(list(network.run_cascade([]).sold_shares), [0])
 
     def test_run_intraday_simulation_price_rises(self):
         a0 = Asset(price=1, daily_volume=40, volatility=1.5, symbol='a0')
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from DeepLearning.ExampleStore import ExampleStore
+
+
+class ExampleStoreTest  (unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    'episode e has e + 1 boards filled with e, and its goals mask has fund e % 3 on'
+    def append_episodes(self, store, first, last):
+        for e in range(first, last):
+            store.append(numpy.full((e + 1, 3, 2), e), numpy.arange(3) == e % 3)
+
+    def test_append_writes_full_chunks(self):
+        store = ExampleStore(self.dir.name, chunk_size=5)
+        self.append_episodes(store, 0, 4)
+        self.assertTrue(os.path.isfile(store.chunk_file('0-00000', 'boards')))
+        self.assertEqual(store.chunks(), [])  # written, but not committed
+        store.flush()
+        self.assertEqual([(entry['name'], entry['boards'], entry['episodes']) for entry in store.chunks()],
+                         [('0-00000', 6, 3), ('0-00001', 4, 1)])
+        self.assertEqual(len(store), 10)
+        self.assertEqual(store.num_episodes(), 4)
+        boards, goals, offsets = store.load_chunk(store.chunks()[0])
+        self.assertIsInstance(boards, numpy.memmap)
+        self.assertEqual(boards.dtype, numpy.float32)
+        numpy.testing.assert_array_equal(offsets, [0, 1, 3, 6])
+        numpy.testing.assert_array_equal(boards[:, 0, 0], [0, 1, 1, 2, 2, 2])
+        numpy.testing.assert_array_equal(goals, numpy.eye(3, dtype=bool))
+
+    def test_writers_share_the_folder(self):
+        store = ExampleStore(self.dir.name, chunk_size=5)
+        self.append_episodes(store, 0, 2)
+        store.flush()
+        other_store = ExampleStore(self.dir.name, writer='1', chunk_size=5)
+        self.append_episodes(other_store, 2, 3)
+        other_store.flush()
+        reopened_store = ExampleStore(self.dir.name, chunk_size=5)
+        self.append_episodes(reopened_store, 3, 4)
+        reopened_store.flush()
+        self.assertEqual([entry['name'] for entry in reopened_store.chunks()], ['0-00000', '0-00001', '1-00000'])
+        self.assertEqual(len(reopened_store), 10)
+        self.assertFalse([name for name in os.listdir(self.dir.name) if name.endswith('.tmp')])
+
+    def test_shards_are_read_from_their_first_commit(self):
+        store = ExampleStore(self.dir.name, chunk_size=2)
+        self.append_episodes(store, 0, 3)
+        store.flush(0)
+        self.append_episodes(store, 3, 5)  # a chunk of shard 1 is written, and then the writer is killed
+        store = ExampleStore(self.dir.name, chunk_size=2)
+        self.assertEqual(store.num_episodes(), 3)
+        self.append_episodes(store, 3, 5)
+        store.flush(1)
+        other_store = ExampleStore(self.dir.name, writer='1', chunk_size=2)
+        self.append_episodes(other_store, 3, 5)  # shard 1 replayed after its checkpoint was lost
+        other_store.flush(1)
+        self.assertEqual([entry['shard'] for entry in other_store.chunks()], [0, 0, 1, 1])
+        self.assertEqual(other_store.num_episodes(), 5)
+
+    def test_partial_index_line_is_dropped(self):
+        store = ExampleStore(self.dir.name, chunk_size=5)
+        self.append_episodes(store, 0, 2)
+        store.flush()
+        with open(store.index_file('0'), 'a') as f:
+            f.write('{"shard": null, "chu')
+        self.assertEqual(ExampleStore(self.dir.name, writer='1').num_episodes(), 2)
+        store = ExampleStore(self.dir.name, chunk_size=5)
+        self.append_episodes(store, 2, 3)
+        store.flush()
+        self.assertEqual([entry['name'] for entry in store.chunks()], ['0-00000', '0-00001'])
+        self.assertEqual(store.num_episodes(), 3)
+
+    def test_minibatches(self):
+        store = ExampleStore(self.dir.name, chunk_size=4)
+        self.append_episodes(store, 0, 8)
+        store.flush()
+        batches = list(store.minibatches(batch_size=5, chunks_per_shuffle=2, rng=numpy.random.default_rng(0)))
+        self.assertTrue(all(len(boards) == len(goals) <= 5 for boards, goals in batches))
+        boards = numpy.concatenate([boards for boards, _ in batches])
+        goals = numpy.concatenate([goals for _, goals in batches])
+        episodes = boards[:, 0, 0].astype(int)
+        self.assertEqual(sorted(episodes.tolist()), [e for e in range(8) for _ in range(e + 1)])
+        self.assertNotEqual(episodes.tolist(), sorted(episodes.tolist()))
+        numpy.testing.assert_array_equal(goals, numpy.eye(3, dtype=bool)[episodes % 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from GameLogic.AssetFundNetwork import Asset, Fund, AssetFundsNetwork
+from GameLogic.GameState import TwoPlayersGameState
+from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator
+from GameLogic.Orders import Sell, Buy
+from GameLogic.Players import Attacker, RobustDefender
+from GameLogic.SysConfig import SysConfig
+
+
+class GameStateTest  (unittest.TestCase):
+
+    def gen_state(self):
+        a0 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a0')
+        a1 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a1')
+        f0 = Fund('f0', {'a0': 100}, initial_capital=500, initial_leverage=1, tolerance=2)
+        f1 = Fund('f1', {'a0': 100, 'a1': 10}, initial_capital=550, initial_leverage=1, tolerance=2)
+        network = AssetFundsNetwork({'f0': f0, 'f1': f1}, {'a0': a0, 'a1': a1}, ExponentialMarketImpactCalculator(10))
+        attacker = Attacker({'a0': 300, 'a1': 100}, ['f0'], 2, 2)
+        defender = RobustDefender(5000, 2, 1)
+        return TwoPlayersGameState(network, attacker, defender)
+
+    def test_snapshot_restore(self):
+        limit = SysConfig.get("MINUTE_VOLUME_LIMIT")
+        self.addCleanup(SysConfig.set, "MINUTE_VOLUME_LIMIT", limit)
+        SysConfig.set("MINUTE_VOLUME_LIMIT", 1)
+        state = self.gen_state()
+        network = state.network
+        snapshot = state.snapshot()
+        state.apply_action([Sell('a0', 150, 10)])
+        state.apply_action([Buy('a1', 10, 10)])
+        self.assertTrue(state.attacker.is_goal_achieved(network.funds))
+        self.assertEqual(state.turn, 0)
+
+        state.restore(snapshot)
+        expected = self.gen_state()
+        self.assertEqual(network, expected.network)
+        self.assertTrue(np.array_equal(network.compute_portfolio_values(), expected.network.compute_portfolio_values()))
+        self.assertFalse(network.is_liquidating.any())
+        self.assertEqual(state.attacker.portfolio, {'a0': 300, 'a1': 100})
+        self.assertEqual(state.attacker.initial_capital, 0)
+        self.assertEqual(state.defender.initial_capital, 5000)
+        self.assertEqual(state.defender.portfolio, {})
+        self.assertEqual(state.turn, 0)
+        self.assertFalse(state.attacker.is_goal_achieved(network.funds))
+
+    def test_rollout(self):
+        state = self.gen_state()
+        self.assertFalse(state.is_terminal())
+        self.assertEqual(state.rollout(max_depth=1), 1)
+        self.assertEqual(state.turn, 1)
+        state.rollout()
+        self.assertTrue(state.is_terminal())
+        self.assertFalse(state.get_valid_actions())
+
+    def test_state_key(self):
+        state = self.gen_state()
+        key = state.state_key()
+        snapshot = state.snapshot()
+        state.apply_action([Sell('a0', 150, 10), Sell('a1', 50, 10)])
+        after_action = state.state_key()
+        self.assertNotEqual(key, after_action)
+        state.restore(snapshot)
+        self.assertEqual(state.state_key(), key)
+        state.apply_action([Sell('a1', 50, 10), Sell('a0', 150, 10)])
+        self.assertEqual(state.state_key(), after_action)
+        state.network.prices[0] += 1e-6
+        self.assertEqual(state.state_key(), after_action)
+        self.assertNotEqual(state.state_key(decimals=8), after_action)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import itertools
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from GameRunners.GoalsSweep import GoalsSweep
+
+
+def record_shard(shard, goals_set):
+    with open(os.path.join(os.environ['GOALS_SWEEP_TEST_DIR'], str(shard)), 'w') as f:
+        f.write('\n'.join('-'.join(goals) for goals in goals_set))
+
+
+class GoalsSweepTest  (unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.checkpoint_file = os.path.join(self.dir.name, 'sweep.checkpoint')
+
+    def expected_goal_sets(self, num_funds):
+        goal_sets = []
+        for goals_vector in list(itertools.product([0, 1], repeat=num_funds))[1:]:
+            goal_sets.append(['f' + str(i) for i in range(num_funds) if goals_vector[i]])
+        return goal_sets
+
+    def test_goal_sets(self):
+        sweep = GoalsSweep(4, shard_size=4)
+        self.assertEqual(len(sweep), 15)
+        self.assertEqual(sweep.num_shards, 4)
+        self.assertEqual(list(sweep.goal_sets()), self.expected_goal_sets(4))
+        self.assertEqual(list(sweep.shard_goal_sets(3)), self.expected_goal_sets(4)[12:])
+        wide_sweep = GoalsSweep(20)
+        self.assertEqual(wide_sweep.goals(len(wide_sweep) - 1), ['f' + str(i) for i in range(20)])
+
+    def test_resume_from_checkpoint(self):
+        done = []
+
+        def process_shard(shard, goals_set):
+            if shard == 2:
+                raise KeyboardInterrupt
+            done.extend(goals_set)
+        sweep = GoalsSweep(4, shard_size=4, checkpoint_file=self.checkpoint_file)
+        with self.assertRaises(KeyboardInterrupt):
+            sweep.run(process_shard)
+        self.assertEqual(len(done), 8)
+
+        sweep = GoalsSweep(4, shard_size=4, checkpoint_file=self.checkpoint_file)
+        self.assertEqual(sweep.pending_shards(), [2, 3])
+        sweep.run(lambda shard, goals_set: done.extend(goals_set))
+        self.assertTrue(sweep.is_done())
+        self.assertEqual(done, self.expected_goal_sets(4))
+        self.assertTrue(GoalsSweep(4, shard_size=4, checkpoint_file=self.checkpoint_file).is_done())
+        with self.assertRaises(ValueError):
+            GoalsSweep(4, shard_size=2, checkpoint_file=self.checkpoint_file)
+
+    def test_run_in_pool(self):
+        env = mock.patch.dict(os.environ, {'GOALS_SWEEP_TEST_DIR': self.dir.name})
+        env.start()
+        self.addCleanup(env.stop)
+        sweep = GoalsSweep(5, shard_size=3, checkpoint_file=self.checkpoint_file)
+        with multiprocessing.Pool(2) as pool:
+            sweep.run(record_shard, pool)
+        self.assertTrue(sweep.is_done())
+        goal_sets = []
+        for shard in range(sweep.num_shards):
+            with open(os.path.join(self.dir.name, str(shard))) as f:
+                goal_sets.extend(line.split('-') for line in f.read().split('\n'))
+        self.assertEqual(goal_sets, self.expected_goal_sets(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
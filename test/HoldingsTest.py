@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from GameLogic.Holdings import DenseHoldings, SparseHoldings, make_holdings
+
+
+class HoldingsTest  (unittest.TestCase):
+
+    def assert_holdings(self, holdings):
+        self.assertEqual(holdings.get(0, 1), 2)
+        self.assertEqual(holdings.get(1, 1), 0)
+        cols, shares = holdings.row(0)
+        self.assertListEqual(list(cols), [0, 1])
+        self.assertListEqual(list(shares), [1, 2])
+        self.assertListEqual(list(holdings.dot(np.array([1., 10.]))), [21, 3])
+        rows, shares = holdings.column(0)
+        self.assertListEqual(list(rows), [0, 1])
+        self.assertListEqual(list(shares), [1, 3])
+        holdings.set(0, 0, 0)
+        holdings.set(1, 1, 5)
+        cols, shares = holdings.row(0)
+        self.assertListEqual(list(cols), [1])
+        self.assertTrue(np.array_equal(holdings.to_dense(), np.array([[0, 2], [3, 5]])))
+        rows, shares = holdings.column(1)
+        self.assertListEqual(list(rows), [0, 1])
+        self.assertListEqual(list(shares), [2, 5])
+
+    def test_dense_holdings(self):
+        self.assert_holdings(DenseHoldings(np.array([[1, 2], [3, 0]])))
+
+    def test_sparse_holdings(self):
+        self.assert_holdings(SparseHoldings(np.array([[1, 2], [3, 0]])))
+
+    'the incrementally updated key matches the key computed from scratch, and is the same for both representations'
+    def test_state_key(self):
+        matrix = np.array([[1., 2., 0.], [3., 0., 7.], [0., 0., 4.]])
+        dense, sparse = DenseHoldings(matrix.copy()), SparseHoldings(matrix.copy())
+        self.assertEqual(dense.state_key(4), sparse.state_key(4))
+        dense_snapshot, sparse_snapshot, key = dense.snapshot(), sparse.snapshot(), dense.state_key(4)
+        for holdings in [dense, sparse]:
+            holdings.set(0, 0, 0)
+            holdings.set(2, 0, 5)
+            holdings.sell_down(np.array([False, True, True]), np.array([1., 1., 2.]), np.ones(3))
+        self.assertTrue(np.array_equal(dense.to_dense(), sparse.to_dense()))
+        self.assertEqual(dense.state_key(4), sparse.state_key(4))
+        self.assertNotEqual(dense.state_key(4), key)
+        for holdings in [dense, sparse]:
+            self.assertEqual(holdings.key, holdings.compute_key(4))
+        dense.restore(dense_snapshot)
+        sparse.restore(sparse_snapshot)
+        self.assertEqual(dense.state_key(4), key)
+        self.assertEqual(sparse.state_key(4), key)
+        dense.set(1, 2, 7.00001)
+        self.assertEqual(dense.state_key(4), key)
+        self.assertNotEqual(dense.state_key(6), DenseHoldings(matrix).state_key(6))
+
+    def test_make_holdings_by_density(self):
+        matrix = np.zeros((10, 10))
+        matrix[0, 0] = 1
+        self.assertTrue(make_holdings(matrix).is_sparse())
+        matrix[:, 0] = 1
+        self.assertFalse(make_holdings(matrix).is_sparse())
+        self.assertFalse(make_holdings(matrix, use_sparse=False).is_sparse())
+
+
+if __name__ == '__main__':
+    unittest.main()
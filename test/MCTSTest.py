@@ -0,0 +1,171 @@
+import random
+import unittest
+from unittest import mock
+from math import sqrt, log
+
+import numpy
+
+import GameStateTest
+from GameRunners.MCTS import TranspositionTable, UCTSearch, Node, UCT, CanBeOvertaken, BestMove, StatsPool
+from GameLogic.Players import Attacker
+from GameLogic.Orders import Sell, Buy
+
+
+class MCTSTest  (unittest.TestCase):
+
+    def test_transposition_table_lru(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        snapshot = state.snapshot()
+        table = TranspositionTable(capacity=2)
+        root_stats = table.get(state)
+        self.assertEqual(table.get(state), root_stats)
+        state.apply_action([Sell('a0', 150, 10)])
+        first_stats = table.get(state)
+        table.pool.visits[first_stats] = 7
+        state.restore(snapshot)
+        table.get(state)  # the root is now the most recently used
+        state.apply_action([Sell('a1', 50, 10)])
+        table.get(state)
+        self.assertEqual(len(table), 2)
+        state.restore(snapshot)
+        self.assertEqual(table.get(state), root_stats)
+        state.apply_action([Sell('a0', 150, 10)])
+        self.assertEqual(table.pool.visits[table.get(state)], 0)  # evicted, so the stats start over
+        self.assertLessEqual(table.pool.size, 3)
+
+    def test_table_pool_bounded_by_capacity_and_live_trees(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        state.defender.initial_capital = 50000
+        table = TranspositionTable(capacity=10)
+        for i in range(5):
+            rootnode = UCTSearch(state, 50, table)
+            self.assertGreater(rootnode.tree.size, 10)
+            self.assertLessEqual(table.pool.size, table.capacity + rootnode.tree.size)
+            del rootnode
+        self.assertEqual(len(table.pool.free) + table.capacity, table.pool.size)
+
+    def test_nodes_of_same_state_share_stats(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        table = TranspositionTable()
+        rootnode = UCTSearch(state, 20, table)
+        self.assertEqual(rootnode.visits, 20)
+        self.assertEqual(Node(state=state, table=table).slot, rootnode.slot)
+        self.assertEqual(UCTSearch(state, 10, table).visits, 30)
+
+    def test_tree_reuse(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        m, tree = UCT(state, 30, return_tree=True)
+        self.assertEqual(tree.visits, 30)
+        self.assertIn(m, [c.move for c in tree.childNodes])
+        state.apply_action(m)
+        subtree = tree.SubtreeForMove(m)
+        self.assertIsNone(subtree.parentNode)
+        visits = subtree.visits
+        self.assertGreater(visits, 0)
+        m2, tree2 = UCT(state, 10, rootnode=subtree, return_tree=True)
+        self.assertIs(tree2, subtree)
+        self.assertEqual(tree2.visits, visits + 10)
+        self.assertIsNone(tree.SubtreeForMove([]))
+
+    def test_single_valid_action(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        state.attacker = state.players[0] = Attacker({'a0': 300}, ['f0'], 1, 1)
+        rootnode = UCTSearch(state, 1000)
+        self.assertEqual(rootnode.visits, 0)
+        self.assertEqual(UCT(state, 1000), [Sell('a0', 300, 10)])
+
+    def test_single_affordable_action(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        state.turn = 1
+        state.network.set_prices(numpy.array([10., 20.]))
+        state.defender.initial_capital = 19500  # half of the daily volume of a0, a1 is too expensive
+        rootnode = UCTSearch(state, 1000)
+        self.assertEqual(rootnode.visits, 0)
+        self.assertEqual(UCT(state, 1000), [Buy('a0', 1950, 10)])
+
+    def test_time_budget(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        rootnode = UCTSearch(state, 1000, time_budget=0)
+        self.assertEqual(rootnode.visits, 10)
+        rootnode = UCTSearch(state, 1000, time_budget=0, min_iterations=25)
+        self.assertEqual(rootnode.visits, 30)
+
+    def test_early_stop(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        rootnode = UCTSearch(state, 20)
+        for child in rootnode.childNodes:
+            child.visits = 1
+        rootnode.childNodes[0].visits = 12
+        self.assertFalse(rootnode.HasUntriedMoves())
+        self.assertTrue(CanBeOvertaken(rootnode, 11))
+        self.assertFalse(CanBeOvertaken(rootnode, 10))
+        rootnode = UCTSearch(state, 1000, early_stop=True)
+        best, second = sorted(c.visits for c in rootnode.childNodes)[-1:-3:-1]
+        self.assertGreater(best - second, 1000 - rootnode.visits)
+        self.assertLess(rootnode.visits, 1000)
+
+    def test_select_child(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        rootnode = UCTSearch(state, 40)
+        for i in range(20):
+            for child in rootnode.childNodes:
+                child.visits = random.randint(1, 5)
+                child.wins = random.randint(-5, 5)
+            expected = sorted(rootnode.childNodes, key=lambda c: c.wins / c.visits + sqrt(
+                rootnode.explorationConstant * log(rootnode.visits) / c.visits))[-1]
+            self.assertEqual(rootnode.UCTSelectChild(), expected)
+            expected = sorted(rootnode.childNodes, key=lambda c: c.visits)[-1]
+            self.assertEqual(BestMove(rootnode), expected.move)
+
+    def test_stats_pool_grows(self):
+        pool = StatsPool(capacity=4)
+        slots = [pool.new_slot() for i in range(10)]
+        self.assertEqual(slots, list(range(10)))
+        self.assertEqual(len(pool.visits), 16)
+        pool.visits[slots] = slots
+        self.assertEqual(pool.visits[9], 9)
+
+    def test_untried_actions_shuffled_once(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        rootnode = Node(state=state)
+        tree = rootnode.tree
+        snapshot = state.snapshot()
+        picked = []
+        with mock.patch('random.shuffle', wraps=random.shuffle) as shuffle:
+            while tree.has_untried(0):
+                index = tree.next_untried[0]
+                picked.append(index)
+                state.apply_action(rootnode.actionSpace.decode(index))
+                tree.add_child(0, index, state)
+                state.restore(snapshot)
+        self.assertEqual(shuffle.call_count, 1)
+        self.assertEqual(sorted(picked), list(rootnode.actionSpace.valid_indices()))
+        self.assertNotIn(0, tree.remaining_actions)
+
+    def count_nodes(self, node):
+        return 1 + sum(self.count_nodes(child) for child in node.childNodes)
+
+    def test_tree_store(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        state.defender.initial_capital = 50000
+        rootnode = UCTSearch(state, 300)
+        tree = rootnode.tree
+        self.assertEqual(self.count_nodes(rootnode), tree.size)
+        self.assertEqual(sum(c.visits for c in rootnode.childNodes), 300)
+        self.assertTrue(all(c.parentNode == rootnode for c in rootnode.childNodes))
+        self.assertGreater(rootnode.NumChildren(), 4)  # the edge block of the root was moved
+        self.assertLess(len(tree.action_spaces), tree.size)
+
+        child = max(rootnode.childNodes, key=lambda c: c.visits)
+        subtree = rootnode.SubtreeForMove(child.move)
+        self.assertIsNot(subtree.tree, tree)
+        self.assertEqual(subtree.index, 0)
+        self.assertEqual(subtree.tree.size, self.count_nodes(child))
+        self.assertEqual(subtree.tree.pool.size, subtree.tree.size)
+        self.assertEqual(subtree.visits, child.visits)
+        self.assertEqual(sorted(str(c.move) for c in subtree.childNodes), sorted(str(c.move) for c in child.childNodes))
+        self.assertEqual(sorted(c.visits for c in subtree.childNodes), sorted(c.visits for c in child.childNodes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,19 @@
 import unittest
+import numpy as np
 import numpy.testing as npt
 
 from GameLogic.AssetFundNetwork import Asset
 from GameLogic.Orders import Buy, Sell
-from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator, SqrtMarketImpactCalculator
+from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator, SqrtMarketImpactCalculator, \
+    MarketImpactCalculator
+
+
+class MockMarketImpactTestCalculator(MarketImpactCalculator):
+    def get_market_impact(self, order, asset):
+        return 2 if isinstance(order, Buy) else 0.5
+
+    def get_updated_price(self, num_shares, asset):
+        return asset.price + num_shares
 
 
 class TestMarketImpactCalculator  (unittest.TestCase):
@@ -51,14 +61,45 @@ class TestMarketImpactCalculator  (unittest.TestCase):
     def test_updated_price_buy_sqrt(self):
         calc = SqrtMarketImpactCalculator(0.5)
         a = Asset(price=2, daily_volume=1000, volatility=1.5, symbol='a1')
-        mi = calc.get_updated_price(10, a)
-        npt.assert_almost_equal(1.075, mi, decimal=4)
+        updated_price = calc.get_updated_price(10, a)
+        npt.assert_almost_equal(2.15, updated_price, decimal=4)
 
     def test_updated_price_sell_sqrt(self):
         calc = SqrtMarketImpactCalculator(0.5)
         a = Asset(price=2, daily_volume=1000, volatility=1.5, symbol='a1')
-        mi = calc.get_updated_price(-10, a)
-        npt.assert_almost_equal(0.925, mi, decimal=4)
+        updated_price = calc.get_updated_price(-10, a)
+        npt.assert_almost_equal(1.85, updated_price, decimal=4)
+
+    def assert_batch_matches_single(self, calc):
+        num_shares = np.array([10., -10., 250., -1.])
+        daily_volumes = np.array([100., 100., 1000., 50.])
+        volatilities = np.array([1.5, 1.2, 1., 2.])
+        prices = np.array([2., 3., 1., 10.])
+        impacts = calc.get_market_impacts(num_shares, daily_volumes, volatilities, prices)
+        updated_prices = calc.get_updated_prices(num_shares, daily_volumes, volatilities, prices)
+        for i in range(len(num_shares)):
+            a = Asset(price=prices[i], daily_volume=daily_volumes[i], volatility=volatilities[i], symbol='a1')
+            order = Buy('a1', num_shares[i], prices[i]) if num_shares[i] > 0 else Sell('a1', -num_shares[i], prices[i])
+            npt.assert_almost_equal(calc.get_market_impact(order, a), impacts[i])
+            npt.assert_almost_equal(calc.get_updated_price(num_shares[i], a), updated_prices[i])
+
+    def test_batch_exp(self):
+        self.assert_batch_matches_single(ExponentialMarketImpactCalculator(2))
+
+    def test_batch_sqrt(self):
+        self.assert_batch_matches_single(SqrtMarketImpactCalculator(0.5))
+
+    def test_updated_prices_sqrt_scale_input_prices(self):
+        calc = SqrtMarketImpactCalculator(0.5)
+        num_shares = np.array([10., -10., 250.])
+        daily_volumes = np.array([1000., 1000., 1000.])
+        volatilities = np.array([1.5, 1.5, 1.])
+        prices = np.array([2., 40., 100.])
+        updated_prices = calc.get_updated_prices(num_shares, daily_volumes, volatilities, prices)
+        npt.assert_almost_equal(updated_prices, [2.15, 37., 125.])
+
+    def test_batch_falls_back_to_single_order_methods(self):
+        self.assert_batch_matches_single(MockMarketImpactTestCalculator())
 
 
 if __name__ == '__main__':
@@ -1,20 +1,30 @@
 import unittest
+from math import sqrt
 
 from GameLogic.Asset import Asset
+from GameLogic.AssetFundNetwork import AssetFundsNetwork, Fund
 from GameLogic.Market import Market
-from GameLogic.Orders import Sell, Buy, Order
-from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator, MarketImpactCalculator
+from GameLogic.Orders import Sell, Buy, Order, OrderBatch
+from GameLogic.MarketImpactCalculator import ExponentialMarketImpactCalculator, MarketImpactCalculator, \
+    SqrtMarketImpactCalculator
 
 
 class MockMarketImpactTestCalculator(MarketImpactCalculator):
     def get_updated_price(self, num_shares, asset):
         return asset.price * (1 + num_shares / 10)
 
+
+'a market of bare assets, over a network of the assets with no funds'
+def new_market(mic, timestep_seconds, timestep_order_limit, assets):
+    AssetFundsNetwork({}, assets, mic)
+    return Market(mic, timestep_seconds, timestep_order_limit, assets)
+
+
 class MarketTest  (unittest.TestCase):
 
     def test_submit_sell_orders(self):
         assets = {'XXX': Asset(1, 20, 1.5, 'XXX'), 'YYY': Asset(1, 20, 1.5, 'yyy')}
-        market = Market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
         market.submit_sell_orders([Sell('XXX', 1, 1)])
         self.assertEqual(market.sell_orders_log, {'XXX': 1, 'YYY': 0})
 
@@ -23,19 +33,28 @@ class MarketTest  (unittest.TestCase):
 
         #self.assertEqual(market.orders, set(['XXX', 'YYY']))
 
+    def test_submit_order_batch(self):
+        assets = {'XXX': Asset(1, 20, 1.5, 'XXX'), 'YYY': Asset(1, 20, 1.5, 'yyy')}
+        market = new_market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
+        market.submit_sell_orders(OrderBatch(['XXX', 'YYY', 'XXX'], [1, 2, 3], [1, 1, 1], True))
+        self.assertEqual(market.sell_orders_log, {'XXX': 4, 'YYY': 2})
+        self.assertRaises(TypeError, market.submit_buy_orders, OrderBatch(['XXX', 'YYY'], [1, 1], [1, 1],
+                                                                          [False, True]))
+        self.assertEqual(market.buy_orders_log, {'XXX': 0, 'YYY': 0})
+
     def test_submit_buy_to_sell_raise_exception(self):
         assets = {'XXX': Asset(1, 20, 1.5, 'XXX'), 'YYY': Asset(1, 20, 1.5, 'yyy')}
-        market = Market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
         self.assertRaises(TypeError, market.submit_sell_orders, [Buy('XXX', 1, 1)])
 
     def test_submit_sell_to_buy_raise_exception(self):
         assets = {'XXX': Asset(1, 20, 1.5, 'XXX'), 'YYY': Asset(1, 20, 1.5, 'yyy')}
-        market = Market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
         self.assertRaises(TypeError, market.submit_buy_orders, [Sell('XXX', 1, 1)])
 
     def test_submit_buy_orders(self):
         assets = {'XXX': Asset(1, 20, 1.5, 'XXX'), 'YYY': Asset(1, 20, 1.5, 'yyy')}
-        market = Market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 1, 0.1, assets)
         market.submit_buy_orders([Buy('XXX', 1, 1)])
         self.assertEqual(market.buy_orders_log, {'XXX': 1, 'YYY': 0})
 
@@ -46,7 +65,7 @@ class MarketTest  (unittest.TestCase):
     def test_apply_action_price_increase_asym_only(self):
         xxx = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='XXX')
         assets = {'XXX': xxx}
-        market = Market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
         market.submit_buy_orders([Buy('XXX', 10, 100)])
         market.apply_actions()
         self.assertEqual(xxx.price, 150)
@@ -59,7 +78,7 @@ class MarketTest  (unittest.TestCase):
     def test_apply_action_price_increase_sym_only(self):
         yyy = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='YYY')
         assets = {'YYY': yyy}
-        market = Market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
         market.submit_buy_orders([Buy('YYY', 20, 100)])
         market.submit_sell_orders([Sell('YYY', 10, 100)])
         market.apply_actions()
@@ -73,7 +92,7 @@ class MarketTest  (unittest.TestCase):
     def test_apply_action_price_decreases_asym_only(self):
         zzz = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='XXX')
         assets = {'ZZZ': zzz}
-        market = Market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
         market.submit_sell_orders([Sell('ZZZ', 10, 100)])
         market.apply_actions()
         self.assertEqual(zzz.price, 50)
@@ -86,7 +105,7 @@ class MarketTest  (unittest.TestCase):
     def test_apply_action_price_decreases_sym_only(self):
         www = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='WWW')
         assets = {'WWW': www}
-        market = Market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
         market.submit_buy_orders([Buy('WWW', 10, 100)])
         market.submit_sell_orders([Sell('WWW', 20, 100)])
         market.apply_actions()
@@ -100,7 +119,7 @@ class MarketTest  (unittest.TestCase):
     def test_apply_action_price_remains_the_same(self):
         vvv = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='VVV')
         assets = {'VVV': vvv}
-        market = Market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
         market.submit_buy_orders([Buy('VVV', 10, 100)])
         market.submit_sell_orders([Sell('VVV', 10, 100)])
         market.apply_actions()
@@ -118,7 +137,7 @@ class MarketTest  (unittest.TestCase):
         www = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='WWW')
         vvv = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='VVV')
         assets = {'VVV': vvv,'WWW': www, 'XXX': xxx, 'YYY': yyy, 'ZZZ': zzz}
-        market = Market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
         market.submit_buy_orders([Buy('XXX', 10, 100), Buy('YYY', 20, 100),
                                    Buy('VVV', 10, 100), Buy('WWW', 10, 100)])
         market.submit_sell_orders([Sell('YYY', 10, 100), Sell('ZZZ', 10, 100),
@@ -144,7 +163,7 @@ class MarketTest  (unittest.TestCase):
         yyy = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='YYY')
         zzz = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='ZZZ')
         assets = {'XXX': xxx, 'YYY': yyy, 'ZZZ': zzz}
-        market = Market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
+        market = new_market(MockMarketImpactTestCalculator(), 0.5, 0.5, assets)
         market.submit_buy_orders([Buy('XXX', 10, 100), Buy('YYY', 10, 100)])
         market.submit_sell_orders([Sell('XXX', 10, 100), Sell('YYY', 20, 100)])
         market.apply_actions()
@@ -162,6 +181,42 @@ class MarketTest  (unittest.TestCase):
         self.assertEqual(zzz.avg_minute_volume, 10)
         self.assertEqual(market.minute_volume_counter, {'XXX': 0, 'YYY': 0, 'ZZZ': 0})
 
+    def test_apply_action_on_network_assets(self):
+        xxx = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='XXX')
+        yyy = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='YYY')
+        f1 = Fund('f1', {'XXX': 10, 'YYY': 20}, 5, 2, 0.25)
+        network = AssetFundsNetwork({'f1': f1}, {'XXX': xxx, 'YYY': yyy}, MockMarketImpactTestCalculator())
+        market = Market(MockMarketImpactTestCalculator(), 0.5, 0.5, network.assets)
+        self.assertIs(market.network, network)
+        market.submit_buy_orders([Buy('XXX', 10, 100)])
+        market.submit_sell_orders([Sell('YYY', 10, 100)])
+        market.apply_actions()
+        self.assertEqual(xxx.price, 150)
+        self.assertEqual(yyy.price, 50)
+        self.assertEqual(network.compute_portfolio_value(0), 10 * 150 + 20 * 50)
+
+    def test_apply_action_sqrt_impact_scales_prices(self):
+        xxx = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='XXX')
+        yyy = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='YYY')
+        market = new_market(SqrtMarketImpactCalculator(0.5), 0.5, 0.5, {'XXX': xxx, 'YYY': yyy})
+        market.submit_buy_orders([Buy('XXX', 10, 100)])
+        market.submit_sell_orders([Sell('YYY', 10, 100)])
+        market.apply_actions()
+        delta = sqrt(5 / 3900) * 0.5 * 1.5
+        self.assertAlmostEqual(xxx.price, 100 * (1 + delta))
+        self.assertAlmostEqual(yyy.price, 100 * (1 - delta))
+
+    def test_assets_of_another_network_raise_exception(self):
+        xxx = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='XXX')
+        yyy = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='YYY')
+        AssetFundsNetwork({}, {'XXX': xxx, 'YYY': yyy}, MockMarketImpactTestCalculator())
+        self.assertRaises(ValueError, Market, MockMarketImpactTestCalculator(), 0.5, 0.5, {'XXX': xxx})
+
+    def test_unbound_assets_raise_exception(self):
+        xxx = Asset(price=100, daily_volume=3900, volatility=1.5, symbol='XXX')
+        self.assertRaises(ValueError, Market, MockMarketImpactTestCalculator(), 0.5, 0.5, {'XXX': xxx})
+        self.assertIsNone(xxx.network)
+
 
 
 #unchnged but stayes in quue
@@ -0,0 +1,33 @@
+import unittest
+
+import numpy.testing as npt
+
+from GameLogic.Orders import Sell, Buy, OrderBatch
+
+
+class OrdersTest (unittest.TestCase):
+
+    def test_batch_yields_orders(self):
+        batch = OrderBatch(['a1', 'a2', 'a1'], [10, 5, 2], [2, 3, 2], [True, False, True])
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(list(batch), [Sell('a1', 10, 2), Buy('a2', 5, 3), Sell('a1', 2, 2)])
+        self.assertEqual(batch, [Sell('a1', 10, 2), Buy('a2', 5, 3), Sell('a1', 2, 2)])
+        self.assertEqual(batch[1], Buy('a2', 5, 3))
+        self.assertEqual(str(batch), '[Sell a1 10 at 2, Buy a2 5 at 3, Sell a1 2 at 2]')
+        npt.assert_array_equal(batch.signed_shares(), [-10, 5, -2])
+
+    def test_from_orders(self):
+        orders = [Buy('a1', 10, 2), Sell('a2', 4, 1)]
+        batch = OrderBatch.from_orders(orders)
+        self.assertEqual(batch, orders)
+        self.assertIs(OrderBatch.from_orders(batch), batch)
+        self.assertEqual(OrderBatch.from_orders([]), [])
+
+    def test_indices(self):
+        asset_index = {'a1': 0, 'a2': 1}
+        npt.assert_array_equal(OrderBatch(['a2', 'a1'], [1, 1], [1, 1], False).indices(asset_index), [1, 0])
+        npt.assert_array_equal(OrderBatch(['a2', 'a1'], [1, 1], [1, 1], False, [3, 4]).indices(asset_index), [3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy
+
+import GameStateTest
+from DeepLearning.PolicyValueModel import PolicyValueModel, UniformModel
+from GameRunners.PUCT import PUCTSearch, PUCT, PUCTSelectChild
+from GameLogic.Players import Attacker, RobustDefender
+
+
+class AssetModel(PolicyValueModel):
+    'puts the policy on one asset, and records the sizes of the batches it evaluates'
+    def __init__(self, asset, num_players):
+        self.asset = asset
+        self.num_players = num_players
+        self.batch_sizes = []
+
+    def predict(self, boards):
+        self.batch_sizes.append(len(boards))
+        policies = numpy.zeros((len(boards), boards.shape[2]))
+        policies[:, self.asset] = 1
+        return policies, numpy.zeros((len(boards), self.num_players))
+
+
+class PUCTTest  (unittest.TestCase):
+
+    'a state where the first moves do not end the game, as the defender can still buy'
+    def gen_state(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        state.attacker = state.players[0] = Attacker({'a0': 100, 'a1': 100}, ['f0'], 4, 2)
+        state.defender = state.players[1] = RobustDefender(50000, 4, 1)
+        return state
+
+    def test_batched_evaluation(self):
+        state = self.gen_state()
+        network = state.network
+        expected_network = self.gen_state().network
+        model = AssetModel(0, 2)
+        rootnode = PUCTSearch(state, 30, model, batch_size=4)
+        self.assertEqual(rootnode.visits, 30)
+        self.assertEqual(network, expected_network)
+        self.assertEqual(model.batch_sizes[0], 1)  # the root
+        self.assertTrue(all(size <= 4 for size in model.batch_sizes))
+        self.assertGreater(len(model.batch_sizes), 2)
+        self.assertEqual(sum(model.batch_sizes[1:]), len(rootnode.tree.policies) - 1)
+        self.assertFalse(numpy.any(rootnode.tree.pool.visits[:rootnode.tree.pool.size] < 0))
+
+    def test_priors(self):
+        state = self.gen_state()
+        rootnode = PUCTSearch(state, 20, AssetModel(1, 2), batch_size=4)
+        tree = rootnode.tree
+        start = tree.edge_start[0]
+        for k, child in enumerate(rootnode.childNodes):
+            assets = set(order.asset_symbol for order in child.move)
+            self.assertEqual(tree.priors[start + k], sum(asset == 'a1' for asset in assets) / len(assets))
+        m = PUCT(state, 40, AssetModel(1, 2), batch_size=4)
+        self.assertIn('a1', [order.asset_symbol for order in m])
+
+    def test_select_child(self):
+        state = self.gen_state()
+        rootnode = PUCTSearch(state, 10, UniformModel(2), batch_size=2)
+        children = rootnode.childNodes
+        for child in children:
+            child.visits = 1
+            child.wins = 0
+        tree = rootnode.tree
+        tree.priors[tree.edge_start[0] + 1] = 2
+        self.assertEqual(PUCTSelectChild(rootnode, 1.5), children[1])
+        children[0].wins = 5
+        self.assertEqual(PUCTSelectChild(rootnode, 1.5), children[0])
+
+    'the attacker sells one asset at a time, so no first move ends the game and every child of the root is evaluated'
+    def test_tree_reuse(self):
+        state = self.gen_state()
+        state.attacker = state.players[0] = Attacker({'a0': 100, 'a1': 100}, ['f0'], 4, 1)
+        model = AssetModel(0, 2)
+        m, tree = PUCT(state, 20, model, batch_size=4, return_tree=True)
+        state.apply_action(m)
+        self.assertFalse(state.game_ended())
+        subtree = tree.SubtreeForMove(m)
+        visits = subtree.visits
+        policy = subtree.tree.policies[0]
+        m2, tree2 = PUCT(state, 8, model, batch_size=4, rootnode=subtree, return_tree=True)
+        self.assertIs(tree2, subtree)
+        self.assertEqual(tree2.visits, visits + 8)
+        self.assertIs(tree2.tree.policies[0], policy)  # the root is not evaluated again
+
+
+if __name__ == '__main__':
+    unittest.main()
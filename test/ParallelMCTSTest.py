@@ -0,0 +1,33 @@
+import unittest
+
+from GameRunners.ParallelMCTS import ParallelUCT
+import GameStateTest
+from Players.PlayersTest import to_string_list
+
+
+class ParallelMCTSTest  (unittest.TestCase):
+
+    def assert_valid_move(self, state, move):
+        self.assertIn(to_string_list([move])[0], to_string_list(state.get_valid_actions()))
+
+    def test_root_parallel(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        with ParallelUCT(2, 'root') as parallel_uct:
+            self.assertEqual(parallel_uct.worker_iterations(5), [3, 2])
+            move = parallel_uct.search(state, 10)
+        self.assert_valid_move(state, move)
+        self.assertEqual(state.network, GameStateTest.GameStateTest().gen_state().network)
+
+    def test_leaf_parallel(self):
+        state = GameStateTest.GameStateTest().gen_state()
+        with ParallelUCT(2, 'leaf') as parallel_uct:
+            rootnode = parallel_uct.leaf_parallel_search(state, 10)
+        self.assertEqual(rootnode.visits, 10)
+        self.assertEqual(sum(c.visits for c in rootnode.childNodes), 10)
+        for child in rootnode.childNodes:
+            self.assert_valid_move(state, child.move)
+        self.assertEqual(state.network, GameStateTest.GameStateTest().gen_state().network)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from GameLogic.Players import ActionSpace, Attacker, RobustDefender
+from GameLogic.SysConfig import SysConfig
+from GameLogic.Orders import Sell, Buy
+from GameLogic.AssetFundNetwork import Asset
+from Players.PlayersTest import to_string_list
+
+
+class ActionSpaceTest (unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        SysConfig.set(SysConfig.MIN_ORDER_VALUE, 0.5)
+
+    def assert_same_actions(self, expected, actual):
+        self.assertListEqual(sorted(to_string_list(expected)), sorted(to_string_list(actual)))
+
+    def test_size_and_decode(self):
+        options = [[(Sell('a1', 1, 2), 0), (Sell('a1', 2, 2), 0)],
+                   [],
+                   [(Sell('a2', 1, 2), 0)],
+                   [(Sell('a3', 1, 2), 0), (Sell('a3', 2, 2), 0), (Sell('a3', 3, 2), 0)]]
+        space = ActionSpace(options, 2)
+        'singles: 2 + 1 + 3, pairs: 2*1 + 2*3 + 1*3'
+        self.assertEqual(space.size, 17)
+        actions = [space.decode(i) for i in range(space.size)]
+        self.assertEqual(len(set(map(str, actions))), 17)
+        self.assertTrue(all(1 <= len(action) <= 2 for action in actions))
+        with self.assertRaises(IndexError):
+            space.decode(17)
+        self.assertEqual(ActionSpace(options, 3).size, 23)
+        self.assertEqual(ActionSpace([[], []], 2).size, 0)
+
+    def test_attacker_action_space(self):
+        assets = {'a1': Asset(2, 500, 1.5, 'a1'), 'a2': Asset(2, 500, 1.5, 'a2'), 'a3': Asset(2, 500, 1.5, 'a3')}
+        for max_assets in [1, 2, 3]:
+            attacker = Attacker({'a1': 300, 'a2': 400, 'a3': 100}, ['f1'], 3, max_assets)
+            space = attacker.get_action_space(assets)
+            self.assert_same_actions(attacker.get_valid_actions(assets), list(space))
+
+    def test_defender_action_space(self):
+        assets = {'a1': Asset(2, 200, 1.5, 'a1'), 'a2': Asset(2, 300, 1.5, 'a2'), 'a3': Asset(2, 100, 1.5, 'a3')}
+        for max_assets in [1, 2, 3]:
+            defender = RobustDefender(500, 2, max_assets)
+            space = defender.get_action_space(assets)
+            self.assert_same_actions(defender.get_valid_actions(assets), list(space))
+
+    def test_defender_capital_checked_lazily(self):
+        assets = {'a1': Asset(2, 200, 1.5, 'a1'), 'a2': Asset(2, 300, 1.5, 'a2')}
+        defender = RobustDefender(500, 2, 2)
+        space = defender.get_action_space(assets)
+        'a1 has 2 affordable slices, a2 has 1 and only one of the 2 pairs is affordable'
+        self.assertEqual(space.size, 5)
+        self.assertEqual(len(list(space)), 4)
+        for i in range(100):
+            action = space.sample()
+            self.assertIn(str(sorted(map(str, action))),
+                          [str(sorted(map(str, a))) for a in defender.get_valid_actions(assets)])
+
+    def test_single_valid_index(self):
+        options = [[(Buy('a1', 100, 10), 1000)], [(Buy('a2', 100, 20), 2000)]]
+        'both actions are counted by size, only the a1 one is within the budget'
+        space = ActionSpace(options, 1, 1500)
+        self.assertEqual(space.size, 2)
+        self.assertEqual(list(space.valid_indices()), [space.single_valid_index()])
+        self.assert_same_actions([[Buy('a1', 100, 10)]], [space.decode(space.single_valid_index())])
+        self.assertIsNone(ActionSpace(options, 1, 2500).single_valid_index())
+        self.assertIsNone(ActionSpace(options, 1, 500).single_valid_index())
+
+    def test_no_actions(self):
+        defender = RobustDefender(10, 2, 2)
+        space = defender.get_action_space({'a1': Asset(600, 200, 1.5, 'a1'), 'a2': Asset(600, 300, 1.5, 'a2')})
+        self.assertEqual(space.size, 0)
+        self.assertEqual(space.sample(), [])
+        self.assertTrue(defender.resources_exhusted())
+
+    def test_large_action_space(self):
+        assets = {'a' + str(i): Asset(10, 1000, 1.5, 'a' + str(i)) for i in range(20)}
+        attacker = Attacker({sym: 1000 for sym in assets}, ['f1'], 20, 3)
+        space = attacker.get_action_space(assets)
+        self.assertEqual(space.size, 20 * 20 + 190 * 20 ** 2 + 1140 * 20 ** 3)
+        action = space.decode(space.size - 1)
+        self.assertEqual(len(action), 3)
+        self.assertTrue(all(isinstance(order, Sell) for order in space.sample()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -61,6 +61,17 @@ class AttackerTest (unittest.TestCase):
         a = to_string_list(actual_orders)
         self.assertListEqual(e, a)
 
+    def test_has_valid_action(self):
+        SysConfig.set(SysConfig.MIN_ORDER_VALUE, 500)
+        assets = {'a1': Asset(2, 200, 1.5, 'a1'), 'a2': Asset(1, 200, 1.5, 'a2')}
+        attacker = Attacker({'a1': 300}, ['f1', 'f2'], 2, 2)
+        self.assertTrue(attacker.has_valid_action(assets))
+        attacker = Attacker({'a1': 249, 'a2': 499}, ['f1', 'f2'], 2, 2)
+        self.assertFalse(attacker.has_valid_action(assets))
+        self.assertFalse(attacker.resources_exhusted())
+        self.assertFalse(attacker.get_valid_actions(assets))
+        self.assertFalse(Attacker({}, ['f1'], 2, 2).has_valid_action(assets))
+
     def test_get_valid_actions_single_asset(self):
         attacker = Attacker({'a1': 300, 'a2': 400}, ['f1', 'f2'], 2, 1)
         expected_orders = \
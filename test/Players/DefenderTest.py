@@ -2,10 +2,12 @@ import unittest
 from typing import Dict
 
 
-from GameLogic.Players.Defender import RobustDefender, OracleDefender
+from GameLogic.Players.Defender import RobustDefender, OracleDefender, NNDefender
+from GameLogic.Players.GoalPosterior import GoalPosterior
+from GameLogic.MarketImpactCalculator import SqrtMarketImpactCalculator
 from GameLogic.SysConfig import SysConfig
 from GameLogic.Orders import Sell, Buy
-from GameLogic.AssetFundNetwork import Fund, Asset
+from GameLogic.AssetFundNetwork import Fund, Asset, AssetFundsNetwork
 from Players.PlayersTest import to_string_list
 
 
@@ -24,6 +26,19 @@ class RobustDefenderTest  (unittest.TestCase):
         a = to_string_list(actual_orders)
         self.assertListEqual(e, a)
 
+    def test_has_valid_action(self):
+        SysConfig.set(SysConfig.MIN_ORDER_VALUE, 100)
+        assets = {'a1': Asset(2, 60, 1.5, 'a1')}
+        self.assertTrue(RobustDefender(200, 2, 2).has_valid_action(assets))
+        self.assertTrue(RobustDefender(60, 2, 2).has_valid_action(assets))
+        defender = RobustDefender(59, 2, 2)
+        self.assertFalse(defender.has_valid_action(assets))
+        self.assertFalse(defender.resources_exhusted())
+        self.assertFalse(defender.get_valid_actions(assets))
+        SysConfig.set(SysConfig.MIN_ORDER_VALUE, 121)
+        self.assertFalse(RobustDefender(200, 2, 2).has_valid_action(assets))
+        self.assertFalse(RobustDefender(200, 2, 2).get_valid_actions(assets))
+
     def test_resources_exhusted_false_when_capital_exists(self):
         defender = RobustDefender(200, 2, 2)
         self.assertFalse(defender.resources_exhusted())
@@ -51,6 +66,23 @@ class RobustDefenderTest  (unittest.TestCase):
         f2 = Fund('f2', {'a1': 200}, 200, 2, 2, )
         self.assertEqual(defender.game_reward({'f1': f1, 'f2': f2}), 1)
 
+    def test_game_reward_nn_defender(self):
+        f1 = Fund('f1', {'a1': 100}, 200, 2, 2, )
+        f2 = Fund('f2', {'a2': 200}, 200, 2, 2, )
+        network = AssetFundsNetwork({'f1': f1, 'f2': f2}, {'a1': Asset(10, 3900, 1.5, 'a1'),
+                                                           'a2': Asset(10, 3900, 1.5, 'a2')},
+                                    SqrtMarketImpactCalculator())
+        defender = NNDefender(200, 2, 2, GoalPosterior(network, prior=0.5, hit_rate=0.8))
+        snapshot = defender.snapshot()
+        self.assertEqual(defender.game_reward(network.funds), 0)
+        defender.observe_opponent([Sell('a1', 100, 10)])
+        f1.is_liquidating = True
+        self.assertAlmostEqual(defender.game_reward(network.funds), -1.6 / 2.6)  # odds of 1 * 0.8 / 0.5
+        f2.is_liquidating = True
+        self.assertAlmostEqual(defender.game_reward(network.funds), -1.6 / 2.6 - 0.4 / 1.4)
+        defender.restore(snapshot)
+        self.assertAlmostEqual(defender.game_reward(network.funds), -1)
+
     def test_apply_action(self):
         defender = RobustDefender(400, 2, 2)
         orders = [Buy('a1', 100, 2), Buy('a2', 100, 2)]
@@ -0,0 +1,41 @@
+import unittest
+from math import log
+
+import numpy
+
+from GameLogic.AssetFundNetwork import Fund, Asset, AssetFundsNetwork
+from GameLogic.MarketImpactCalculator import SqrtMarketImpactCalculator
+from GameLogic.Orders import Sell, Buy
+from GameLogic.Players.GoalPosterior import GoalPosterior
+
+
+class GoalPosteriorTest  (unittest.TestCase):
+
+    def gen_network(self):
+        assets = {sym: Asset(10, 3900, 1.5, sym) for sym in ['a0', 'a1', 'a2', 'a3']}
+        f0 = Fund('f0', {'a0': 100}, 500, 1, 2)
+        f1 = Fund('f1', {'a0': 100, 'a1': 10}, 550, 1, 2)
+        f2 = Fund('f2', {'a2': 50, 'a3': 50}, 550, 1, 2)
+        return AssetFundsNetwork({'f0': f0, 'f1': f1, 'f2': f2}, assets, SqrtMarketImpactCalculator())
+
+    def test_prior(self):
+        posterior = GoalPosterior(self.gen_network(), prior=0.2)
+        numpy.testing.assert_allclose(posterior.probabilities, [0.2, 0.2, 0.2])
+
+    def test_observe(self):
+        posterior = GoalPosterior(self.gen_network(), hit_rate=0.9)
+        posterior.observe([Sell('a0', 50, 10)])
+        numpy.testing.assert_allclose(posterior.log_odds, [log(0.9 / 0.25), log(0.9 / 0.5), log(0.1 / 0.5)])
+        snapshot = posterior.snapshot()
+        posterior.observe([Sell('a1', 10, 10), Sell('a0', 10, 10), Buy('a2', 10, 10)])
+        numpy.testing.assert_allclose(posterior.log_odds, [log(0.9 / 0.25) * 2 + log(0.1 / 0.75),
+                                                           log(0.9 / 0.5) * 3, log(0.1 / 0.5) * 3])
+        numpy.testing.assert_allclose(posterior.probabilities, 1 / (1 + numpy.exp(-posterior.log_odds)))
+        self.assertEqual(numpy.argmax(posterior.probabilities), 1)
+        posterior.restore(snapshot)
+        numpy.testing.assert_allclose(posterior.log_odds, [log(0.9 / 0.25), log(0.9 / 0.5), log(0.1 / 0.5)])
+        numpy.testing.assert_allclose(posterior.probabilities, 1 / (1 + numpy.exp(-posterior.log_odds)))
+
+
+if __name__ == '__main__':
+    unittest.main()
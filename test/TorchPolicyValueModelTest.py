@@ -0,0 +1,53 @@
+import unittest
+from math import log
+
+import numpy
+
+import PUCTTest
+from GameRunners.PUCT import PUCTSearch
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+if torch is not None:
+    from DeepLearning.TorchPolicyValueModel import TorchPolicyValueModel
+
+    class ConstantModule(torch.nn.Module):
+        'logits of (0, log 3) and values of (0.5, -0.5) for every board, from linear layers with zero weights'
+        def __init__(self, num_assets, num_players):
+            super().__init__()
+            self.policy = torch.nn.Linear(num_assets, num_assets)
+            self.value = torch.nn.Linear(num_assets, num_players)
+            with torch.no_grad():
+                for layer, bias in [(self.policy, [0, log(3)]), (self.value, [0.5, -0.5])]:
+                    layer.weight.zero_()
+                    layer.bias.copy_(torch.tensor(bias))
+
+        def forward(self, boards):
+            features = boards.sum(dim=1)
+            return self.policy(features), self.value(features)
+
+
+@unittest.skipUnless(torch is not None, 'torch is not installed')
+class TorchPolicyValueModelTest  (unittest.TestCase):
+
+    def test_predict(self):
+        module = ConstantModule(2, 2)
+        model = TorchPolicyValueModel(module)
+        self.assertFalse(module.training)
+        policies, values = model.predict(numpy.random.rand(3, 4, 2))
+        self.assertIsInstance(policies, numpy.ndarray)
+        numpy.testing.assert_almost_equal(policies, [[0.25, 0.75]] * 3)
+        numpy.testing.assert_almost_equal(values, [[0.5, -0.5]] * 3)
+
+    def test_puct_search(self):
+        state = PUCTTest.PUCTTest().gen_state()
+        rootnode = PUCTSearch(state, 12, TorchPolicyValueModel(ConstantModule(2, 2)), batch_size=4)
+        self.assertEqual(rootnode.visits, 12)
+        self.assertIn(0, rootnode.tree.policies)
+
+
+if __name__ == '__main__':
+    unittest.main()
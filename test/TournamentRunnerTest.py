@@ -0,0 +1,84 @@
+import csv
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy
+
+from GameLogic import GameState
+from GameLogic.AssetFundNetwork import Asset, Fund, AssetFundsNetwork
+from GameLogic.GameConfig import GameConfig
+from GameLogic.MarketImpactCalculator import SqrtMarketImpactCalculator
+from GameLogic.SysConfig import SysConfig
+from GameRunners.MCTS import UCT
+from GameRunners.TournamentRunner import ParallelTournamentRunner, MultipleTournamentRunner, \
+    SingleTournamentRunner
+
+
+class TournamentRunnerTest  (unittest.TestCase):
+
+    def setUp(self):
+        min_order_value = SysConfig.get(SysConfig.MIN_ORDER_VALUE)
+        self.addCleanup(SysConfig.set, SysConfig.MIN_ORDER_VALUE, min_order_value)
+        SysConfig.set(SysConfig.MIN_ORDER_VALUE, 100)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        a0 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a0')
+        a1 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a1')
+        f0 = Fund('f0', {'a0': 100}, initial_capital=500, initial_leverage=1, tolerance=2)
+        f1 = Fund('f1', {'a0': 100, 'a1': 10}, initial_capital=550, initial_leverage=1, tolerance=2)
+        network = AssetFundsNetwork({'f0': f0, 'f1': f1}, {'a0': a0, 'a1': a1}, SqrtMarketImpactCalculator())
+        self.network_file = os.path.join(self.dir.name, 'network.json')
+        network.save_to_file(self.network_file)
+        self.network_dir = os.path.join(self.dir.name, 'network')
+        network.save_arrays(self.network_dir)
+        self.config = GameConfig(num_assets=2, num_funds=2, attacker_asset_slicing=2, defender_asset_slicing=2,
+                                 defender_initial_capital=5000, uct_iterations=5)
+
+    def run_sweep(self, workers, network_file=None):
+        numpy.random.seed(0)
+        csv_file = os.path.join(self.dir.name, str(workers) + '.csv')
+        runner = ParallelTournamentRunner(csv_file, 3, network_file or self.network_file, 'robust', self.config,
+                                          workers, seed=7)
+        runner.run_for_goals_set([['f0'], ['f1'], ['f0', 'f1']])
+        with open(csv_file, newline='') as f:
+            rows = list(csv.DictReader(f))[1:]
+        return {row['goals']: (row['attacker_wins'], row['defender_wins'], row['avg_num_moves']) for row in rows}
+
+    def test_searches_run_every_iteration_by_default(self):
+        network = AssetFundsNetwork.load_from_file(self.network_file, SqrtMarketImpactCalculator())
+        runner = SingleTournamentRunner(1, network, 'robust', ['f0'], self.config)
+        state = GameState.TwoPlayersGameState(network, runner.attacker, runner.defender)
+        with mock.patch('GameRunners.TournamentRunner.UCT', wraps=UCT) as uct:
+            _, tree = runner.search(state)
+        self.assertFalse(uct.call_args.kwargs['early_stop'])
+        self.assertEqual(tree.visits, self.config.uct_iterations)
+
+    def test_pool_closed_when_a_tournament_fails(self):
+        self.config.uct_workers = 2
+        runner = MultipleTournamentRunner(os.path.join(self.dir.name, 'failed.csv'), 1, self.network_file, 'robust',
+                                          self.config)
+        with mock.patch('GameRunners.TournamentRunner.ParallelUCT') as parallel_uct, \
+                mock.patch.object(SingleTournamentRunner, 'run_single_tournament', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                runner.run_for_goals_set([['f0']])
+        parallel_uct.return_value.__exit__.assert_called_once()
+        self.assertTrue(runner.csv_file.closed)
+
+    def test_parallel_tournament(self):
+        serial = self.run_sweep(1)
+        self.assertEqual(sorted(serial.keys()), ['f0', 'f0-f1', 'f1'])
+        for attacker_wins, defender_wins, _ in serial.values():
+            self.assertEqual(int(attacker_wins) + int(defender_wins), 3)
+        self.assertEqual(self.run_sweep(3), serial)
+
+    def test_parallel_tournament_over_mapped_network(self):
+        serial = self.run_sweep(1, self.network_dir)
+        self.assertEqual(sorted(serial.keys()), ['f0', 'f0-f1', 'f1'])
+        self.assertEqual(self.run_sweep(2, self.network_dir), serial)
+
+
+if __name__ == '__main__':
+    unittest.main()
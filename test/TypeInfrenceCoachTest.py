@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy
+
+from DeepLearning.ExampleStore import ExampleStore
+from DeepLearning.TypeInfrenceCoach import TypeInfrenceCoach
+from GameLogic.AssetFundNetwork import Asset, Fund, AssetFundsNetwork
+from GameLogic.GameConfig import GameConfig
+from GameLogic.MarketImpactCalculator import SqrtMarketImpactCalculator
+from GameLogic.SysConfig import SysConfig
+from GameRunners.GoalsSweep import GoalsSweep
+
+
+class TypeInfrenceCoachTest  (unittest.TestCase):
+
+    def setUp(self):
+        min_order_value = SysConfig.get(SysConfig.MIN_ORDER_VALUE)
+        self.addCleanup(SysConfig.set, SysConfig.MIN_ORDER_VALUE, min_order_value)
+        SysConfig.set(SysConfig.MIN_ORDER_VALUE, 100)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        a0 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a0')
+        a1 = Asset(price=10, daily_volume=3900, volatility=1.5, symbol='a1')
+        f0 = Fund('f0', {'a0': 100}, initial_capital=500, initial_leverage=1, tolerance=2)
+        f1 = Fund('f1', {'a0': 100, 'a1': 10}, initial_capital=550, initial_leverage=1, tolerance=2)
+        self.network = AssetFundsNetwork({'f0': f0, 'f1': f1}, {'a0': a0, 'a1': a1}, SqrtMarketImpactCalculator())
+        self.config = GameConfig(num_assets=2, num_funds=2, attacker_asset_slicing=2, uct_iterations=5)
+
+    'the examples of a store as sorted (boards, goals) bytes, to compare stores regardless of the writers'
+    def stored_examples(self, folder):
+        store = ExampleStore(folder)
+        examples = []
+        for entry in store.chunks():
+            boards, goals, offsets = store.load_chunk(entry)
+            for e in range(len(goals)):
+                examples.append((boards[offsets[e]:offsets[e + 1]].tobytes(), goals[e].tobytes()))
+        return sorted(examples)
+
+    def gen_examples(self, workers, network_dir=None):
+        folder = os.path.join(self.dir.name, str(workers) + str(network_dir is not None))
+        coach = TypeInfrenceCoach(folder, self.config)
+        coach.gen_training_examples(self.network, episodes_per_goal=3, uct_iterations=5, shard_size=2,
+                                    workers=workers, network_dir=network_dir, seed=7)
+        self.assertTrue(GoalsSweep(2, 2, os.path.join(folder, 'goals_sweep.checkpoint')).is_done())
+        return folder
+
+    def test_gen_training_examples(self):
+        folder = self.gen_examples(1)
+        store = ExampleStore(folder)
+        self.assertTrue(0 < store.num_episodes() <= 9)
+        for entry in store.chunks():
+            boards, goals, _ = store.load_chunk(entry)
+            self.assertEqual(boards.shape[1:], (2, 2))
+            self.assertTrue(goals.any(axis=1).all())
+
+    def test_resume_after_kill_in_a_shard(self):
+        folder = os.path.join(self.dir.name, 'resumed')
+        episodes = [0]
+
+        'every episode is won, and the 8th, in the last shard, kills the run'
+        def execute_episode(state, iter_num):
+            episodes[0] += 1
+            if episodes[0] == 8:
+                raise KeyboardInterrupt
+            return [(numpy.full((1, 2, 2), episodes[0]), None)]
+        with mock.patch.object(TypeInfrenceCoach, 'executeEpisode', side_effect=execute_episode):
+            coach = TypeInfrenceCoach(folder, self.config)
+            coach.example_store.chunk_size = 1
+            with self.assertRaises(KeyboardInterrupt):
+                coach.gen_training_examples(self.network, episodes_per_goal=3, uct_iterations=5, shard_size=2)
+            self.assertEqual(ExampleStore(folder).num_episodes(), 6)
+            TypeInfrenceCoach(folder, self.config).gen_training_examples(self.network, episodes_per_goal=3,
+                                                                        uct_iterations=5, shard_size=2)
+        self.assertEqual(ExampleStore(folder).num_episodes(), 9)
+
+    def test_parallel_training_examples(self):
+        examples = self.stored_examples(self.gen_examples(2))
+        self.assertTrue(examples)
+        self.assertEqual(self.stored_examples(self.gen_examples(3)), examples)
+        network_dir = os.path.join(self.dir.name, 'network')
+        self.network.save_arrays(network_dir)
+        self.assertEqual(self.stored_examples(self.gen_examples(2, network_dir)), examples)
+
+    def test_parallel_replayed_shards_are_not_stored_twice(self):
+        folder = self.gen_examples(2)
+        examples = self.stored_examples(folder)
+        os.remove(os.path.join(folder, 'goals_sweep.checkpoint'))  # killed before the shards were recorded
+        self.gen_examples(2)
+        self.assertEqual(self.stored_examples(folder), examples)
+        store = ExampleStore(folder)
+        commits = [commit for name in os.listdir(folder) if name.endswith('.index')
+                   for commit in store.commits(os.path.join(folder, name))]
+        self.assertEqual(sorted(commit['shard'] for commit in commits), [0, 0, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()